@@ -0,0 +1,556 @@
+#!/usr/bin/env python3
+"""
+Read API Server - Filtered queries over the generated data for internal tools
+An asyncio HTTP/1.1 server (stdlib only) that loads connect.json,
+stable.json, exams.json and open_labs.json into indexed in-memory
+structures and answers filtered queries:
+
+    GET /v1/{connect|stable}/sections?course=CSE110&section=1&faculty=NZRF
+                                     &room=10B-17C&day=SUNDAY&start=10:00&end=12:00
+                                     &offset=0&limit=50
+    GET /v1/{connect|stable}/sections/{sectionId}
+    GET /v1/exams?course=CSE110&section=01&date=2026-11-21&type=midterm
+    GET /v1/open-labs?day=SUNDAY&time=10:00
+    GET /v1/free-rooms?day=SUNDAY&start=10:00&end=12:00&kind=lab
+    GET /v1/status
+    GET /connect.json, /courses/CSE110.json, ...   (generated files as published)
+
+Responses carry a strong ETag (If-None-Match -> 304) and are compressed
+once: query results are cached with their gzip/brotli bodies, and
+generated files are served from their precompressed .gz/.br siblings. The
+server reloads in the background when update_cdn.py or watch.py publishes
+a new generation (publish_manifest.json or a data file changes). A reload
+waits while a publish is being applied (its journal exists) and is retried
+when the files change while they are being read, so one loaded generation
+never mixes files from two publishes.
+
+Usage:
+    python api_server.py [--host 127.0.0.1] [--port 8787] [--reload-interval 2]
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+import staging
+from connect_index import build_connect_index, load_artifact_json
+from exam_overlay import normalize_course, normalize_section
+from free_rooms import RoomIndex, parse_clock
+from generate_free_labs import DAYS
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PORT = 8787
+RELOAD_INTERVAL = 2.0       # seconds between checks for a new generation
+LOAD_ATTEMPTS = 5           # loads of a generation that changed while being read
+LOAD_RETRY_DELAY = 0.2      # seconds
+CACHE_ENTRIES = 2048        # cached responses (queries and files)
+COMPRESS_MIN_BYTES = 1024   # smaller responses are sent uncompressed
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+MAX_HEADER_LINES = 100
+
+SECTION_DATASETS = {"connect": "connect.json", "stable": "stable.json"}
+DATA_FILES = tuple(SECTION_DATASETS.values()) + ("exams.json", "open_labs.json", "publish_manifest.json")
+# Generated files served as published (relative path pattern)
+STATIC_PATTERN = re.compile(r'^(?:(?:courses|departments|deltas|backups)/)?[A-Za-z0-9_.\-]+\.json$')
+
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    try:
+        return load_artifact_json(path)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+class SectionDataset:
+    """One sections document with lookup, section-name and day/time indexes."""
+
+    def __init__(self, name: str, document: Dict):
+        self.name = name
+        self.metadata = document.get('metadata', {})
+        self.sections: List[Dict] = document.get('sections', [])
+        index = build_connect_index(self.sections, self.metadata)
+        self.by_id: Dict[str, int] = index['sectionId']
+        self.lookups = {"course": index['courseCode'], "faculty": index['faculty'], "room": index['roomName']}
+        self.by_section_name: Dict[str, List[int]] = defaultdict(list)
+        # day -> [(start minute, end minute, position)] of class and lab meetings
+        self.meetings: Dict[str, List[Tuple[int, int, int]]] = defaultdict(list)
+
+        for position, section in enumerate(self.sections):
+            self.by_section_name[normalize_section(section.get('sectionName'))].append(position)
+            schedules = ((section.get('sectionSchedule') or {}).get('classSchedules') or []) + \
+                (section.get('labSchedules') or [])
+            for meeting in schedules:
+                try:
+                    start, end = parse_clock(meeting['startTime']), parse_clock(meeting['endTime'])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                self.meetings[str(meeting.get('day', '')).upper()].append((start, end, position))
+        for meetings in self.meetings.values():
+            meetings.sort()
+        self.room_index: Optional[RoomIndex] = None
+
+    def rooms(self) -> RoomIndex:
+        if self.room_index is None:
+            self.room_index = RoomIndex(self.sections)
+        return self.room_index
+
+    def query(self, params: Dict[str, str]) -> List[Dict]:
+        candidates: Optional[set] = None
+
+        def narrow(positions) -> None:
+            nonlocal candidates
+            candidates = set(positions) if candidates is None else candidates & set(positions)
+
+        if "course" in params:
+            narrow(self.lookups["course"].get(normalize_course(params["course"]), []))
+        for key in ("faculty", "room"):
+            if key in params:
+                narrow(self.lookups[key].get(params[key].strip().upper(), []))
+        if "section" in params:
+            narrow(self.by_section_name.get(normalize_section(params["section"]), []))
+        if "day" in params:
+            day = _day(params)
+            start, end = _window(params)
+            narrow(position for meeting_start, meeting_end, position in self.meetings.get(day, [])
+                   if meeting_start < end and meeting_end > start)
+        elif "start" in params or "end" in params:
+            raise ApiError(400, "start/end need a day")
+
+        positions = range(len(self.sections)) if candidates is None else sorted(candidates)
+        return [self.sections[position] for position in positions]
+
+
+class ExamDataset:
+    """exams.json indexed by course and exam date."""
+
+    def __init__(self, document: Dict):
+        self.metadata = document.get('metadata', {})
+        self.exams: List[Dict] = document.get('exams', [])
+        self.by_course: Dict[str, List[int]] = defaultdict(list)
+        self.by_date: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        for position, exam in enumerate(self.exams):
+            self.by_course[normalize_course(exam.get('courseCode'))].append(position)
+            for exam_type, field in (("midterm", "midExamDate"), ("final", "finalExamDate")):
+                if exam.get(field):
+                    self.by_date[(exam_type, exam[field])].append(position)
+
+    def query(self, params: Dict[str, str]) -> List[Dict]:
+        exam_type = params.get("type")
+        if exam_type not in (None, "midterm", "final"):
+            raise ApiError(400, "type must be midterm or final")
+
+        candidates: Optional[set] = None
+        if "course" in params:
+            candidates = set(self.by_course.get(normalize_course(params["course"]), []))
+        if "date" in params:
+            types = (exam_type,) if exam_type else ("midterm", "final")
+            dated = {p for t in types for p in self.by_date.get((t, params["date"]), [])}
+            candidates = dated if candidates is None else candidates & dated
+        positions = range(len(self.exams)) if candidates is None else sorted(candidates)
+
+        exams = [self.exams[position] for position in positions]
+        if "section" in params:
+            section = normalize_section(params["section"])
+            exams = [exam for exam in exams if normalize_section(exam.get('sectionName')) == section]
+        return exams
+
+
+class ApiData:
+    """Every dataset loaded from one generation of the published files."""
+
+    def __init__(self, root: str = SCRIPT_DIR):
+        self.root = root
+        self.signature = data_signature(root)
+        manifest = _read_json(os.path.join(root, "publish_manifest.json")) or {}
+        self.generation = manifest.get('generation')
+
+        self.sections: Dict[str, SectionDataset] = {}
+        for name, filename in SECTION_DATASETS.items():
+            document = _read_json(os.path.join(root, filename))
+            if document is not None:
+                self.sections[name] = SectionDataset(name, document)
+        exams = _read_json(os.path.join(root, "exams.json"))
+        self.exams = ExamDataset(exams) if exams is not None else None
+        self.open_labs = _read_json(os.path.join(root, "open_labs.json"))
+
+    def status(self) -> Dict:
+        datasets = {
+            name: {"version": dataset.metadata.get('version'), "lastUpdated": dataset.metadata.get('lastUpdated'),
+                   "sections": len(dataset.sections)}
+            for name, dataset in self.sections.items()
+        }
+        if self.exams is not None:
+            datasets["exams"] = {"lastUpdated": self.exams.metadata.get('lastUpdated'), "exams": len(self.exams.exams)}
+        if self.open_labs is not None:
+            datasets["open_labs"] = {"lastUpdated": self.open_labs.get('metadata', {}).get('lastUpdated')}
+        return {"generation": self.generation, "datasets": datasets}
+
+
+class ReloadError(Exception):
+    """No consistent generation could be loaded; a publish kept landing mid-load."""
+
+
+def publish_in_progress(root: str) -> bool:
+    """True while a staged generation is being moved into place under root."""
+    return os.path.exists(os.path.join(root, staging.STAGING_NAME, staging.JOURNAL_NAME))
+
+
+def load_generation(root: str, attempts: int = LOAD_ATTEMPTS) -> ApiData:
+    """ApiData of one published generation.
+
+    The files are only read while no publish is being applied, and the load
+    is repeated when their signature changed while they were being read.
+    """
+    for attempt in range(attempts):
+        if attempt:
+            time.sleep(LOAD_RETRY_DELAY)
+        if publish_in_progress(root):
+            continue
+        data = ApiData(root)
+        if not publish_in_progress(root) and data_signature(root) == data.signature:
+            return data
+    raise ReloadError(f"{root} changed during {attempts} load attempts")
+
+
+def data_signature(root: str) -> Tuple:
+    """(size, mtime) of every loaded file; changes when a new generation is published."""
+    signature = []
+    for filename in DATA_FILES:
+        try:
+            stat = os.stat(os.path.join(root, filename))
+            signature.append((filename, stat.st_size, stat.st_mtime_ns))
+        except FileNotFoundError:
+            signature.append((filename, None, None))
+    return tuple(signature)
+
+
+def _day(params: Dict[str, str]) -> str:
+    day = params["day"].upper()
+    if day not in DAYS:
+        raise ApiError(400, f"Unknown day {params['day']!r}. Expected one of {', '.join(DAYS)}")
+    return day
+
+
+def _window(params: Dict[str, str]) -> Tuple[int, int]:
+    try:
+        start = parse_clock(params["start"]) if "start" in params else 0
+        end = parse_clock(params["end"]) if "end" in params else 24 * 60
+    except ValueError as e:
+        raise ApiError(400, str(e))
+    if end <= start:
+        raise ApiError(400, "end must be after start")
+    return start, end
+
+
+def _page(items: List, params: Dict[str, str]) -> List:
+    try:
+        offset = int(params.get("offset", 0))
+        limit = int(params["limit"]) if "limit" in params else None
+    except ValueError:
+        raise ApiError(400, "offset and limit must be integers")
+    if offset < 0 or (limit is not None and limit < 0):
+        raise ApiError(400, "offset and limit must not be negative")
+    return items[offset:offset + limit if limit is not None else None]
+
+
+class Response(NamedTuple):
+    status: int
+    etag: Optional[str]
+    bodies: Dict[str, bytes]    # content coding ("identity", "gzip", "br") -> body
+    content_type: str = "application/json"
+
+
+def _compressed(body: bytes) -> Dict[str, bytes]:
+    bodies = {"identity": body}
+    if len(body) >= COMPRESS_MIN_BYTES:
+        bodies["gzip"] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        if brotli is not None:
+            bodies["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return bodies
+
+
+def json_response(document, status: int = 200) -> Response:
+    body = json.dumps(document, separators=(',', ':'), ensure_ascii=False).encode("utf-8")
+    etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"' if status == 200 else None
+    return Response(status, etag, _compressed(body) if status == 200 else {"identity": body})
+
+
+def _accepted(headers: Dict[str, str]) -> List[str]:
+    accepted = []
+    for part in headers.get("accept-encoding", "").split(","):
+        coding, _, quality = part.strip().partition(";")
+        if quality.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.append(coding.strip().lower())
+    return accepted
+
+
+class ApiServer:
+    """Routes requests against the loaded ApiData and caches encoded responses."""
+
+    def __init__(self, root: str = SCRIPT_DIR, reload_interval: float = RELOAD_INTERVAL):
+        self.root = root
+        self.reload_interval = reload_interval
+        self.data = load_generation(root)
+        self.cache: "OrderedDict[str, Response]" = OrderedDict()
+        self.requests = 0
+
+    # -------------------------------------------------------------- routing
+
+    def route(self, target: str) -> Response:
+        url = urlsplit(target)
+        path = unquote(url.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        data = self.data
+
+        parts = [part for part in path.split("/") if part]
+        if parts[:1] != ["v1"]:
+            return self.static_file(path.lstrip("/"))
+        parts = parts[1:]
+
+        if parts == ["status"]:
+            return json_response(data.status())
+
+        if len(parts) in (2, 3) and parts[0] in SECTION_DATASETS and parts[1] == "sections":
+            dataset = data.sections.get(parts[0])
+            if dataset is None:
+                raise ApiError(404, f"{SECTION_DATASETS[parts[0]]} is not available")
+            if len(parts) == 3:
+                position = dataset.by_id.get(parts[2])
+                if position is None:
+                    raise ApiError(404, f"No section {parts[2]}")
+                return json_response(dataset.sections[position])
+            sections = dataset.query(params)
+            return json_response({
+                "metadata": {"version": dataset.metadata.get('version'), "total": len(sections)},
+                "sections": _page(sections, params)
+            })
+
+        if parts == ["exams"]:
+            if data.exams is None:
+                raise ApiError(404, "exams.json is not available")
+            exams = data.exams.query(params)
+            return json_response({"metadata": {"total": len(exams)}, "exams": _page(exams, params)})
+
+        if parts == ["open-labs"]:
+            return json_response(self.open_labs(params))
+
+        if parts == ["free-rooms"]:
+            dataset = data.sections.get(params.get("dataset", "connect"))
+            if dataset is None or "day" not in params:
+                raise ApiError(400, "free-rooms needs a day (and a loaded dataset)")
+            start, end = _window(params)
+            kind = params.get("kind")
+            if kind not in (None, "lab", "room"):
+                raise ApiError(400, "kind must be lab or room")
+            day = _day(params)
+            rooms = dataset.rooms().free_rooms(day, start, end, kind)
+            return json_response({"metadata": {"total": len(rooms)}, "rooms": rooms})
+
+        raise ApiError(404, f"Unknown endpoint {path}")
+
+    def open_labs(self, params: Dict[str, str]) -> Dict:
+        document = self.data.open_labs
+        if document is None:
+            raise ApiError(404, "open_labs.json is not available")
+        schedule = document.get('schedule', {})
+        if "day" not in params:
+            return document
+        day = params["day"].upper()
+        slots = schedule.get(day)
+        if slots is None:
+            raise ApiError(404, f"No open lab schedule for {params['day']!r}")
+        if "time" in params:
+            try:
+                minute = parse_clock(params["time"])
+            except ValueError as e:
+                raise ApiError(400, str(e))
+            slots = {key: slot for key, slot in slots.items()
+                     if parse_clock(slot['startTime']) <= minute < parse_clock(slot['endTime'])}
+        return {"metadata": document.get('metadata', {}), "day": day, "slots": slots}
+
+    def static_file(self, relative: str) -> Response:
+        """A generated file with its precompressed siblings."""
+        if not STATIC_PATTERN.match(relative) or ".." in relative:
+            raise ApiError(404, f"Unknown endpoint /{relative}")
+        path = os.path.join(self.root, relative)
+        try:
+            with open(path, "rb") as f:
+                bodies = {"identity": f.read()}
+        except FileNotFoundError:
+            raise ApiError(404, f"/{relative} not found")
+        for coding, suffix in (("gzip", ".gz"), ("br", ".br")):
+            try:
+                with open(path + suffix, "rb") as f:
+                    bodies[coding] = f.read()
+            except FileNotFoundError:
+                pass
+        etag = '"' + hashlib.sha1(bodies["identity"]).hexdigest()[:20] + '"'
+        return Response(200, etag, bodies)
+
+    def respond(self, method: str, target: str, headers: Dict[str, str]) -> bytes:
+        """Full HTTP response bytes for one request."""
+        self.requests += 1
+        if method not in ("GET", "HEAD"):
+            return self.encode(json_response({"error": "Only GET and HEAD are supported"}, 405), headers, method)
+
+        response = self.cache.get(target)
+        if response is not None:
+            self.cache.move_to_end(target)
+        else:
+            try:
+                response = self.route(target)
+            except ApiError as e:
+                return self.encode(json_response({"error": str(e)}, e.status), headers, method)
+            self.cache[target] = response
+            if len(self.cache) > CACHE_ENTRIES:
+                self.cache.popitem(last=False)
+        return self.encode(response, headers, method)
+
+    def encode(self, response: Response, headers: Dict[str, str], method: str = "GET") -> bytes:
+        coding = "identity"
+        if len(response.bodies) > 1:
+            accepted = _accepted(headers)
+            coding = next((c for c in ("br", "gzip") if c in response.bodies and c in accepted), "identity")
+        etag = response.etag
+        if etag is not None and coding != "identity":
+            etag = etag[:-1] + "-" + coding + '"'
+
+        status, body = response.status, response.bodies[coding]
+        if etag is not None and etag in [tag.strip().removeprefix("W/") for tag in
+                                         headers.get("if-none-match", "").split(",")]:
+            status, body = 304, b""
+
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, 'OK')}"]
+        if status != 304:
+            lines.append(f"Content-Type: {response.content_type}")
+        lines.append(f"Content-Length: {len(body)}")
+        if etag is not None:
+            lines.append(f"ETag: {etag}")
+            lines.append("Cache-Control: no-cache")
+        if len(response.bodies) > 1:
+            lines.append("Vary: Accept-Encoding")
+        if coding != "identity" and status != 304:
+            lines.append(f"Content-Encoding: {coding}")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        return head if method == "HEAD" or status == 304 else head + body
+
+    # -------------------------------------------------------------- reload
+
+    def reload_if_changed(self) -> bool:
+        """Swap in a freshly loaded generation when the published files changed.
+
+        Returns False (keeping the current generation) while a publish is
+        still being applied.
+        """
+        if data_signature(self.root) == self.data.signature or publish_in_progress(self.root):
+            return False
+        self.data = load_generation(self.root)
+        self.cache.clear()
+        return True
+
+    async def watch_for_reload(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            if data_signature(self.root) == self.data.signature or publish_in_progress(self.root):
+                continue
+            try:
+                # Parse and index in a worker thread; requests keep using the old data
+                data = await loop.run_in_executor(None, load_generation, self.root)
+            except Exception as e:
+                print(f"⚠️  Reload failed, keeping generation {self.data.generation}: {e}")
+                continue
+            self.data = data
+            self.cache.clear()
+            print(f"✓ Reloaded generation {data.generation}")
+
+    # -------------------------------------------------------------- HTTP
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    writer.write(self.encode(json_response({"error": "Malformed request"}, 400), {}))
+                    break
+                if headers.get("content-length"):
+                    await reader.readexactly(int(headers["content-length"]))
+
+                writer.write(self.respond(method, target, headers))
+                keep_alive = (version == "HTTP/1.1" and headers.get("connection", "").lower() != "close") or \
+                    headers.get("connection", "").lower() == "keep-alive"
+                if not keep_alive:
+                    break
+                await writer.drain()
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> None:
+        server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        reloader = asyncio.create_task(self.watch_for_reload())
+        address = server.sockets[0].getsockname()
+        print(f"✓ Serving generation {self.data.generation} on http://{address[0]}:{address[1]}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            reloader.cancel()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve filtered queries over the generated data.")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--root', default=SCRIPT_DIR, help="directory with the generated files")
+    parser.add_argument('--reload-interval', type=float, default=RELOAD_INTERVAL, help="seconds (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    server = ApiServer(args.root, args.reload_interval)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""
+CDN Artifact Writer
+Encodes JSON payloads once and reuses the encoded bytes for every published
+file (pretty .json and compact .json.gz), reporting encode/compress timings.
+Artifacts whose canonical content hash is unchanged since the last run are
+left untouched on disk.
+
+Published artifacts also get pre-compressed .br and .zst siblings when the
+optional brotli / zstandard packages are installed. A zstd dictionary can be
+trained from the semester backups (the backup_store/ snapshots plus any
+backups/*.json the store does not hold):
+
+    python artifacts.py train-zstd-dict
+
+A writer that compresses with the dictionary publishes it in the same run as
+zstd_dicts/<dictionary id>.dict. Every .zst frame header records the id it
+needs, and published dictionaries are never removed, so files written
+before a retrain stay decodable.
+"""
+
+import glob
+import gzip
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import staging
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install zstandard
+    zstandard = None
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+HASHES_FILE = os.path.join(SCRIPT_DIR, "content_hashes.json")
+BACKUPS_DIR = os.path.join(SCRIPT_DIR, "backups")
+BACKUP_STORE_DIR = os.path.join(SCRIPT_DIR, "backup_store")
+ZSTD_DICT_FILE = os.path.join(SCRIPT_DIR, "connect.zstd-dict")
+ZSTD_DICTS_DIR = os.path.join(SCRIPT_DIR, staging.ZSTD_DICTS_NAME)
+
+# Brotli 11 costs ~6 s on the 2.4 MB compact connect payload for ~5% over 10
+BROTLI_QUALITY = 11
+BROTLI_LARGE_QUALITY = 10
+BROTLI_LARGE_THRESHOLD = 1024 * 1024
+BROTLI_WINDOW = 24
+ZSTD_LEVEL = 19
+ZSTD_DICT_SIZE = 112 * 1024
+
+# .gz output is byte-for-byte reproducible: fixed level and a zero header mtime.
+# Payloads above the threshold are compressed in independent blocks on a
+# thread pool (zlib releases the GIL), pigz-style.
+GZIP_LEVEL = 9
+PARALLEL_GZIP_THRESHOLD = 1024 * 1024
+GZIP_BLOCK_SIZE = 128 * 1024
+GZIP_DICT_SIZE = 32 * 1024
+
+
+class EncodedJson:
+    """Pretty (indent=2) and compact UTF-8 encodings of one JSON value."""
+
+    __slots__ = ("pretty", "compact")
+
+    def __init__(self, pretty: bytes, compact: bytes):
+        self.pretty = pretty
+        self.compact = compact
+
+
+def encode_json(value) -> EncodedJson:
+    """Encode a value exactly like json.dump(indent=2) and the compact gzip form."""
+    pretty = json.dumps(value, indent=2, ensure_ascii=False).encode("utf-8")
+    compact = json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode("utf-8")
+    return EncodedJson(pretty, compact)
+
+
+def encode_document(fields: Dict[str, EncodedJson]) -> EncodedJson:
+    """Splice pre-encoded values into a top-level object without re-encoding them.
+
+    The result is byte-identical to json.dumps() of the equivalent dict. JSON
+    strings never contain raw newlines, so re-indenting a nested pretty value
+    only needs every newline shifted by one indentation level.
+    """
+    if not fields:
+        return EncodedJson(b"{}", b"{}")
+
+    pretty_parts = []
+    compact_parts = []
+    for key, encoded in fields.items():
+        name = json.dumps(key, ensure_ascii=False).encode("utf-8")
+        pretty_parts.append(b"  " + name + b": " + encoded.pretty.replace(b"\n", b"\n  "))
+        compact_parts.append(name + b":" + encoded.compact)
+
+    pretty = b"{\n" + b",\n".join(pretty_parts) + b"\n}"
+    compact = b"{" + b",".join(compact_parts) + b"}"
+    return EncodedJson(pretty, compact)
+
+
+def available_variants() -> Tuple[str, ...]:
+    """Extra compressed variants (besides .gz) whose encoder is installed."""
+    return tuple(kind for kind, module in (("br", brotli), ("zst", zstandard)) if module is not None)
+
+
+def _deflate_block(data: bytes, start: int, end: int, level: int) -> bytes:
+    """Raw-deflate data[start:end], primed with the preceding 32 KiB.
+
+    Blocks other than the last end on a sync flush (byte-aligned, no final
+    bit), so the compressed blocks concatenate into one deflate stream.
+    """
+    if start:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, 9, zlib.Z_DEFAULT_STRATEGY,
+                                      data[max(0, start - GZIP_DICT_SIZE):start])
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, 9)
+    last = end >= len(data)
+    return compressor.compress(data[start:end]) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def gzip_compress(data: bytes, level: int = GZIP_LEVEL, workers: Optional[int] = None) -> bytes:
+    """Deterministic gzip: the same input always yields the same bytes.
+
+    Small payloads use gzip.compress with mtime=0. Larger ones are split into
+    fixed-size blocks deflated in parallel; the block layout does not depend
+    on the worker count, so neither does the output.
+    """
+    if len(data) < PARALLEL_GZIP_THRESHOLD:
+        return gzip.compress(data, compresslevel=level, mtime=0)
+
+    offsets = range(0, len(data), GZIP_BLOCK_SIZE)
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        blocks = list(pool.map(lambda start: _deflate_block(data, start, start + GZIP_BLOCK_SIZE, level), offsets))
+
+    # Header: magic, deflate, no flags, mtime 0, XFL 2 (max compression), OS unknown
+    header = b"\x1f\x8b\x08\x00" + struct.pack("<I", 0) + (b"\x02" if level == 9 else b"\x00") + b"\xff"
+    trailer = struct.pack("<II", zlib.crc32(data), len(data) & 0xFFFFFFFF)
+    return header + b"".join(blocks) + trailer
+
+
+def compress_bytes(kind: str, data: bytes, zstd_dictionary=None) -> bytes:
+    """Compress data as a .gz, .br or .zst variant at the tuned level."""
+    if kind == "gz":
+        return gzip_compress(data)
+    if kind == "br":
+        quality = BROTLI_QUALITY if len(data) <= BROTLI_LARGE_THRESHOLD else BROTLI_LARGE_QUALITY
+        return brotli.compress(data, quality=quality, lgwin=BROTLI_WINDOW)
+    if kind == "zst":
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, write_checksum=True, dict_data=zstd_dictionary)
+        return compressor.compress(data)
+    raise ValueError(f"Unknown compression variant {kind!r}")
+
+
+def train_zstd_dictionary(backups_dir: str = BACKUPS_DIR, output_path: str = ZSTD_DICT_FILE,
+                          dict_size: int = ZSTD_DICT_SIZE, store_dir: str = BACKUP_STORE_DIR) -> int:
+    """Train a zstd dictionary from the sections of every semester backup.
+
+    Each semester's latest backup_store snapshot is used; backups/*.json
+    only fill in semesters the store does not hold. Sections repeat the
+    same keys, rooms, times and faculty codes across semesters, so a shared
+    dictionary mostly helps small artifacts (shards, deltas, metadata).
+    Returns the dictionary id.
+    """
+    from backup_store import BackupStore  # backup_store imports this module
+
+    if zstandard is None:
+        raise RuntimeError("zstandard is not installed (pip install zstandard)")
+
+    backups = {}
+    store = BackupStore(store_dir)
+    for semester in store.semesters():
+        backups[semester] = store.load(semester)
+    for path in sorted(glob.glob(os.path.join(backups_dir, "*.json"))):
+        semester = os.path.splitext(os.path.basename(path))[0].lower()
+        if semester not in backups:
+            with open(path, "r", encoding="utf-8") as f:
+                backups[semester] = json.load(f)
+
+    samples = [
+        json.dumps(section, separators=(',', ':'), ensure_ascii=False).encode("utf-8")
+        for semester in sorted(backups)
+        for section in backups[semester].get("sections", [])
+    ]
+    if not samples:
+        raise ValueError(f"No backup sections found in {store_dir} or {backups_dir}")
+
+    dictionary = zstandard.train_dictionary(dict_size, samples, level=ZSTD_LEVEL)
+    with open(output_path, "wb") as f:
+        f.write(dictionary.as_bytes())
+    return dictionary.dict_id()
+
+
+def load_zstd_dictionary(path: str = ZSTD_DICT_FILE):
+    """Load a trained dictionary, or None when zstandard or the file is missing."""
+    if zstandard is None or not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return zstandard.ZstdCompressionDict(f.read())
+
+
+def content_hash(value) -> str:
+    """Canonical SHA-256 of a JSON value (sorted keys, compact separators)."""
+    canonical = json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def document_hash(document: Dict, volatile: Tuple[str, ...] = ("lastUpdated",)) -> str:
+    """Content hash of a {metadata, ...} document ignoring run-specific metadata keys."""
+    stable = dict(document)
+    if isinstance(stable.get("metadata"), dict):
+        stable["metadata"] = {k: v for k, v in stable["metadata"].items() if k not in volatile}
+    return content_hash(stable)
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file's bytes (as a client downloading it would compute)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ContentHashes:
+    """Persisted content hashes of the sections and each derived artifact."""
+
+    def __init__(self, path: str = HASHES_FILE):
+        self.path = path
+        self.hashes: Dict[str, str] = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                stored = json.load(f).get("hashes", {})
+            if isinstance(stored, dict):
+                self.hashes = stored
+        except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+            pass
+
+    def get(self, name: str) -> Optional[str]:
+        return self.hashes.get(name)
+
+    def set(self, name: str, digest: str) -> None:
+        self.hashes[name] = digest
+
+    def save(self) -> None:
+        with open(staging.path_for(self.path), "w", encoding="utf-8") as f:
+            json.dump({"schemaVersion": 1, "hashes": dict(sorted(self.hashes.items()))}, f, indent=2)
+            f.write("\n")
+
+
+class ArtifactWriter:
+    """Shared writer for every JSON artifact produced by one update run.
+
+    Large values (the sections list) are encoded once via encode() and reused
+    by every document that embeds them; identical compact payloads (e.g.
+    connect.json and stable.json on the same semester) are gzipped once.
+    When a ContentHashes store is attached, write() skips artifacts whose
+    content hash matches the previous run. variants selects the extra
+    compressed siblings (default: every installed encoder); a zstd
+    dictionary, when given, is used for the .zst variant and published
+    under zstd_dicts/.
+    """
+
+    def __init__(self, hashes: Optional[ContentHashes] = None, variants: Optional[Tuple[str, ...]] = None,
+                 zstd_dictionary=None):
+        self.hashes = hashes
+        self.variants = available_variants() if variants is None else tuple(variants)
+        self.zstd_dictionary = zstd_dictionary
+        self.timings: List[Dict] = []
+        self._encoded: Dict[str, tuple] = {}
+        self._compressed: Dict[tuple, bytes] = {}
+        self._dictionary_published = False
+
+    def encode(self, name: str, value) -> EncodedJson:
+        """Encode a shared value once; later calls with the same object are free."""
+        cached = self._encoded.get(name)
+        if cached is not None and cached[0] is value:
+            return cached[1]
+
+        start = time.perf_counter()
+        encoded = encode_json(value)
+        self.timings.append({
+            "artifact": f"<{name}>",
+            "encodeMs": _elapsed_ms(start),
+            "compressMs": 0.0,
+            "bytes": len(encoded.pretty),
+            "gzipBytes": None,
+            "skipped": False,
+        })
+        # Keep a reference to the value so its id cannot be reused while cached
+        self._encoded[name] = (value, encoded)
+        return encoded
+
+    def document(self, **fields) -> EncodedJson:
+        """Build a top-level object from raw values or already encoded ones."""
+        return encode_document({
+            key: value if isinstance(value, EncodedJson) else encode_json(value)
+            for key, value in fields.items()
+        })
+
+    def _variants_for(self, gzip_copy: bool, extra_variants: bool) -> Tuple[str, ...]:
+        if not gzip_copy:
+            return ()
+        return ("gz",) + (self.variants if extra_variants else ())
+
+    def _digest(self, digest: Optional[str], kinds: Tuple[str, ...]) -> Optional[str]:
+        """Content hash of an artifact including the dictionary its .zst variant needs."""
+        if digest is None or self.zstd_dictionary is None or "zst" not in kinds:
+            return digest
+        return f"{digest}:zstd-dict-{self.zstd_dictionary.dict_id()}"
+
+    def _publish_dictionary(self) -> None:
+        """Publish the dictionary the .zst variants are compressed with (once per writer)."""
+        if self._dictionary_published:
+            return
+        path = os.path.join(ZSTD_DICTS_DIR, f"{self.zstd_dictionary.dict_id()}.dict")
+        if not os.path.exists(staging.resolve(path)):
+            target = staging.path_for(path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                f.write(self.zstd_dictionary.as_bytes())
+        self._dictionary_published = True
+
+    def is_unchanged(self, path: str, digest: Optional[str], gzip_copy: bool = True,
+                     extra_variants: bool = True) -> bool:
+        """True when path (and its compressed siblings) exist and were written from the same content."""
+        if digest is None or self.hashes is None:
+            return False
+        if self.hashes.get(_artifact_name(path)) != self._digest(digest, self._variants_for(gzip_copy, extra_variants)):
+            return False
+        return os.path.exists(path) and all(
+            os.path.exists(f"{path}.{kind}") for kind in self._variants_for(gzip_copy, extra_variants))
+
+    def write(self, path: str, document, gzip_copy: bool = True, content_hash: Optional[str] = None,
+              quiet: bool = False, extra_variants: bool = True, compact: bool = False) -> Dict:
+        """Write path (pretty) and optionally path.gz (compact) from one encoding.
+
+        compact=True writes the compact encoding to path as well, for
+        machine-oriented artifacts where indentation would dominate the size.
+
+        With gzip_copy, the .br/.zst variants are written too unless
+        extra_variants is False (used for shards and deltas). With
+        content_hash set, an artifact whose hash matches the stored one is
+        not re-encoded, rewritten or re-compressed.
+        """
+        name = _artifact_name(path)
+        kinds = self._variants_for(gzip_copy, extra_variants)
+        if self.is_unchanged(path, content_hash, gzip_copy, extra_variants):
+            variants = {kind: {"bytes": os.path.getsize(f"{path}.{kind}"), "ms": 0.0} for kind in kinds}
+            stats = {
+                "artifact": name,
+                "encodeMs": 0.0,
+                "compressMs": 0.0,
+                "bytes": os.path.getsize(path),
+                "gzipBytes": variants["gz"]["bytes"] if gzip_copy else None,
+                "variants": variants,
+                "skipped": True,
+            }
+            self.timings.append(stats)
+            if not quiet:
+                print(f"  = {name} unchanged (content hash match), not rewritten")
+            return stats
+
+        start = time.perf_counter()
+        encoded = document if isinstance(document, EncodedJson) else encode_json(document)
+        encode_ms = _elapsed_ms(start)
+
+        body = encoded.compact if compact else encoded.pretty
+        with open(staging.path_for(path), "wb") as f:
+            f.write(body)
+
+        if self.zstd_dictionary is not None and "zst" in kinds:
+            self._publish_dictionary()
+
+        variants = {}
+        for kind in kinds:
+            start = time.perf_counter()
+            compressed = self._compress(kind, encoded.compact)
+            variants[kind] = {"bytes": len(compressed), "ms": _elapsed_ms(start)}
+            with open(staging.path_for(f"{path}.{kind}"), "wb") as f:
+                f.write(compressed)
+
+        if content_hash is not None and self.hashes is not None:
+            self.hashes.set(name, self._digest(content_hash, kinds))
+
+        stats = {
+            "artifact": name,
+            "encodeMs": encode_ms,
+            "compressMs": round(sum(v["ms"] for v in variants.values()), 2),
+            "bytes": len(body),
+            "sha256": hashlib.sha256(body).hexdigest(),
+            "gzipBytes": variants["gz"]["bytes"] if gzip_copy else None,
+            "variants": variants,
+            "skipped": False,
+        }
+        self.timings.append(stats)
+        return stats
+
+    def _compress(self, kind: str, data: bytes) -> bytes:
+        key = (kind, hashlib.sha1(data).digest())
+        compressed = self._compressed.get(key)
+        if compressed is None:
+            compressed = compress_bytes(kind, data, self.zstd_dictionary if kind == "zst" else None)
+            self._compressed[key] = compressed
+        return compressed
+
+    def report(self) -> None:
+        """Print per-artifact encode/compress timings.
+
+        Directories with many small artifacts (shards) are summarized in one row.
+        """
+        if not self.timings:
+            return
+
+        print(f"\n{'Artifact':<32} {'Encode ms':>10} {'Compress ms':>12} {'Size KB':>10} {'Gzip KB':>10}")
+        for entry in _group_timings(self.timings):
+            gzip_kb = f"{entry['gzipBytes'] / 1024:.1f}" if entry["gzipBytes"] is not None else "-"
+            label = entry["artifact"] + (" (unchanged)" if entry.get("skipped") else "")
+            print(f"{label:<32} {entry['encodeMs']:>10.1f} {entry['compressMs']:>12.1f} "
+                  f"{entry['bytes'] / 1024:>10.1f} {gzip_kb:>10}")
+
+        total_encode = sum(entry["encodeMs"] for entry in self.timings)
+        total_compress = sum(entry["compressMs"] for entry in self.timings)
+        print(f"{'Total':<32} {total_encode:>10.1f} {total_compress:>12.1f}")
+
+        self.compression_report()
+
+    def compression_report(self) -> None:
+        """Print size, ratio (vs. the pretty JSON) and encode time per compressed variant."""
+        rows = [entry for entry in self.timings
+                if len(entry.get("variants", {})) > 1 and not entry.get("skipped")]
+        if not rows:
+            return
+
+        print(f"\n{'Artifact':<32} {'Variant':>8} {'KB':>10} {'Ratio':>8} {'ms':>10}")
+        for entry in rows:
+            for kind, variant in entry["variants"].items():
+                ratio = variant["bytes"] / entry["bytes"] * 100 if entry["bytes"] else 0
+                print(f"{entry['artifact']:<32} {kind:>8} {variant['bytes'] / 1024:>10.1f} "
+                      f"{ratio:>7.1f}% {variant['ms']:>10.1f}")
+
+
+def _group_timings(timings: List[Dict], threshold: int = 5) -> List[Dict]:
+    """Collapse directories holding more than threshold artifacts into one summary row."""
+    per_dir: Dict[str, List[Dict]] = {}
+    for entry in timings:
+        directory = os.path.dirname(entry["artifact"])
+        if directory:
+            per_dir.setdefault(directory, []).append(entry)
+
+    grouped = []
+    emitted = set()
+    for entry in timings:
+        directory = os.path.dirname(entry["artifact"])
+        if len(per_dir.get(directory, [])) <= threshold:
+            grouped.append(entry)
+            continue
+        if directory in emitted:
+            continue
+        emitted.add(directory)
+        entries = per_dir[directory]
+        written = [e for e in entries if not e.get("skipped")]
+        grouped.append({
+            "artifact": f"{directory}/* ({len(written)}/{len(entries)} written)",
+            "encodeMs": sum(e["encodeMs"] for e in entries),
+            "compressMs": sum(e["compressMs"] for e in entries),
+            "bytes": sum(e["bytes"] for e in entries),
+            "gzipBytes": sum(e["gzipBytes"] or 0 for e in entries),
+            "skipped": False,
+        })
+    return grouped
+
+
+def _artifact_name(path: str) -> str:
+    return os.path.relpath(os.path.abspath(path), SCRIPT_DIR)
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["train-zstd-dict"]:
+        print("Usage: python artifacts.py train-zstd-dict")
+        sys.exit(2)
+    dict_id = train_zstd_dictionary()
+    size = os.path.getsize(ZSTD_DICT_FILE) / 1024
+    print(f"✓ {os.path.basename(ZSTD_DICT_FILE)} trained from the semester backups (id {dict_id}, {size:.1f} KB)")
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Backup Store - Compressed, deduplicated history of semester backups
+Each semester lives in backup_store/<semester>/:
+
+    objects.gz    unique sections, one "<content hash> <compact json>" line each
+    snapshots.gz  one JSON line per stored run: metadata plus the positions
+                  of its sections in objects.gz
+
+Both files are sequences of gzip members that are only ever appended to, so
+a daily run adds the handful of sections that changed plus one small
+manifest instead of rewriting a multi-MB file, and git stores each version
+as a tiny delta. The public backups/<semester>.json is reconstructed from
+the latest snapshot.
+
+Usage:
+    python backup_store.py import             # ingest existing backups/*.json
+    python backup_store.py list
+    python backup_store.py restore fall2025 [--snapshot N] [--output PATH]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import staging
+from artifacts import ArtifactWriter, content_hash
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_DIR = os.path.join(SCRIPT_DIR, "backup_store")
+BACKUPS_DIR = os.path.join(SCRIPT_DIR, "backups")
+
+# Metadata keys that change on every run without the backup changing
+VOLATILE_METADATA = ("lastUpdated", "version")
+
+
+def _read_members(path: str) -> Tuple[List[bytes], int]:
+    """Decompress every complete gzip member; returns (members, end offset of the last one)."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return [], 0
+
+    members = []
+    offset = 0
+    while offset < len(data):
+        decompressor = zlib.decompressobj(wbits=31)
+        try:
+            member = decompressor.decompress(data[offset:])
+        except zlib.error:
+            break
+        if not decompressor.eof:
+            break  # truncated by an interrupted run
+        members.append(member)
+        offset = len(data) - len(decompressor.unused_data)
+    return members, offset
+
+
+def _append_member(path: str, payload: bytes, valid_end: int) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "ab") as f:
+        if f.tell() != valid_end:
+            f.truncate(valid_end)
+        f.write(gzip.compress(payload, compresslevel=9, mtime=0))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _stable_metadata(metadata: Dict) -> Dict:
+    return {key: value for key, value in metadata.items() if key not in VOLATILE_METADATA}
+
+
+class BackupStore:
+    """Content-addressed storage of semester backup snapshots."""
+
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+
+    def _paths(self, semester: str) -> Tuple[str, str]:
+        directory = os.path.join(self.root, semester.lower())
+        return os.path.join(directory, "objects.gz"), os.path.join(directory, "snapshots.gz")
+
+    def semesters(self) -> List[str]:
+        return sorted(os.path.basename(os.path.dirname(path))
+                      for path in staging.listing(self.root, os.path.join("*", "snapshots.gz")))
+
+    def _objects(self, semester: str) -> Tuple[List[str], int]:
+        """(compact JSON of every stored section, valid end offset of objects.gz)."""
+        members, end = _read_members(staging.resolve(self._paths(semester)[0]))
+        lines = [line for member in members for line in member.decode("utf-8").splitlines()]
+        return lines, end
+
+    def snapshots(self, semester: str) -> List[Dict]:
+        """Stored manifests, oldest first ({"snapshot", "storedAt", "metadata", "sections"})."""
+        members, _ = _read_members(staging.resolve(self._paths(semester)[1]))
+        return [json.loads(member) for member in members]
+
+    def put(self, semester: str, metadata: Dict, sections: List[Dict]) -> bool:
+        """Store a snapshot; returns False when it matches the latest one.
+
+        During a staged run the appends go to staged copies of the files.
+        """
+        objects_path, snapshots_path = self._paths(semester)
+
+        lines, objects_end = self._objects(semester)
+        positions = {line.split(" ", 1)[0]: index for index, line in enumerate(lines)}
+
+        new_lines = []
+        refs = []
+        for section in sections:
+            digest = content_hash(section)
+            position = positions.get(digest)
+            if position is None:
+                position = positions[digest] = len(lines) + len(new_lines)
+                new_lines.append(digest + " " + json.dumps(section, separators=(',', ':'), ensure_ascii=False))
+            refs.append(position)
+
+        snapshots_members, snapshots_end = _read_members(staging.resolve(snapshots_path))
+        if snapshots_members:
+            latest = json.loads(snapshots_members[-1])
+            if latest["sections"] == refs and _stable_metadata(latest["metadata"]) == _stable_metadata(metadata):
+                return False
+
+        # Objects first: a crash before the manifest only leaves unreferenced sections
+        if new_lines:
+            _append_member(staging.path_for_append(objects_path), ("\n".join(new_lines) + "\n").encode("utf-8"), objects_end)
+        manifest = {
+            "snapshot": len(snapshots_members),
+            "storedAt": datetime.now(timezone.utc).isoformat(),
+            "metadata": metadata,
+            "sections": refs,
+        }
+        _append_member(staging.path_for_append(snapshots_path), json.dumps(manifest, separators=(',', ':'), ensure_ascii=False).encode("utf-8"),
+                       snapshots_end)
+        return True
+
+    def load(self, semester: str, snapshot: int = -1) -> Dict:
+        """Reconstruct the public backup document ({"metadata", "sections"}) of a snapshot."""
+        snapshots = self.snapshots(semester)
+        if not snapshots:
+            raise KeyError(f"No stored backups for {semester!r}")
+        manifest = snapshots[snapshot]
+
+        lines, _ = self._objects(semester)
+        sections = [json.loads(lines[position].split(" ", 1)[1]) for position in manifest["sections"]]
+        return {"metadata": manifest["metadata"], "sections": sections}
+
+    def publish(self, semester: str, output_path: str, writer: Optional[ArtifactWriter] = None,
+                snapshot: int = -1) -> Dict:
+        """Write the CDN-facing backups/<semester>.json from a stored snapshot."""
+        writer = writer or ArtifactWriter()
+        return writer.write(output_path, self.load(semester, snapshot), gzip_copy=False, compact=True)
+
+    def size(self, semester: str) -> int:
+        paths = [staging.resolve(path) for path in self._paths(semester)]
+        return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+
+def import_backups(store: BackupStore, backups_dir: str = BACKUPS_DIR) -> None:
+    """Ingest every backups/<semester>.json into the store."""
+    for filename in sorted(os.listdir(backups_dir)):
+        if not filename.endswith(".json"):
+            continue
+        with open(os.path.join(backups_dir, filename), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        semester = os.path.splitext(filename)[0]
+        stored = store.put(semester, data["metadata"], data["sections"])
+        state = "stored" if stored else "unchanged"
+        print(f"  ✓ {semester}: {state} ({store.size(semester) / 1024:.1f} KB in store)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Manage the deduplicated semester backup store.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('import', help="ingest backups/*.json")
+    commands.add_parser('list', help="list semesters and snapshots")
+    restore = commands.add_parser('restore', help="rebuild a backup JSON from the store")
+    restore.add_argument('semester')
+    restore.add_argument('--snapshot', type=int, default=-1)
+    restore.add_argument('--output', help="default: backups/<semester>.json")
+    args = parser.parse_args(argv)
+
+    store = BackupStore()
+    if args.command == 'import':
+        import_backups(store)
+    elif args.command == 'list':
+        for semester in store.semesters():
+            snapshots = store.snapshots(semester)
+            print(f"{semester}: {len(snapshots)} snapshot(s), latest {snapshots[-1]['storedAt']}, "
+                  f"{store.size(semester) / 1024:.1f} KB")
+    else:
+        output = args.output or os.path.join(BACKUPS_DIR, f"{args.semester.lower()}.json")
+        try:
+            stats = store.publish(args.semester, output, snapshot=args.snapshot)
+        except (KeyError, IndexError) as error:
+            print(f"✗ {error}")
+            return 1
+        print(f"✓ {output} restored ({stats['bytes'] / 1024:.1f} KB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
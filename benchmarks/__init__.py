@@ -0,0 +1 @@
+"""Benchmark suite for the CDN update pipeline (python -m benchmarks.run)."""
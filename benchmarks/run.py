@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmarks - Replays recorded payloads through each update stage
+Every stage runs in its own subprocess against a scratch copy of the
+repository, so wall time, peak RSS and bytes written are measured per stage
+and nothing in the working tree is touched. Upstream URLs are served by a
+local HTTP stand-in.
+
+Datasets:
+    current       connect.json as recorded in the repository
+    synthetic10x  the same catalog replicated 10x with distinct ids/courses
+
+Results are written to benchmarks/results/<timestamp>-<commit>.json.
+
+Usage:
+    python -m benchmarks.run [--dataset current] [--stage exams] [--repeat 3]
+    python -m benchmarks.run --compare benchmarks/results/OLD.json [NEW.json]
+"""
+
+import argparse
+import contextlib
+import copy
+import gzip
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from unittest import mock
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+PAYLOAD_FILE = "bench_connect.json"
+SYNTHETIC_FACTOR = 10
+
+# Scratch copies skip VCS data, caches and earlier results
+COPY_IGNORE = shutil.ignore_patterns(".git", "__pycache__", ".pytest_cache", ".http_cache", "results")
+
+
+# ---------------------------------------------------------------- datasets
+
+def synthetic_catalog(sections: List[Dict], factor: int = SYNTHETIC_FACTOR) -> List[Dict]:
+    """Replicate a catalog factor times; copies get new sectionIds and course codes."""
+    id_step = 10 ** (len(str(max((s['sectionId'] for s in sections), default=0))) + 1)
+    result = []
+    for copy_index in range(factor):
+        for section in sections:
+            clone = copy.deepcopy(section) if copy_index else section
+            if copy_index:
+                clone['sectionId'] = section['sectionId'] + copy_index * id_step
+                clone['courseCode'] = f"{section.get('courseCode', '')}X{copy_index}"
+            result.append(clone)
+    return result
+
+
+DATASETS: Dict[str, Callable[[List[Dict]], List[Dict]]] = {
+    "current": lambda sections: sections,
+    "synthetic10x": synthetic_catalog,
+}
+
+
+# ---------------------------------------------------------------- stages
+# Each stage takes the context prepared in the child process and runs the
+# code under test; setup work belongs in the context, not in the stage.
+
+def _stage_fetch(ctx):
+    ctx.update_cdn.fetch_mrz_data(force=True, url=ctx.base_url + "/connect.json")
+
+
+def _stage_fetch_stream(ctx):
+    ctx.update_cdn.fetch_mrz_data(force=True, stream=True, url=ctx.base_url + "/connect.json")
+
+
+def _stage_metadata(ctx):
+    ctx.update_cdn.calculate_connect_metadata(ctx.sections)
+
+
+def _stage_exams(ctx):
+    ctx.update_cdn.generate_exams_json(ctx.sections, writer=ctx.artifacts.ArtifactWriter())
+
+
+def _stage_exam_overlay(ctx):
+    import exam_overlay
+    exams = [{"courseCode": s.get('courseCode'), "sectionName": s.get('sectionName'),
+              "midExamDate": "2026-11-07", "finalExamDate": "2027-01-10"} for s in ctx.sections]
+    # Official exports drop the zero padding ("1" for "01"), as the PDFs do
+    rows = [{"Course": e["courseCode"], "Section": str(e["sectionName"]).lstrip("0"), "Mid Date": "2026-11-09",
+             "Final Date": "2027-01-12", "Start Time": "10:00", "End Time": "11:30"} for e in exams]
+    overlays = {"midterm": {"exams": rows}, "final": {"exams": rows}}
+    ctx.measure(lambda: exam_overlay.join_overlays(exams, overlays))
+
+
+def _stage_free_slots(ctx):
+    import generate_free_labs
+    occupancy, departments = generate_free_labs.analyze_lab_usage(ctx.sections)
+    generate_free_labs.find_free_slots(occupancy, departments)
+
+
+def _stage_open_labs(ctx):
+    import generate_free_labs
+    with mock.patch.object(generate_free_labs, "TABLE_URL", ctx.base_url + "/table.json"):
+        generate_free_labs.generate_free_labs_json(ctx.artifacts.ArtifactWriter(), force=True)
+
+
+def _stage_backup_index(ctx):
+    import generate_backup_index
+    generate_backup_index.generate_backup_index(ctx.artifacts.ArtifactWriter())
+
+
+def _stage_publish(ctx):
+    writer = ctx.artifacts.ArtifactWriter(ctx.artifacts.ContentHashes())
+    ctx.update_cdn.publish_sections(ctx.sections, writer)
+
+
+STAGES: Dict[str, Callable] = {
+    "fetch": _stage_fetch,
+    "fetch_stream": _stage_fetch_stream,
+    "metadata": _stage_metadata,
+    "exams": _stage_exams,
+    "exam_overlay": _stage_exam_overlay,
+    "free_slots": _stage_free_slots,
+    "open_labs": _stage_open_labs,
+    "backup_index": _stage_backup_index,
+    "publish": _stage_publish,
+}
+
+
+# ---------------------------------------------------------------- child side
+
+def _file_states(root: str) -> Dict[str, tuple]:
+    states = {}
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d != "__pycache__"]
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            stat = os.stat(path)
+            states[path] = (stat.st_size, stat.st_mtime_ns)
+    return states
+
+
+class _Context:
+    def __init__(self, workdir: str, base_url: str):
+        import artifacts
+        import update_cdn
+        self.artifacts = artifacts
+        self.update_cdn = update_cdn
+        self.base_url = base_url
+        with open(os.path.join(workdir, PAYLOAD_FILE), "r", encoding="utf-8") as f:
+            self.sections = json.load(f)
+        self.timed: Optional[Callable] = None
+
+    def measure(self, func: Callable) -> None:
+        """Time only func instead of the whole stage (for stages with setup)."""
+        self.timed = func
+
+
+def run_stage_in_process(stage: str, workdir: str, base_url: str) -> Dict:
+    """Run one stage inside the current (child) process and measure it."""
+    sys.path.insert(0, workdir)
+    os.chdir(workdir)
+    ctx = _Context(workdir, base_url)
+
+    before = _file_states(workdir)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        start = time.perf_counter()
+        STAGES[stage](ctx)
+        if ctx.timed is not None:
+            start = time.perf_counter()
+            ctx.timed()
+        wall_ms = (time.perf_counter() - start) * 1000
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    after = _file_states(workdir)
+
+    written = sum(state[0] for path, state in after.items() if before.get(path) != state)
+    return {
+        "wallMs": round(wall_ms, 2),
+        "peakRssKB": rss_peak,
+        "baselineRssKB": rss_before,
+        "bytesWritten": written,
+        "filesWritten": sum(1 for path, state in after.items() if before.get(path) != state),
+    }
+
+
+# ---------------------------------------------------------------- parent side
+
+def serve_upstream(workdir: str) -> ThreadingHTTPServer:
+    """Local stand-in for usis-cdn: /connect.json and /table.json serve the dataset (gzip)."""
+    with open(os.path.join(workdir, PAYLOAD_FILE), "rb") as f:
+        body = gzip.compress(f.read(), mtime=0)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in ("/connect.json", "/table.json"):
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    return server
+
+
+def prepare_workdir(dataset: str, parent: str) -> str:
+    workdir = os.path.join(parent, dataset)
+    shutil.copytree(REPO_DIR, workdir, ignore=COPY_IGNORE)
+    with open(os.path.join(REPO_DIR, "connect.json"), "r", encoding="utf-8") as f:
+        sections = json.load(f)["sections"]
+    with open(os.path.join(workdir, PAYLOAD_FILE), "w", encoding="utf-8") as f:
+        json.dump(DATASETS[dataset](sections), f, separators=(',', ':'), ensure_ascii=False)
+    return workdir
+
+
+def run_stage(stage: str, dataset_dir: str, base_url: str) -> Dict:
+    """Run a stage in a fresh subprocess on a throwaway copy of the dataset dir."""
+    with tempfile.TemporaryDirectory() as scratch:
+        workdir = os.path.join(scratch, "tree")
+        shutil.copytree(dataset_dir, workdir)
+        command = [sys.executable, "-m", "benchmarks.run", "--child", stage, workdir, base_url]
+        completed = subprocess.run(command, cwd=REPO_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"stage {stage} failed:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(datasets: List[str], stages: List[str], repeat: int) -> Dict:
+    results = []
+    dataset_info = {}
+    with tempfile.TemporaryDirectory() as parent:
+        for dataset in datasets:
+            dataset_dir = prepare_workdir(dataset, parent)
+            payload_size = os.path.getsize(os.path.join(dataset_dir, PAYLOAD_FILE))
+            with open(os.path.join(dataset_dir, PAYLOAD_FILE), "r", encoding="utf-8") as f:
+                dataset_info[dataset] = {"sections": len(json.load(f)), "payloadBytes": payload_size}
+
+            server = serve_upstream(dataset_dir)
+            base_url = f"http://127.0.0.1:{server.server_address[1]}"
+            try:
+                for stage in stages:
+                    runs = [run_stage(stage, dataset_dir, base_url) for _ in range(repeat)]
+                    entry = {
+                        "stage": stage,
+                        "dataset": dataset,
+                        "wallMs": round(statistics.median(run["wallMs"] for run in runs), 2),
+                        "wallMsRuns": [run["wallMs"] for run in runs],
+                        "peakRssKB": max(run["peakRssKB"] for run in runs),
+                        "baselineRssKB": min(run["baselineRssKB"] for run in runs),
+                        "bytesWritten": runs[-1]["bytesWritten"],
+                        "filesWritten": runs[-1]["filesWritten"],
+                    }
+                    results.append(entry)
+                    print(f"  {dataset:<13} {stage:<13} {entry['wallMs']:>10.1f} ms "
+                          f"{entry['peakRssKB'] / 1024:>8.1f} MB {entry['bytesWritten'] / 1024:>10.1f} KB")
+            finally:
+                server.shutdown()
+
+    return {
+        "commit": git_commit(),
+        "createdAt": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpuCount": os.cpu_count(),
+        "repeat": repeat,
+        "datasets": dataset_info,
+        "results": results,
+    }
+
+
+def compare(base_path: str, new_path: str) -> None:
+    """Print per stage/dataset wall time and RSS ratios (new / base)."""
+    with open(base_path, "r", encoding="utf-8") as f:
+        base = {(r["dataset"], r["stage"]): r for r in json.load(f)["results"]}
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = json.load(f)["results"]
+
+    print(f"{'Dataset':<13} {'Stage':<13} {'Base ms':>10} {'New ms':>10} {'Ratio':>7} {'RSS ratio':>10}")
+    for entry in new:
+        old = base.get((entry["dataset"], entry["stage"]))
+        if old is None:
+            continue
+        ratio = entry["wallMs"] / old["wallMs"] if old["wallMs"] else float("inf")
+        rss = entry["peakRssKB"] / old["peakRssKB"] if old["peakRssKB"] else float("inf")
+        flag = "  ⚠️" if ratio > 1.2 else ""
+        print(f"{entry['dataset']:<13} {entry['stage']:<13} {old['wallMs']:>10.1f} {entry['wallMs']:>10.1f} "
+              f"{ratio:>6.2f}x {rss:>9.2f}x{flag}")
+
+
+def latest_result() -> Optional[str]:
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    paths = sorted(os.path.join(RESULTS_DIR, name) for name in os.listdir(RESULTS_DIR) if name.endswith(".json"))
+    return paths[-1] if paths else None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--child"]:
+        stage, workdir, base_url = argv[1:4]
+        print(json.dumps(run_stage_in_process(stage, workdir, base_url)))
+        return 0
+
+    parser = argparse.ArgumentParser(description="Benchmark the CDN update pipeline stage by stage.")
+    parser.add_argument('--dataset', action='append', choices=sorted(DATASETS), help="default: all")
+    parser.add_argument('--stage', action='append', choices=list(STAGES), help="default: all")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per stage (median wall time is reported)")
+    parser.add_argument('--output', help="result file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument('--compare', nargs='+', metavar='RESULT', help="BASE [NEW]: compare two result files")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        new_path = args.compare[1] if len(args.compare) > 1 else latest_result()
+        if new_path is None:
+            print("✗ No result to compare against")
+            return 1
+        compare(args.compare[0], new_path)
+        return 0
+
+    datasets = args.dataset or list(DATASETS)
+    stages = args.stage or list(STAGES)
+    print(f"Benchmarking {len(stages)} stage(s) on {', '.join(datasets)}\n")
+    report = run_suite(datasets, stages, max(1, args.repeat))
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{report['commit'] or 'nogit'}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    print(f"\n✓ Results written to {os.path.relpath(output, REPO_DIR)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Columnar Sections Artifact - connect.json sections stored column by column
+Generates connect.columnar.json, where every section field is one column:
+repeated scalars (rooms, days, times, faculty codes) are dictionary-encoded
+as integer codes, nested objects (sectionSchedule) and schedule lists
+(classSchedules, labSchedules) are flattened into nested column tables, and
+no key name is repeated per section. ColumnarSections reads the file and
+materializes individual sections lazily.
+"""
+
+import copy
+import json
+import os
+from datetime import datetime, timezone
+from itertools import accumulate
+from typing import Dict, Iterator, List, Optional
+
+from artifacts import ArtifactWriter
+from connect_index import load_artifact_json
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+COLUMNAR_FILE = os.path.join(SCRIPT_DIR, "connect.columnar.json")
+FORMAT_VERSION = 1
+
+# Marks a key missing from a row (distinct from a null value)
+_ABSENT = object()
+ABSENT_CODE = -1
+NULL_LENGTH = -1
+
+
+def _canonical(value) -> str:
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def encode_column(values: List) -> Dict:
+    """Encode one field's values (one per row, _ABSENT when the key is missing)."""
+    present = [value for value in values if value is not _ABSENT]
+
+    if present and len(present) == len(values):
+        if all(isinstance(value, dict) for value in values):
+            return {"type": "object", "table": encode_table(values)}
+
+    if present and len(present) == len(values) and any(isinstance(value, list) for value in values):
+        if all(value is None or (isinstance(value, list) and all(isinstance(item, dict) for item in value))
+               for value in values):
+            items = [item for value in values if value is not None for item in value]
+            return {
+                "type": "list",
+                "lengths": [NULL_LENGTH if value is None else len(value) for value in values],
+                "table": encode_table(items),
+            }
+
+    codes_by_value: Dict[str, int] = {}
+    dictionary = []
+    codes = []
+    for value in values:
+        if value is _ABSENT:
+            codes.append(ABSENT_CODE)
+            continue
+        key = _canonical(value)
+        code = codes_by_value.get(key)
+        if code is None:
+            code = codes_by_value[key] = len(dictionary)
+            dictionary.append(value)
+        codes.append(code)
+
+    # Near-unique columns (sectionId, preRegSchedule) are cheaper stored as-is
+    if len(present) == len(values) and len(dictionary) * 2 > len(values):
+        return {"type": "plain", "values": values}
+    return {"type": "dict", "values": dictionary, "codes": codes}
+
+
+def encode_table(rows: List[Dict]) -> Dict:
+    """Encode a list of dicts as {"rows", "keys", "columns"} (keys in first-seen order)."""
+    keys = list(dict.fromkeys(key for row in rows for key in row))
+    return {
+        "rows": len(rows),
+        "keys": keys,
+        "columns": {key: encode_column([row.get(key, _ABSENT) for row in rows]) for key in keys},
+    }
+
+
+def build_columnar(sections: List[Dict], metadata: Dict) -> Dict:
+    return {
+        "metadata": {
+            "format": "columnar",
+            "formatVersion": FORMAT_VERSION,
+            "version": metadata.get('version'),
+            "totalSections": len(sections),
+            "source": "connect.json",
+            "sourceDataUpdated": metadata.get('lastUpdated'),
+            "lastUpdated": datetime.now(timezone.utc).isoformat()
+        },
+        "sections": encode_table(sections)
+    }
+
+
+def generate_columnar(sections: List[Dict], metadata: Dict, writer: Optional[ArtifactWriter] = None) -> Dict:
+    """Write connect.columnar.json (+ compressed variants) for the sections being published."""
+    writer = writer or ArtifactWriter()
+
+    document = build_columnar(sections, metadata)
+    stats = writer.write(COLUMNAR_FILE, document, compact=True)
+
+    print(f"✓ connect.columnar.json created ({stats['bytes'] / 1024:.1f} KB, gzipped {stats['gzipBytes'] / 1024:.1f} KB)")
+    return document
+
+
+class _Table:
+    """Row access into one encoded table."""
+
+    def __init__(self, encoded: Dict):
+        self.rows = encoded['rows']
+        self.keys = encoded['keys']
+        self.columns = {key: _Column(column) for key, column in encoded['columns'].items()}
+
+    def row(self, index: int) -> Dict:
+        result = {}
+        for key in self.keys:
+            value = self.columns[key].value(index)
+            if value is not _ABSENT:
+                result[key] = value
+        return result
+
+
+class _Column:
+    def __init__(self, encoded: Dict):
+        self.type = encoded['type']
+        self.encoded = encoded
+        self._table: Optional[_Table] = None
+        self._starts: Optional[List[int]] = None
+
+    @property
+    def table(self) -> _Table:
+        if self._table is None:
+            self._table = _Table(self.encoded['table'])
+        return self._table
+
+    def value(self, index: int):
+        if self.type == "plain":
+            return _copy(self.encoded['values'][index])
+        if self.type == "dict":
+            code = self.encoded['codes'][index]
+            return _ABSENT if code == ABSENT_CODE else _copy(self.encoded['values'][code])
+        if self.type == "object":
+            return self.table.row(index)
+        if self.type == "list":
+            length = self.encoded['lengths'][index]
+            if length == NULL_LENGTH:
+                return None
+            if self._starts is None:
+                self._starts = [0] + list(accumulate(max(n, 0) for n in self.encoded['lengths']))
+            start = self._starts[index]
+            return [self.table.row(item) for item in range(start, start + length)]
+        raise ValueError(f"Unknown column type {self.type!r}")
+
+    def values(self) -> List:
+        """Every row's value (None for absent keys), without materializing other fields."""
+        if self.type == "plain":
+            return list(self.encoded['values'])
+        if self.type == "dict":
+            dictionary = self.encoded['values']
+            return [None if code == ABSENT_CODE else dictionary[code] for code in self.encoded['codes']]
+        rows = len(self.encoded['lengths']) if self.type == "list" else self.table.rows
+        return [self.value(index) for index in range(rows)]
+
+
+def _copy(value):
+    # Dictionary values are shared between rows; hand out independent containers
+    return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+
+
+class ColumnarSections:
+    """Lazy, list-like view over connect.columnar.json.
+
+    Loading parses the compact columnar document only; a section dict is
+    built when it is indexed or iterated, and whole columns can be read
+    without building any section.
+    """
+
+    def __init__(self, document: Dict):
+        if document.get('metadata', {}).get('format') != "columnar":
+            raise ValueError("Not a columnar sections document")
+        self.metadata = document['metadata']
+        self._table = _Table(document['sections'])
+
+    @classmethod
+    def from_file(cls, path: str = COLUMNAR_FILE) -> "ColumnarSections":
+        """Load path (preferring its .gz sibling)."""
+        return cls(load_artifact_json(path))
+
+    def __len__(self) -> int:
+        return self._table.rows
+
+    def __getitem__(self, index: int) -> Dict:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("section index out of range")
+        return self._table.row(index)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for index in range(len(self)):
+            yield self._table.row(index)
+
+    @property
+    def keys(self) -> List[str]:
+        return list(self._table.keys)
+
+    def column(self, key: str) -> List:
+        """All values of one top-level field, in section order."""
+        if key not in self._table.columns:
+            raise KeyError(f"Unknown column {key!r}")
+        return self._table.columns[key].values()
+
+    def where(self, key: str, value) -> List[Dict]:
+        """Sections whose top-level field equals value."""
+        return [self[index] for index, candidate in enumerate(self.column(key)) if candidate == value]
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Connect Lookup Index - Precomputed lookups shipped alongside connect.json
+Generates connect_index.json (sectionId, courseCode, faculty and room keys
+mapped to positions in connect.json's sections list) and provides a lazy
+loader so server-side consumers can resolve lookups without scanning every
+section.
+"""
+
+import gzip
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from artifacts import ArtifactWriter
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_FILE = os.path.join(SCRIPT_DIR, "connect_index.json")
+CONNECT_FILE = os.path.join(SCRIPT_DIR, "connect.json")
+
+# Index name -> section fields contributing keys
+INDEX_FIELDS = {
+    "courseCode": ("courseCode",),
+    "faculty": ("faculties", "labFaculties"),
+    "roomName": ("roomName", "labRoomName"),
+}
+
+
+def build_connect_index(sections: List[Dict], metadata: Dict) -> Dict:
+    """Map every lookup key to the positions of its sections in connect.json."""
+    section_ids = {}
+    lookups = {name: defaultdict(list) for name in INDEX_FIELDS}
+
+    for offset, section in enumerate(sections):
+        section_ids[str(section['sectionId'])] = offset
+
+        for name, fields in INDEX_FIELDS.items():
+            keys = []
+            for field in fields:
+                value = section.get(field)
+                if isinstance(value, str):
+                    keys.extend(part.strip() for part in value.split(',') if part.strip())
+            for key in dict.fromkeys(keys):
+                lookups[name][key].append(offset)
+
+    return {
+        "metadata": {
+            "version": metadata.get('version'),
+            "totalSections": len(sections),
+            "source": "connect.json",
+            "sourceDataUpdated": metadata.get('lastUpdated'),
+            "lastUpdated": datetime.now(timezone.utc).isoformat()
+        },
+        "sectionId": section_ids,
+        **{name: dict(sorted(keys.items())) for name, keys in lookups.items()}
+    }
+
+
+def generate_connect_index(sections: List[Dict], metadata: Dict, writer: Optional[ArtifactWriter] = None) -> Dict:
+    """Write connect_index.json (+ .gz) for the sections being published."""
+    writer = writer or ArtifactWriter()
+
+    index = build_connect_index(sections, metadata)
+    stats = writer.write(INDEX_FILE, index)
+
+    print(f"✓ connect_index.json created ({stats['bytes'] / 1024:.1f} KB, gzipped {stats['gzipBytes'] / 1024:.1f} KB)")
+    print(f"  {len(index['courseCode'])} courses, {len(index['faculty'])} faculties, {len(index['roomName'])} rooms")
+    return index
+
+
+class ConnectIndex:
+    """Lazy loader for connect_index.json and the sections it points into.
+
+    Nothing is read until the first lookup; connect.json itself is only
+    loaded when full sections are requested, and its version must match the
+    index.
+    """
+
+    def __init__(self, index_path: str = INDEX_FILE, connect_path: str = CONNECT_FILE):
+        self.index_path = index_path
+        self.connect_path = connect_path
+        self._index: Optional[Dict] = None
+        self._sections: Optional[List[Dict]] = None
+
+    @property
+    def index(self) -> Dict:
+        if self._index is None:
+            self._index = load_artifact_json(self.index_path)
+        return self._index
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.index['metadata'].get('version')
+
+    def offsets(self, kind: str, key) -> List[int]:
+        """Positions of the sections matching key in one of the lookup indexes."""
+        if kind == "sectionId":
+            offset = self.index['sectionId'].get(str(key))
+            return [] if offset is None else [offset]
+        if kind not in INDEX_FIELDS:
+            raise ValueError(f"Unknown index {kind!r}. Expected sectionId or one of {sorted(INDEX_FIELDS)}")
+        return self.index[kind].get(key, [])
+
+    def keys(self, kind: str) -> List[str]:
+        return list(self.index[kind])
+
+    def sections(self, kind: str, key) -> List[Dict]:
+        """Full section dicts matching key."""
+        all_sections = self._load_sections()
+        return [all_sections[offset] for offset in self.offsets(kind, key)]
+
+    def section(self, section_id) -> Optional[Dict]:
+        matches = self.sections("sectionId", section_id)
+        return matches[0] if matches else None
+
+    def _load_sections(self) -> List[Dict]:
+        if self._sections is None:
+            data = load_artifact_json(self.connect_path)
+            connect_version = data.get('metadata', {}).get('version')
+            if connect_version != self.version:
+                raise ValueError(
+                    f"connect_index.json is for version {self.version} but connect.json is {connect_version}")
+            self._sections = data['sections']
+        return self._sections
+
+
+def load_artifact_json(path: str) -> Dict:
+    """Load a JSON artifact, preferring its .gz sibling when present."""
+    if not path.endswith(".gz") and os.path.exists(path + ".gz"):
+        path += ".gz"
+    if path.endswith(".gz"):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
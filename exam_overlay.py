@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Exam Overlay Engine - Joins official (PDF-derived) exam schedules onto exams.json
+Official rows and CDN exam entries are normalized once into (course,
+section) keys; midterm and final overlays are merged into one index and
+applied in a single pass over the exams. Section names match exactly
+after zero-padding ("1" == "01"), then fuzzily by section number when
+unambiguous ("001", "01L" for the lab course "CSE110L"). Rows and exams
+that could not be joined are reported.
+"""
+
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+EXAM_TYPES = ("midterm", "final")
+
+
+class OverlayFields(NamedTuple):
+    official_date: str      # column name in the official PDF export
+    date: str               # exams.json field names
+    time: str
+    room: str
+    source: str
+
+
+FIELDS = {
+    "midterm": OverlayFields("Mid Date", "midExamDate", "midExamTime", "midExamRoom", "midExamSource"),
+    "final": OverlayFields("Final Date", "finalExamDate", "finalExamTime", "finalExamRoom", "finalExamSource"),
+}
+
+_SECTION_PATTERN = re.compile(r'^0*(\d+)\s*([A-Z]*)$')
+
+
+def normalize_course(value) -> str:
+    """"cse 110 " -> "CSE110"."""
+    return re.sub(r'\s+', '', str(value or "")).upper()
+
+
+def normalize_section(value) -> str:
+    """Exact section key: stripped and zero-padded to two digits ("1" -> "01")."""
+    return str(value if value is not None else "").strip().upper().zfill(2)
+
+
+def section_number(value) -> Optional[Tuple[int, str]]:
+    """("01L" -> (1, "L"), "001" -> (1, "")); None for non-numeric names."""
+    match = _SECTION_PATTERN.match(str(value if value is not None else "").strip().upper())
+    return (int(match.group(1)), match.group(2)) if match else None
+
+
+def official_row_key(row: Dict, exam_type: str) -> Optional[Tuple[str, str]]:
+    """Normalized (course, section) of an official row that carries a date for exam_type."""
+    if not isinstance(row, dict):
+        return None
+    fields = FIELDS[exam_type]
+    course = row.get("Course") or row.get("courseCode")
+    section = row.get("Section") or row.get("sectionName")
+    date = row.get(fields.official_date) or row.get(fields.date)
+    if not (course and section and date):
+        return None
+    return normalize_course(course), normalize_section(section)
+
+
+class OverlayResult(NamedTuple):
+    applied: Dict[str, int]                       # exam type -> exams updated
+    unmatched_official: Dict[str, List[Dict]]     # official rows that matched no exam
+    unmatched_exams: Dict[str, List[Dict]]        # exams with a CDN date but no official row
+
+
+class ExamIndex:
+    """Normalized lookup over CDN exam entries, built once per run."""
+
+    def __init__(self, exams: List[Dict]):
+        self.exams = exams
+        self.exact: Dict[Tuple[str, str], List[int]] = {}
+        self.numbered: Dict[Tuple[str, int], List[int]] = {}
+        for position, exam in enumerate(exams):
+            course = normalize_course(exam.get("courseCode"))
+            self.exact.setdefault((course, normalize_section(exam.get("sectionName"))), []).append(position)
+            number = section_number(exam.get("sectionName"))
+            if number is not None:
+                self.numbered.setdefault((course, number[0]), []).append(position)
+
+    def match(self, course: str, section: str) -> List[int]:
+        """Positions of the exams an official (course, section) refers to."""
+        exact = self.exact.get((course, section))
+        if exact:
+            return exact
+
+        number = section_number(section)
+        if number is None:
+            return []
+        value, suffix = number
+        # "001" / "1" for section "01"; "01L" either as-is or on the lab course "CSE110L"
+        for candidate in ((course + suffix, value), (course, value)) if suffix else ((course, value),):
+            positions = self.numbered.get(candidate)
+            if positions and len(positions) == 1:
+                return positions
+        return []
+
+
+def build_official_index(overlays: Dict[str, Optional[Dict]]) -> Dict[Tuple[str, str], Dict[str, Dict]]:
+    """(course, section) -> {exam type: official row} across every overlay payload."""
+    index: Dict[Tuple[str, str], Dict[str, Dict]] = {}
+    for exam_type, payload in overlays.items():
+        if not payload:
+            continue
+        for row in payload.get("exams", []):
+            key = official_row_key(row, exam_type)
+            if key is not None:
+                index.setdefault(key, {})[exam_type] = row
+    return index
+
+
+def apply_row(exam: Dict, row: Dict, exam_type: str) -> None:
+    """Copy one official row's date, time range and room onto an exam entry."""
+    fields = FIELDS[exam_type]
+    date = row.get(fields.official_date) or row.get(fields.date)
+    start = row.get("Start Time") or row.get(fields.time)
+    end = row.get("End Time")
+    room = row.get("Room.") or row.get(fields.room)
+
+    if date:
+        exam[fields.date] = date
+    if start:
+        exam[fields.time] = f"{start}-{end}" if end else start
+    if room:
+        exam[fields.room] = room
+    exam[fields.source] = "pdf"
+
+
+def join_overlays(exams: List[Dict], overlays: Dict[str, Optional[Dict]],
+                  index: Optional[ExamIndex] = None) -> OverlayResult:
+    """Apply every overlay in overlays ({exam type: payload}) onto exams in one pass."""
+    index = index or ExamIndex(exams)
+    official = build_official_index(overlays)
+    active = [exam_type for exam_type in EXAM_TYPES if overlays.get(exam_type)]
+
+    applied = {exam_type: 0 for exam_type in overlays}
+    matched: Dict[str, set] = {exam_type: set() for exam_type in active}
+    unmatched_official: Dict[str, List[Dict]] = {exam_type: [] for exam_type in active}
+
+    for (course, section), rows in official.items():
+        positions = index.match(course, section)
+        for exam_type, row in rows.items():
+            if not positions:
+                unmatched_official[exam_type].append(row)
+                continue
+            for position in positions:
+                if position not in matched[exam_type]:
+                    matched[exam_type].add(position)
+                    apply_row(index.exams[position], row, exam_type)
+                    applied[exam_type] += 1
+
+    unmatched_exams = {
+        exam_type: [exam for position, exam in enumerate(index.exams)
+                    if position not in matched[exam_type] and exam.get(FIELDS[exam_type].date)]
+        for exam_type in active
+    }
+    return OverlayResult(applied, unmatched_official, unmatched_exams)
+
+
+def print_overlay_report(result: OverlayResult, limit: int = 5) -> None:
+    for exam_type, rows in result.unmatched_official.items():
+        exams = result.unmatched_exams.get(exam_type, [])
+        print(f"  {exam_type}: {result.applied.get(exam_type, 0)} matched, "
+              f"{len(rows)} official rows unmatched, {len(exams)} exams without an official row")
+        for row in rows[:limit]:
+            print(f"    ⚠️  no section for {row.get('Course') or row.get('courseCode')} "
+                  f"{row.get('Section') or row.get('sectionName')}")
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Free Rooms Query - Arbitrary time-window availability for labs and rooms
+Builds a per room/day index of merged, sorted minute intervals from
+analyze_lab_usage() (labs) and classSchedules (theory rooms) and answers
+"which rooms are free on TUESDAY 10:15-12:00" or "next free slot for
+AS2-12L" with one bisection per room.
+
+Usage:
+    python free_rooms.py [--labs-only] free TUESDAY 10:15 12:00
+    python free_rooms.py next AS2-12L [--day MONDAY --after 11:00 --duration 80]
+"""
+
+import argparse
+import json
+import os
+import sys
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from generate_free_labs import DAYS, analyze_lab_usage, is_lab_room
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Bounds used when looking for the next free gap in a day
+DAY_START = 8 * 60
+DAY_END = 21 * 60
+
+
+def check_day(day: str) -> str:
+    """Upper-cased day name; ValueError for anything not in DAYS."""
+    if day.upper() not in DAYS:
+        raise ValueError(f"Invalid day {day!r}. Expected one of {', '.join(DAYS)}")
+    return day.upper()
+
+
+def parse_clock(value: str) -> int:
+    """Parse "HH:MM" or "HH:MM:SS" into minutes since midnight."""
+    try:
+        parts = [int(part) for part in value.split(':')]
+        hours, minutes = parts[0], parts[1] if len(parts) > 1 else 0
+    except (ValueError, IndexError, AttributeError):
+        raise ValueError(f"Invalid time {value!r}. Expected HH:MM")
+    if not (0 <= hours <= 24 and 0 <= minutes < 60) or (hours == 24 and minutes):
+        raise ValueError(f"Invalid time {value!r}. Expected HH:MM")
+    return hours * 60 + minutes
+
+
+def format_clock(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def merge_intervals(intervals: List[Tuple[int, int]]) -> Tuple[List[int], List[int]]:
+    """Sort and merge intervals into parallel start/end lists (both ascending)."""
+    starts: List[int] = []
+    ends: List[int] = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if ends and start <= ends[-1]:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+class RoomIndex:
+    """Interval index of occupied time per room and day."""
+
+    def __init__(self, sections: List[Dict], include_theory: bool = True):
+        intervals = defaultdict(lambda: defaultdict(list))
+        self.kinds: Dict[str, str] = {}
+        self.departments: Dict[str, List[str]] = {}
+
+        lab_occupancy, lab_departments = analyze_lab_usage(sections)
+        for room, days in lab_occupancy.items():
+            self.kinds[room] = "lab"
+            self.departments[room] = sorted(lab_departments[room])
+            for day, occupied in days.items():
+                intervals[room][day].extend(
+                    (parse_clock(o['startTime']), parse_clock(o['endTime'])) for o in occupied)
+
+        if include_theory:
+            for section in sections:
+                room = section.get('roomName') or section.get('roomNumber')
+                # LAB sections in lab rooms are already covered by analyze_lab_usage
+                if not room or (section.get('sectionType') == 'LAB' and is_lab_room(room)):
+                    continue
+                self.kinds.setdefault(room, "room")
+                schedules = (section.get('sectionSchedule') or {}).get('classSchedules') or []
+                for schedule in schedules:
+                    day, start, end = schedule.get('day'), schedule.get('startTime'), schedule.get('endTime')
+                    if day and start and end:
+                        intervals[room][day].append((parse_clock(start), parse_clock(end)))
+
+        self.rooms: Dict[str, Dict[str, Tuple[List[int], List[int]]]] = {
+            room: {day: merge_intervals(spans) for day, spans in days.items()}
+            for room, days in intervals.items()
+        }
+        for room in self.kinds:
+            self.rooms.setdefault(room, {})
+
+    @classmethod
+    def from_file(cls, path: str, include_theory: bool = True) -> "RoomIndex":
+        """Build from connect.json/stable.json/table.json (list or {sections: []})."""
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        if isinstance(payload, dict):
+            payload = payload.get('sections') or payload.get('data') or []
+        return cls(payload, include_theory)
+
+    def is_free(self, room: str, day: str, start: int, end: int) -> bool:
+        """True when room has nothing scheduled overlapping [start, end) on day."""
+        starts, ends = self.rooms.get(room, {}).get(day, ([], []))
+        # First occupied interval ending after start; free unless it begins before end
+        i = bisect_right(ends, start)
+        return i == len(ends) or starts[i] >= end
+
+    def free_rooms(self, day: str, start: int, end: int, kind: Optional[str] = None) -> List[str]:
+        """Rooms (optionally only "lab" or "room") free for the whole window."""
+        day = check_day(day)
+        return [
+            room for room in sorted(self.rooms)
+            if (kind is None or self.kinds[room] == kind) and self.is_free(room, day, start, end)
+        ]
+
+    def next_free(self, room: str, day: str = DAYS[0], after: int = DAY_START,
+                  duration: int = 1) -> Optional[Tuple[str, int, int]]:
+        """Next (day, start, end) gap of at least duration minutes, searching a full week."""
+        if room not in self.rooms:
+            raise KeyError(f"Unknown room {room!r}")
+
+        first_day = DAYS.index(check_day(day))
+        for offset in range(len(DAYS) + 1):
+            current = DAYS[(first_day + offset) % len(DAYS)]
+            cursor = max(after, DAY_START) if offset == 0 else DAY_START
+            starts, ends = self.rooms[room].get(current, ([], []))
+            i = bisect_right(ends, cursor)
+            while cursor + duration <= DAY_END:
+                gap_end = min(starts[i], DAY_END) if i < len(starts) else DAY_END
+                if gap_end - cursor >= duration:
+                    return current, cursor, gap_end
+                if i >= len(starts):
+                    break
+                cursor = max(cursor, ends[i])
+                i += 1
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Query free labs and rooms for arbitrary time windows.")
+    parser.add_argument('--source', default=os.path.join(SCRIPT_DIR, "connect.json"),
+                        help="sections file (connect.json, stable.json or table.json)")
+    parser.add_argument('--labs-only', action='store_true', help="ignore theory rooms")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    free = commands.add_parser('free', help="rooms free for a whole window")
+    free.add_argument('day')
+    free.add_argument('start')
+    free.add_argument('end')
+
+    next_slot = commands.add_parser('next', help="next free slot for a room")
+    next_slot.add_argument('room')
+    next_slot.add_argument('--day', default=DAYS[0])
+    next_slot.add_argument('--after', default=format_clock(DAY_START))
+    next_slot.add_argument('--duration', type=int, default=1, help="minutes")
+
+    args = parser.parse_args(argv)
+    index = RoomIndex.from_file(args.source, include_theory=not args.labs_only)
+
+    try:
+        if args.command == 'free':
+            start, end = parse_clock(args.start), parse_clock(args.end)
+            rooms = index.free_rooms(args.day, start, end)
+            print(f"{len(rooms)} free on {args.day.upper()} {format_clock(start)}-{format_clock(end)}:")
+            for room in rooms:
+                print(f"  {room} ({index.kinds[room]})")
+        else:
+            found = index.next_free(args.room, args.day, parse_clock(args.after), args.duration)
+            if found:
+                day, start, end = found
+                print(f"{args.room} is next free on {day} {format_clock(start)}-{format_clock(end)}")
+            else:
+                print(f"{args.room} has no free slot of {args.duration} minutes this week")
+    except (KeyError, ValueError) as error:
+        print(f"✗ {error}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,13 +2,20 @@
 """
 Generate connect_backup.json - Static index of all available backups.
 Backup files use clean naming: spring2026.json, fall2025.json, etc.
+
+Backups are written metadata-first, so only the leading metadata object of
+each file is read; building the index costs a few KB per backup instead of
+parsing every multi-MB file.
 """
 
 import json
 import os
 import re
-import glob
 from datetime import datetime, timezone
+from typing import Optional
+
+import staging
+from artifacts import ArtifactWriter, document_hash
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 BACKUPS_DIR = os.path.join(SCRIPT_DIR, "backups")
@@ -18,12 +25,16 @@ CDN_ROOT_URL = "https://connect-cdn.itzmrz.xyz"
 # Pattern: spring2026.json, fall2024.json, summer2025.json
 BACKUP_PATTERN = re.compile(r'^(spring|summer|fall)(\d{4})\.json$', re.IGNORECASE)
 
+# Leading '{"metadata":' of a backup, pretty or compact
+METADATA_PREFIX = re.compile(r'\s*\{\s*"metadata"\s*:\s*')
+HEADER_READ_SIZE = 8 * 1024
+
 
 def get_current_semester_name() -> str:
     """Read current semester from connect_metadata.json."""
     try:
         meta_path = os.path.join(SCRIPT_DIR, "connect_metadata.json")
-        with open(meta_path, 'r', encoding='utf-8') as f:
+        with open(staging.resolve(meta_path), 'r', encoding='utf-8') as f:
             data = json.load(f)
         mid = data['metadata'].get('midExamStartDate')
         if mid:
@@ -40,6 +51,33 @@ def get_current_semester_name() -> str:
     return ""
 
 
+def read_backup_metadata(filepath: str) -> dict:
+    """Return a backup's metadata object without parsing its sections.
+
+    Reads just enough of the file to decode the leading "metadata" value;
+    files laid out differently fall back to a full json.load().
+    """
+    decoder = json.JSONDecoder()
+    with open(filepath, 'r', encoding='utf-8') as f:
+        buffer = ""
+        while True:
+            chunk = f.read(HEADER_READ_SIZE)
+            buffer += chunk
+            match = METADATA_PREFIX.match(buffer)
+            if match is None:
+                break
+            try:
+                metadata, _ = decoder.raw_decode(buffer, match.end())
+                return metadata
+            except json.JSONDecodeError:
+                if not chunk:
+                    break
+
+        # Not metadata-first (or malformed): parse the whole document
+        f.seek(0)
+        return json.load(f)['metadata']
+
+
 def parse_backup_file(filename: str, current_semester: str) -> dict:
     """Parse backup filename and extract metadata."""
     match = BACKUP_PATTERN.match(filename)
@@ -50,13 +88,12 @@ def parse_backup_file(filename: str, current_semester: str) -> dict:
     year = match.group(2)
     semester = f"{season}{year}"
 
-    # Load file to get section count and backup time
+    # Read the metadata header to get section count and backup time
     filepath = os.path.join(BACKUPS_DIR, filename)
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            total_sections = data['metadata']['totalSections']
-            last_updated = data['metadata'].get('lastUpdated', '')
+        metadata = read_backup_metadata(staging.resolve(filepath))
+        total_sections = metadata['totalSections']
+        last_updated = metadata.get('lastUpdated', '')
     except Exception:
         total_sections = 0
         last_updated = ''
@@ -73,8 +110,9 @@ def parse_backup_file(filename: str, current_semester: str) -> dict:
     }
 
 
-def generate_backup_index():
+def generate_backup_index(writer: Optional[ArtifactWriter] = None):
     """Generate connect_backup.json with all available backups."""
+    writer = writer or ArtifactWriter()
 
     print("=" * 60)
     print("Generating Backup Index (connect_backup.json)")
@@ -84,7 +122,7 @@ def generate_backup_index():
     print(f"\nCurrent semester: {current_semester or 'Unknown'}")
 
     # Find all backup files
-    backup_files = glob.glob(os.path.join(BACKUPS_DIR, "*.json"))
+    backup_files = staging.listing(BACKUPS_DIR)
 
     if not backup_files:
         print("⚠️  No backup files found")
@@ -128,10 +166,9 @@ def generate_backup_index():
 
     # Write to connect_backup.json
     output_path = os.path.join(SCRIPT_DIR, "connect_backup.json")
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    stats = writer.write(output_path, output, gzip_copy=False, content_hash=document_hash(output))
 
-    file_size = os.path.getsize(output_path) / 1024
+    file_size = stats["bytes"] / 1024
 
     print(f"\n✓ connect_backup.json created ({file_size:.1f} KB)")
     print(f"  Total backups: {output['metadata']['totalBackups']}")
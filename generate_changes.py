@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Change Report Generator - Emits changes.json for each published version
+Diffs the new sections against the previous connect.json by sectionId and
+classifies every change by facet (schedule, room, faculty, exam, seats,
+other) using per-section fingerprints, so downstream services can react to
+the sections that changed instead of reprocessing the full file.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from artifacts import ArtifactWriter
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CHANGES_FILE = os.path.join(SCRIPT_DIR, "changes.json")
+CDN_CHANGES_URL = "https://connect-cdn.itzmrz.xyz/changes.json"
+
+CLASS_FIELDS = ('classSchedules', 'classStartDate', 'classEndDate')
+
+
+def _schedule(section: Dict) -> Dict:
+    schedule = section.get('sectionSchedule') or {}
+    values = {field: schedule.get(field) for field in CLASS_FIELDS}
+    values['labSchedules'] = section.get('labSchedules')
+    return values
+
+
+def _exam(section: Dict) -> Dict:
+    schedule = section.get('sectionSchedule') or {}
+    return {field: value for field, value in schedule.items() if 'Exam' in field}
+
+
+# Facet -> the section values it covers (compared as a fingerprint)
+FACETS: Dict[str, Callable[[Dict], Dict]] = {
+    "schedule": _schedule,
+    "room": lambda section: {field: section.get(field) for field in ('roomName', 'roomNumber', 'labRoomName')},
+    "faculty": lambda section: {field: section.get(field) for field in ('faculties', 'labFaculties')},
+    "exam": _exam,
+    "seats": lambda section: {field: section.get(field) for field in ('consumedSeat', 'capacity')},
+}
+
+# Top-level fields owned by a facet, or derived from facet fields (preReg* strings)
+FACET_FIELDS = {'roomName', 'roomNumber', 'labRoomName', 'faculties', 'labFaculties', 'consumedSeat',
+                'capacity', 'labSchedules', 'sectionSchedule', 'preRegSchedule', 'preRegLabSchedule'}
+
+
+def _digest(values: Dict) -> str:
+    encoded = json.dumps(values, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.blake2b(encoded.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def fingerprint(section: Dict) -> Dict[str, str]:
+    """{facet: short digest} of one section."""
+    return {facet: _digest(values(section)) for facet, values in FACETS.items()}
+
+
+def other_fields(old: Dict, new: Dict) -> List[str]:
+    """Changed fields not covered by any facet."""
+    fields = sorted(field for field in set(old) | set(new)
+                    if field not in FACET_FIELDS and old.get(field) != new.get(field))
+    old_schedule, new_schedule = old.get('sectionSchedule') or {}, new.get('sectionSchedule') or {}
+    if any(old_schedule.get(field) != new_schedule.get(field)
+           for field in set(old_schedule) | set(new_schedule)
+           if field not in CLASS_FIELDS and 'Exam' not in field):
+        fields.append('sectionSchedule')
+    return fields
+
+
+def _label(section: Dict) -> Dict:
+    return {"sectionId": section.get('sectionId'), "courseCode": section.get('courseCode'),
+            "sectionName": section.get('sectionName')}
+
+
+def diff_changes(old_sections: List[Dict], new_sections: List[Dict]) -> Dict:
+    """Keyed, facet-classified diff of two section lists.
+
+    Returns {"added": [...], "removed": [...], "changed": [...], "summary": {...}}.
+    Each changed entry names its facets with their previous and new values;
+    sections equal to their previous copy are skipped without fingerprinting.
+    """
+    old_by_id = {section['sectionId']: section for section in old_sections}
+    new_ids = set()
+    added, changed = [], []
+    summary = {facet: 0 for facet in FACETS}
+    summary["other"] = 0
+    seat_delta = 0
+
+    for section in new_sections:
+        section_id = section['sectionId']
+        new_ids.add(section_id)
+        old = old_by_id.get(section_id)
+        if old is None:
+            added.append(_label(section))
+            continue
+        if old == section:
+            continue
+
+        old_print, new_print = fingerprint(old), fingerprint(section)
+        entry = _label(section)
+        entry["changes"] = {}
+        for facet, values in FACETS.items():
+            if old_print[facet] != new_print[facet]:
+                entry["changes"][facet] = {"from": values(old), "to": values(section)}
+                summary[facet] += 1
+        if "seats" in entry["changes"]:
+            delta = (section.get('consumedSeat') or 0) - (old.get('consumedSeat') or 0)
+            entry["changes"]["seats"]["consumedDelta"] = delta
+            seat_delta += delta
+        other = other_fields(old, section)
+        if other:
+            entry["otherFields"] = other
+            summary["other"] += 1
+        if entry["changes"] or other:
+            changed.append(entry)
+
+    removed = [_label(section) for section_id, section in old_by_id.items() if section_id not in new_ids]
+    summary = {
+        "addedSections": len(added),
+        "removedSections": len(removed),
+        "changedSections": len(changed),
+        **{f"{facet}Changes": count for facet, count in summary.items()},
+        "consumedSeatDelta": seat_delta,
+    }
+    return {"added": added, "removed": removed, "changed": changed, "summary": summary}
+
+
+def generate_changes(previous_metadata: Optional[Dict], previous_sections: Optional[List[Dict]],
+                     metadata: Dict, sections: List[Dict], semester_changed: bool,
+                     writer: Optional[ArtifactWriter] = None) -> Dict:
+    """Write changes.json and return its summary for connect_metadata.json.
+
+    After a semester change (or on the first run) there is nothing to diff
+    against; the report then has fullRefresh set and lists no sections, so
+    consumers reprocess connect.json once.
+    """
+    writer = writer or ArtifactWriter()
+    from_version = (previous_metadata or {}).get('version')
+    full_refresh = semester_changed or previous_sections is None or not from_version
+
+    if full_refresh:
+        changes = {"added": [], "removed": [], "changed": [], "summary": {}}
+        from_version = None
+    else:
+        changes = diff_changes(previous_sections, sections)
+
+    summary = {
+        "fromVersion": from_version,
+        "toVersion": metadata.get('version'),
+        "fullRefresh": full_refresh,
+        **changes["summary"],
+    }
+    document = {
+        "metadata": {**summary, "generatedAt": datetime.now(timezone.utc).isoformat()},
+        "added": changes["added"],
+        "removed": changes["removed"],
+        "changed": changes["changed"],
+    }
+    stats = writer.write(CHANGES_FILE, document, extra_variants=False, quiet=True)
+
+    if full_refresh:
+        print("  ✓ changes.json: full refresh (first run or semester change)")
+    else:
+        print(f"  ✓ changes.json ({stats['bytes'] / 1024:.1f} KB): +{summary['addedSections']} added, "
+              f"-{summary['removedSections']} removed, ~{summary['changedSections']} changed "
+              f"(seats {summary['seatsChanges']}, schedule {summary['scheduleChanges']}, "
+              f"room {summary['roomChanges']}, exam {summary['examChanges']})")
+    return {**summary, "url": CDN_CHANGES_URL}
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Delta Feed Generator - Emits per-version patches for connect.json
+Diffs consecutive connect.json versions by sectionId so clients holding
+version N can patch to N+1 instead of re-downloading the full file.
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import staging
+from artifacts import ArtifactWriter
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DELTAS_DIR = os.path.join(SCRIPT_DIR, "deltas")
+CDN_DELTAS_URL = "https://connect-cdn.itzmrz.xyz/deltas"
+
+# Number of consecutive deltas advertised in connect_metadata.json
+DELTA_RETENTION = 30
+
+
+def load_previous_connect(connect_path: str = os.path.join(SCRIPT_DIR, "connect.json")) -> Tuple[Optional[Dict], Optional[List[Dict]]]:
+    """Load the currently published connect.json before it is overwritten."""
+    try:
+        with open(connect_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data.get('metadata', {}), data.get('sections', [])
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None, None
+
+
+def load_delta_index(metadata_path: str = os.path.join(SCRIPT_DIR, "connect_metadata.json")) -> List[Dict]:
+    """Read the delta index previously published in connect_metadata.json."""
+    try:
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            deltas = json.load(f).get('deltas', [])
+        return deltas if isinstance(deltas, list) else []
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+
+
+def diff_sections(old_sections: List[Dict], new_sections: List[Dict]) -> Dict:
+    """Diff two section lists keyed by sectionId.
+
+    Returns {"added": {id: section}, "removed": [id], "changed": {id: {"set": {...},
+    "unset": [...]}}} plus "order" (the full sectionId sequence) only when the
+    new order cannot be derived from the old one with removals dropped and
+    additions appended.
+    """
+    old_by_id = {section['sectionId']: section for section in old_sections}
+    new_by_id = {section['sectionId']: section for section in new_sections}
+
+    added = {}
+    changed = {}
+    for section_id, section in new_by_id.items():
+        old = old_by_id.get(section_id)
+        if old is None:
+            added[str(section_id)] = section
+            continue
+        if old == section:
+            continue
+
+        fields = {key: value for key, value in section.items() if old.get(key, object()) != value}
+        unset = [key for key in old if key not in section]
+        change = {"set": fields}
+        if unset:
+            change["unset"] = unset
+        changed[str(section_id)] = change
+
+    removed = [section_id for section_id in old_by_id if section_id not in new_by_id]
+
+    delta = {"added": added, "removed": removed, "changed": changed}
+
+    removed_ids = set(removed)
+    expected_order = [sid for sid in old_by_id if sid not in removed_ids]
+    expected_order += [section['sectionId'] for section in new_sections if section['sectionId'] not in old_by_id]
+    new_order = [section['sectionId'] for section in new_sections]
+    if new_order != expected_order:
+        delta["order"] = new_order
+
+    return delta
+
+
+def apply_delta(sections: List[Dict], delta: Dict) -> List[Dict]:
+    """Patch a section list from version N to N+1 (reference client implementation)."""
+    removed = set(delta.get('removed', []))
+    by_id = {}
+    order = []
+    for section in sections:
+        if section['sectionId'] in removed:
+            continue
+        patched = dict(section)
+        change = delta.get('changed', {}).get(str(section['sectionId']))
+        if change:
+            patched.update(change.get('set', {}))
+            for key in change.get('unset', []):
+                patched.pop(key, None)
+        by_id[section['sectionId']] = patched
+        order.append(section['sectionId'])
+
+    for section in delta.get('added', {}).values():
+        by_id[section['sectionId']] = section
+        order.append(section['sectionId'])
+
+    return [by_id[section_id] for section_id in delta.get('order', order)]
+
+
+def delta_filename(from_version: str, to_version: str) -> str:
+    return f"{from_version}-{to_version}.json"
+
+
+def generate_delta(previous_metadata: Optional[Dict], previous_sections: Optional[List[Dict]],
+                   metadata: Dict, sections: List[Dict], semester_changed: bool,
+                   writer: Optional[ArtifactWriter] = None) -> List[Dict]:
+    """Write deltas/<from>-<to>.json and return the updated delta index.
+
+    The chain restarts on a semester change (clients need the full file then)
+    and files that fall out of the retention window are removed.
+    """
+    writer = writer or ArtifactWriter()
+    index = [] if semester_changed else load_delta_index()
+
+    from_version = (previous_metadata or {}).get('version')
+    to_version = metadata.get('version')
+
+    if semester_changed or previous_sections is None or not from_version or not to_version:
+        print("  No delta for this version (first run or semester change)")
+    else:
+        delta = diff_sections(previous_sections, sections)
+        document = {
+            "metadata": {
+                "fromVersion": from_version,
+                "toVersion": to_version,
+                "addedSections": len(delta['added']),
+                "removedSections": len(delta['removed']),
+                "changedSections": len(delta['changed']),
+                "generatedAt": datetime.now(timezone.utc).isoformat()
+            },
+            "connectMetadata": metadata,
+            **delta
+        }
+
+        os.makedirs(DELTAS_DIR, exist_ok=True)
+        filename = delta_filename(from_version, to_version)
+        stats = writer.write(os.path.join(DELTAS_DIR, filename), document, extra_variants=False)
+
+        index = [entry for entry in index if entry.get('to') != to_version]
+        index.append({
+            "from": from_version,
+            "to": to_version,
+            "url": f"{CDN_DELTAS_URL}/{filename}",
+            "size": stats['bytes'],
+            "gzipSize": stats['gzipBytes'],
+            "changedSections": len(delta['changed']),
+            "addedSections": len(delta['added']),
+            "removedSections": len(delta['removed'])
+        })
+        print(f"  ✓ deltas/{filename} ({stats['bytes'] / 1024:.1f} KB, gzipped {stats['gzipBytes'] / 1024:.1f} KB)")
+        print(f"    +{len(delta['added'])} added, -{len(delta['removed'])} removed, ~{len(delta['changed'])} changed")
+
+    index = index[-DELTA_RETENTION:]
+    prune_deltas(index)
+    return index
+
+
+def prune_deltas(index: List[Dict]) -> None:
+    """Delete delta files that are no longer listed in the index."""
+    keep = {delta_filename(entry['from'], entry['to']) for entry in index}
+    for path in staging.listing(DELTAS_DIR):
+        if os.path.basename(path) not in keep:
+            staging.remove(path)
+            staging.remove(path + ".gz")
@@ -4,15 +4,21 @@ Free Labs Analyzer - Generates free lab slots CDN
 Analyzes lab room usage and identifies free time slots for each lab.
 """
 
-import json
 import os
-import gzip
+import sys
 import requests
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timezone
 from collections import defaultdict
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
+
+import staging
+import upstream
+from artifacts import ArtifactWriter, content_hash, document_hash
+from generate_backup_index import read_backup_metadata
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+TABLE_URL = "https://usis-cdn.eniamza.com/table.json"
 
 # Define time slots
 TIME_SLOTS = [
@@ -140,16 +146,66 @@ def analyze_lab_usage(sections: List[Dict]) -> tuple:
     return lab_occupancy, lab_departments
 
 
-def find_free_slots(lab_occupancy: Dict, lab_departments: Dict) -> Dict:
-    """Find free time slots organized by day and time slot."""
+def time_to_minutes(time_str: str) -> int:
+    """Convert "HH:MM:SS" to minutes since midnight (same parsing as parse_time)."""
+    h, m = parse_time(time_str)
+    return h * 60 + m
+
+
+def build_minute_intervals(lab_occupancy: Dict) -> Dict[str, Dict[str, List[Tuple[int, int, Dict]]]]:
+    """Convert every occupied entry to an integer (start, end, entry) interval once."""
+    return {
+        lab_room: {
+            day: [(time_to_minutes(o['startTime']), time_to_minutes(o['endTime']), o) for o in occupied]
+            for day, occupied in days.items()
+        }
+        for lab_room, days in lab_occupancy.items()
+    }
+
+
+def first_overlapping_entries(intervals: List[Tuple[int, int, Dict]], slot_starts: List[int],
+                              slot_ends: List[int], ends_sorted: bool) -> List[Optional[Dict]]:
+    """For every slot (sorted by start), the first entry in list order overlapping it.
+
+    When slot ends are non-decreasing (any non-overlapping grid), the slots an
+    interval can touch form a contiguous range found by bisection, so the work
+    is proportional to actual overlaps instead of entries x slots.
+    """
+    first = [None] * len(slot_starts)
+    for start, end, entry in intervals:
+        hi = bisect_left(slot_starts, end)
+        lo = bisect_right(slot_ends, start) if ends_sorted else 0
+        for j in range(lo, hi):
+            if first[j] is None and start < slot_ends[j]:
+                first[j] = entry
+    return first
+
+
+def find_free_slots(lab_occupancy: Dict, lab_departments: Dict,
+                    time_slots: List[Tuple[str, str]] = TIME_SLOTS, days: List[str] = DAYS) -> Dict:
+    """Find free time slots organized by day and time slot.
+
+    Occupancy is converted to integer minute intervals once and all slots of a
+    lab/day are resolved in a single batch pass.
+    """
 
     # Structure: {day: {slot: {free: [{lab, depts}], occupied: [{lab, course, dept}]}}}
     slots_data = {}
 
-    for day in DAYS:
-        slots_data[day] = {}
+    order = sorted(range(len(time_slots)), key=lambda i: (time_to_minutes(time_slots[i][0]),
+                                                         time_to_minutes(time_slots[i][1])))
+    slot_starts = [time_to_minutes(time_slots[i][0]) for i in order]
+    slot_ends = [time_to_minutes(time_slots[i][1]) for i in order]
+    ends_sorted = all(a <= b for a, b in zip(slot_ends, slot_ends[1:]))
+
+    intervals = build_minute_intervals(lab_occupancy)
+    lab_rooms = sorted(lab_occupancy.keys())
+    departments = {lab_room: sorted(lab_departments[lab_room]) for lab_room in lab_rooms}
 
-        for slot_start, slot_end in TIME_SLOTS:
+    for day in days:
+        slots_data[day] = {}
+        day_slots = []
+        for slot_start, slot_end in time_slots:
             slot_key = f"{slot_start}-{slot_end}"
             slots_data[day][slot_key] = {
                 'startTime': slot_start,
@@ -157,30 +213,24 @@ def find_free_slots(lab_occupancy: Dict, lab_departments: Dict) -> Dict:
                 'freeLabs': [],
                 'occupiedLabs': []
             }
+            day_slots.append(slots_data[day][slot_key])
+
+        # Check every slot of this day for each lab in one pass
+        for lab_room in lab_rooms:
+            first = first_overlapping_entries(intervals[lab_room].get(day, []),
+                                              slot_starts, slot_ends, ends_sorted)
 
-            # Check each lab for this day/slot
-            for lab_room in sorted(lab_occupancy.keys()):
-                occupied_times = lab_occupancy[lab_room].get(day, [])
-                is_free = True
-                occupied_info = None
-
-                # Check if this slot overlaps with any occupied time
-                for occupied in occupied_times:
-                    if time_overlaps(slot_start, slot_end,
-                                   occupied['startTime'], occupied['endTime']):
-                        is_free = False
-                        occupied_info = occupied
-                        break
-
-                if is_free:
-                    slots_data[day][slot_key]['freeLabs'].append({
+            for sorted_index, slot_index in enumerate(order):
+                occupied_info = first[sorted_index]
+                if occupied_info is None:
+                    day_slots[slot_index]['freeLabs'].append({
                         'labRoom': lab_room,
-                        'departments': sorted(list(lab_departments[lab_room]))
+                        'departments': list(departments[lab_room])
                     })
                 else:
-                    slots_data[day][slot_key]['occupiedLabs'].append({
+                    day_slots[slot_index]['occupiedLabs'].append({
                         'labRoom': lab_room,
-                        'departments': sorted(list(lab_departments[lab_room])),
+                        'departments': list(departments[lab_room]),
                         'courseCode': occupied_info['courseCode'],
                         'sectionName': occupied_info['sectionName'],
                         'department': occupied_info['department']
@@ -189,29 +239,44 @@ def find_free_slots(lab_occupancy: Dict, lab_departments: Dict) -> Dict:
     return slots_data
 
 
-def generate_free_labs_json():
-    """Main function to generate free labs JSON."""
+def generate_free_labs_json(writer: Optional[ArtifactWriter] = None, force: bool = False):
+    """Main function to generate free labs JSON.
+
+    Skips all work when the table.json body and connect.json's semester and
+    lastUpdated (which the output's metadata copies) are the ones the last
+    published run consumed (recorded in writer.hashes) and open_labs.json
+    exists, unless force is set.
+    """
+    writer = writer or ArtifactWriter()
 
     print("=" * 60)
     print("Free Labs Analyzer")
     print("=" * 60)
 
     # Load section data from table.json instead of local latest connect.json
-    table_url = "https://usis-cdn.eniamza.com/table.json"
-    print(f"\nLoading table.json from {table_url}...")
+    # (already downloading in the background when update_cdn prefetched it)
+    print(f"\nLoading table.json from {TABLE_URL}...")
     try:
-        response = requests.get(table_url, timeout=30)
-        response.raise_for_status()
-        sections = response.json()
+        table = upstream.get_cached_json(TABLE_URL)
     except requests.RequestException as e:
         print(f"✗ Failed to load table.json: {e}")
         return False
 
     metadata = {}
-    connect_path = os.path.join(SCRIPT_DIR, "connect.json")
+    # connect.json as published by this run (staged until the run commits)
+    connect_path = staging.resolve(os.path.join(SCRIPT_DIR, "connect.json"))
     if os.path.exists(connect_path):
-        with open(connect_path, 'r', encoding='utf-8') as f:
-            metadata = json.load(f).get('metadata', {})
+        metadata = read_backup_metadata(connect_path)
+    semester = get_current_semester(metadata.get('midExamStartDate'))
+    source_hash = content_hash([semester, metadata.get('lastUpdated')])
+
+    output_path = os.path.join(SCRIPT_DIR, "open_labs.json")
+    if (table.consumed_by(writer.hashes) and writer.hashes.get("openLabsSource") == source_hash
+            and not force and os.path.exists(output_path)):
+        print("✓ table.json and connect metadata unchanged since the last published run; "
+              "open_labs.json kept as-is")
+        return True
+    sections = table.payload
 
     print(f"✓ Loaded {len(sections)} sections")
 
@@ -238,7 +303,7 @@ def generate_free_labs_json():
     # Create output structure
     output = {
         'metadata': {
-            'semester': get_current_semester(metadata.get('midExamStartDate')),
+            'semester': semester,
             'totalLabs': total_labs,
             'totalFreeSlots': total_free_count,
             'totalOccupiedSlots': total_occupied_count,
@@ -251,18 +316,16 @@ def generate_free_labs_json():
         'schedule': slots_data
     }
 
-    # Write to file
-    output_path = os.path.join(SCRIPT_DIR, "open_labs.json")
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    # Write to file along with the gzipped version
+    stats = writer.write(output_path, output,
+                         content_hash=document_hash(output))
 
-    # Write gzipped version
-    gzip_path = output_path + '.gz'
-    with gzip.open(gzip_path, 'wt', encoding='utf-8') as f:
-        json.dump(output, f, separators=(',', ':'), ensure_ascii=False)
+    file_size = stats["bytes"] / 1024
+    gzip_size = stats["gzipBytes"] / 1024
 
-    file_size = os.path.getsize(output_path) / 1024
-    gzip_size = os.path.getsize(gzip_path) / 1024
+    table.mark_consumed(writer.hashes)
+    if writer.hashes is not None:
+        writer.hashes.set("openLabsSource", source_hash)
 
     print(f"\n\u2713 open_labs.json created ({file_size:.1f} KB, gzipped {gzip_size:.1f} KB)")
     print(f"  Total labs: {total_labs}")
@@ -294,5 +357,5 @@ def get_current_semester(mid_exam_start: str) -> str:
 
 
 if __name__ == "__main__":
-    success = generate_free_labs_json()
+    success = generate_free_labs_json(force='--force' in sys.argv)
     exit(0 if success else 1)
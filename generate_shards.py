@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Section Shards Generator - Per-course and per-department section files
+Splits connect.json into courses/<COURSE>.json and departments/<DEPT>.json
+(each with a .gz) plus a shards.json manifest, so a single course lookup is
+a few KB instead of the full multi-MB download.
+"""
+
+import os
+import re
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import staging
+from artifacts import ArtifactWriter, document_hash, file_sha256
+from generate_free_labs import extract_department_from_course
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+COURSES_DIR = os.path.join(SCRIPT_DIR, "courses")
+DEPARTMENTS_DIR = os.path.join(SCRIPT_DIR, "departments")
+MANIFEST_FILE = os.path.join(SCRIPT_DIR, "shards.json")
+CDN_ROOT_URL = "https://connect-cdn.itzmrz.xyz"
+
+
+def shard_key(name: str) -> str:
+    """Filesystem/URL-safe shard name (course codes are already alphanumeric)."""
+    return re.sub(r'[^A-Za-z0-9_-]', '_', name or "UNKNOWN")
+
+
+def group_sections(sections: List[Dict]) -> tuple:
+    """Group sections by course code and by department, keeping upstream order."""
+    by_course = defaultdict(list)
+    by_department = defaultdict(list)
+
+    for section in sections:
+        course_code = section.get('courseCode') or "UNKNOWN"
+        by_course[course_code].append(section)
+        by_department[extract_department_from_course(course_code)].append(section)
+
+    return by_course, by_department
+
+
+def write_shard_set(groups: Dict[str, List[Dict]], directory: str, kind: str,
+                    writer: ArtifactWriter) -> Dict[str, Dict]:
+    """Write one shard per group and return its manifest entries."""
+    os.makedirs(directory, exist_ok=True)
+    dirname = os.path.basename(directory)
+    entries = {}
+
+    for name in sorted(groups):
+        group = groups[name]
+        filename = f"{shard_key(name)}.json"
+        document = {
+            "metadata": {kind: name, "totalSections": len(group)},
+            "sections": group
+        }
+        path = os.path.join(directory, filename)
+        stats = writer.write(path, document, content_hash=document_hash(document), quiet=True,
+                             extra_variants=False)
+
+        entries[name] = {
+            "url": f"{CDN_ROOT_URL}/{dirname}/{filename}",
+            "sections": len(group),
+            "size": stats['bytes'],
+            "gzipSize": stats['gzipBytes'],
+            # Digest of the published file's bytes, for validating a download
+            "sha256": stats.get('sha256') or file_sha256(staging.resolve(path))
+        }
+
+    # Remove shards for courses/departments that no longer exist
+    keep = {f"{shard_key(name)}.json" for name in groups}
+    for path in staging.listing(directory):
+        if os.path.basename(path) not in keep:
+            staging.remove(path)
+            staging.remove(path + ".gz")
+
+    return entries
+
+
+def generate_shards(sections: List[Dict], metadata: Dict, writer: Optional[ArtifactWriter] = None) -> Dict:
+    """Write course/department shards and the shards.json manifest."""
+    writer = writer or ArtifactWriter()
+
+    print("\nGenerating section shards...")
+    by_course, by_department = group_sections(sections)
+
+    courses = write_shard_set(by_course, COURSES_DIR, "courseCode", writer)
+    departments = write_shard_set(by_department, DEPARTMENTS_DIR, "department", writer)
+
+    manifest = {
+        "metadata": {
+            "version": metadata.get('version'),
+            "sourceDataUpdated": metadata.get('lastUpdated'),
+            "totalCourses": len(courses),
+            "totalDepartments": len(departments),
+            "lastUpdated": datetime.now(timezone.utc).isoformat()
+        },
+        "courses": courses,
+        "departments": departments
+    }
+    stats = writer.write(MANIFEST_FILE, manifest)
+
+    written = sum(1 for entry in writer.timings
+                  if not entry.get('skipped') and entry['artifact'].startswith(("courses/", "departments/")))
+    print(f"✓ {len(courses)} course and {len(departments)} department shards ({written} rewritten)")
+    print(f"  Manifest: shards.json ({stats['bytes'] / 1024:.1f} KB, gzipped {stats['gzipBytes'] / 1024:.1f} KB)")
+    return manifest
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Run Report - Structured per-stage instrumentation for update runs
+Stages opened with stage() record duration, the process RSS high-water
+mark, input/output sizes and cache hits, plus peak traced memory when
+tracemalloc is enabled (it roughly doubles the run time, so update_cdn.py
+only turns it on with --trace-memory). The active report is written to
+run_report.json at the end of the run and, optionally, in Prometheus text
+exposition format for a node-exporter textfile collector.
+
+Code deep in the pipeline calls the module-level stage(); it is a no-op
+when no report is active, so library use and tests are unaffected.
+"""
+
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import upstream
+
+try:
+    import resource
+except ImportError:  # Windows has no getrusage()
+    resource = None
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPORT_FILE = os.path.join(SCRIPT_DIR, "run_report.json")
+METRIC_PREFIX = "mrz_cdn"
+
+_active: Optional["RunReport"] = None
+
+
+class RunReport:
+    """Collects stage records for one update run.
+
+    With an ArtifactWriter attached, each stage also reports the bytes the
+    writer produced during it (outputBytes, all variants included), the
+    artifacts written and the artifacts skipped by a content hash match
+    (cacheHits).
+    """
+
+    def __init__(self, writer=None, trace_memory: bool = False):
+        self.writer = writer
+        self.trace_memory = trace_memory
+        self.stages: List[Dict] = []
+        self.status = "running"
+        self._stack: List[Dict] = []
+        self._owns_tracing = False
+        self._started = time.perf_counter()
+        self._started_at = datetime.now(timezone.utc).isoformat()
+        self._duration_ms: Optional[float] = None
+
+    def start(self) -> "RunReport":
+        global _active
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+        _active = self
+        return self
+
+    def finish(self, status: Optional[str] = None) -> None:
+        global _active
+        if status is not None:
+            self.status = status
+        self._duration_ms = _elapsed_ms(self._started)
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+        if _active is self:
+            _active = None
+
+    @property
+    def tracing(self) -> bool:
+        return self.trace_memory and tracemalloc.is_tracing()
+
+    @contextmanager
+    def stage(self, name: str, **info):
+        """Measure a block; the yielded dict accepts inputBytes, cacheHits, etc."""
+        record = {"stage": name, "depth": len(self._stack), **info}
+        timings_before = len(self.writer.timings) if self.writer is not None else 0
+
+        if self.tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            # Keep the enclosing stage's peak before resetting for this one
+            if self._stack:
+                self._stack[-1]["_peak"] = max(self._stack[-1]["_peak"], peak)
+            tracemalloc.reset_peak()
+            record["_peak"] = 0
+            record["_base"] = current
+
+        self._stack.append(record)
+        self.stages.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as error:
+            record["error"] = type(error).__name__
+            raise
+        finally:
+            record["durationMs"] = _elapsed_ms(start)
+            max_rss = _max_rss_kb()
+            if max_rss is not None:
+                record["maxRssKB"] = max_rss
+            self._stack.pop()
+
+            if self.tracing:
+                _, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, record.pop("_peak"))
+                record["peakMemoryKB"] = round(peak / 1024, 1)
+                record["allocatedKB"] = round((peak - record.pop("_base")) / 1024, 1)
+                if self._stack:
+                    self._stack[-1]["_peak"] = max(self._stack[-1]["_peak"], peak)
+            else:
+                record.pop("_peak", None)
+                record.pop("_base", None)
+
+            if self.writer is not None:
+                entries = [entry for entry in self.writer.timings[timings_before:]
+                           if not entry["artifact"].startswith("<")]
+                written = [entry for entry in entries if not entry.get("skipped")]
+                record.setdefault("outputBytes", sum(_artifact_bytes(entry) for entry in written))
+                record["artifactsWritten"] = len(written)
+                record["cacheHits"] = record.get("cacheHits", 0) + len(entries) - len(written)
+
+    def add_stage(self, name: str, **fields) -> None:
+        """Record a stage measured elsewhere (e.g. aggregated writer timings)."""
+        self.stages.append({"stage": name, "depth": 0, **fields})
+
+    def add_compress_stage(self) -> None:
+        """Summarize all encoding/compression done by the attached writer as one stage.
+
+        Its time overlaps the stages that wrote the artifacts.
+        """
+        if self.writer is None:
+            return
+        entries = [entry for entry in self.writer.timings if not entry.get("skipped")]
+        self.add_stage(
+            "compress",
+            durationMs=round(sum(entry["compressMs"] for entry in entries), 2),
+            encodeMs=round(sum(entry["encodeMs"] for entry in entries), 2),
+            inputBytes=sum(entry["bytes"] for entry in entries if not entry["artifact"].startswith("<")),
+            outputBytes=sum(v["bytes"] for entry in entries for v in entry.get("variants", {}).values()),
+            artifactsWritten=sum(1 for entry in entries if entry.get("variants")),
+            cacheHits=sum(1 for entry in self.writer.timings if entry.get("skipped")),
+        )
+
+    def document(self) -> Dict:
+        return {
+            "metadata": {
+                "status": self.status,
+                "startedAt": self._started_at,
+                "durationMs": self._duration_ms if self._duration_ms is not None else _elapsed_ms(self._started),
+                "python": platform.python_version(),
+                "traceMemory": self.trace_memory,
+                "maxRssKB": _max_rss_kb(),
+                "upstreamCache": dict(upstream.cache_stats),
+            },
+            "stages": self.stages
+        }
+
+    def write(self, path: str = REPORT_FILE) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.document(), f, indent=2)
+            f.write("\n")
+
+    def prometheus_text(self) -> str:
+        """Top-level stage metrics in Prometheus text exposition format."""
+        metrics = (
+            ("stage_duration_seconds", "Wall time per update stage", "durationMs", 1 / 1000),
+            ("stage_peak_memory_bytes", "Peak traced Python memory per update stage", "peakMemoryKB", 1024),
+            ("stage_max_rss_bytes", "Process RSS high-water mark at the end of each stage", "maxRssKB", 1024),
+            ("stage_input_bytes", "Bytes read per update stage", "inputBytes", 1),
+            ("stage_output_bytes", "Bytes written per update stage", "outputBytes", 1),
+            ("stage_cache_hits", "Artifacts skipped by content hash per update stage", "cacheHits", 1),
+        )
+        document = self.document()
+        lines = []
+        for metric, help_text, field, scale in metrics:
+            samples = [(record["stage"], record[field]) for record in self.stages
+                       if field in record and record.get("depth", 0) == 0]
+            if not samples:
+                continue
+            lines.append(f"# HELP {METRIC_PREFIX}_{metric} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{metric} gauge")
+            lines.extend(f'{METRIC_PREFIX}_{metric}{{stage="{name}"}} {_sample(metric, value * scale)}'
+                         for name, value in samples)
+
+        lines.append(f"# HELP {METRIC_PREFIX}_run_duration_seconds Wall time of the whole update run")
+        lines.append(f"# TYPE {METRIC_PREFIX}_run_duration_seconds gauge")
+        lines.append(f'{METRIC_PREFIX}_run_duration_seconds{{status="{self.status}"}} '
+                     f'{_sample("seconds", document["metadata"]["durationMs"] / 1000)}')
+        lines.append(f"# HELP {METRIC_PREFIX}_upstream_cache_total Upstream HTTP cache outcomes")
+        lines.append(f"# TYPE {METRIC_PREFIX}_upstream_cache_total counter")
+        lines.extend(f'{METRIC_PREFIX}_upstream_cache_total{{outcome="{outcome}"}} {count}'
+                     for outcome, count in document["metadata"]["upstreamCache"].items())
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        # Write-then-rename so a textfile collector never reads a partial file
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(path + ".tmp", path)
+
+
+class _NullStage(dict):
+    """Stand-in record when no report is active."""
+
+
+@contextmanager
+def stage(name: str, **info):
+    """Measure a block in the active report (no-op without one)."""
+    if _active is None:
+        yield _NullStage()
+        return
+    with _active.stage(name, **info) as record:
+        yield record
+
+
+def active() -> Optional[RunReport]:
+    return _active
+
+
+def _artifact_bytes(entry: Dict) -> int:
+    return entry["bytes"] + sum(variant["bytes"] for variant in entry.get("variants", {}).values())
+
+
+def _sample(metric: str, value: float) -> str:
+    """Millisecond precision for durations, whole numbers for bytes and counts."""
+    return f"{value:.3f}" if metric.endswith("seconds") else str(round(value))
+
+
+def _max_rss_kb() -> Optional[int]:
+    """Process RSS high-water mark in KB, or None where getrusage() is unavailable."""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux but in bytes on macOS
+    return max_rss // 1024 if sys.platform == "darwin" else max_rss
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
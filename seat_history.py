@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Seat History Store - Append-only seat consumption time series per semester
+Every published run appends one compressed snapshot (sectionId,
+consumedSeat, capacity, courseCode) to seat_history/<semester>.bin, so
+seat-fill curves can be read back without replaying git history of
+connect.json. A small seat_history.json summary is published alongside.
+
+File layout: a sequence of chunks, each a fixed header
+(magic, timestamp, row count, payload length, crc32) followed by a
+zlib-compressed payload of little-endian column arrays and the course code
+table. A truncated trailing chunk (interrupted run) is ignored on read and
+dropped before the next append. During a staged run the append goes to a
+staged copy of the file, published with the rest of the generation.
+
+Usage:
+    python seat_history.py curve CSE110 [--semester fall2026]
+"""
+
+import argparse
+import os
+import re
+import struct
+import sys
+import zlib
+from array import array
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import staging
+from artifacts import ArtifactWriter
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_DIR = os.path.join(SCRIPT_DIR, "seat_history")
+SUMMARY_FILE = os.path.join(SCRIPT_DIR, "seat_history.json")
+
+CHUNK_MAGIC = b"SEAT"
+# magic, unix timestamp, rows, payload bytes, payload crc32
+CHUNK_HEADER = struct.Struct("<4sdIII")
+
+SEMESTER_PATTERN = re.compile(r'^(spring|summer|fall)(\d{4})$', re.IGNORECASE)
+SEASON_ORDER = {"spring": 0, "summer": 1, "fall": 2}
+
+# Windows reported as seat changes in the published summary
+SUMMARY_WINDOWS = {"change24h": timedelta(hours=24), "change7d": timedelta(days=7)}
+
+
+class Snapshot(NamedTuple):
+    timestamp: float
+    section_ids: array
+    consumed: array
+    capacity: array
+    courses: List[str]  # course code per row
+
+    def seats(self) -> Dict[int, Tuple[int, int]]:
+        """sectionId -> (consumedSeat, capacity)."""
+        return {sid: (used, cap) for sid, used, cap in zip(self.section_ids, self.consumed, self.capacity)}
+
+
+def history_path(semester: str, directory: str = HISTORY_DIR) -> str:
+    return os.path.join(directory, f"{semester.lower()}.bin")
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def encode_snapshot(sections: List[Dict], timestamp: float) -> bytes:
+    """One chunk (header + compressed payload) for the sections' seat counts."""
+    ordered = sorted(sections, key=lambda section: section['sectionId'])
+    course_codes = list(dict.fromkeys(section.get('courseCode') or "" for section in ordered))
+    course_ids = {code: index for index, code in enumerate(course_codes)}
+
+    section_ids = array("I", (section['sectionId'] for section in ordered))
+    consumed = array("i", (section.get('consumedSeat') or 0 for section in ordered))
+    capacity = array("i", (section.get('capacity') or 0 for section in ordered))
+    course_index = array("I", (course_ids[section.get('courseCode') or ""] for section in ordered))
+
+    # Column-major layout: each array compresses against its own history
+    payload = zlib.compress(b"".join([
+        _little_endian(section_ids),
+        _little_endian(consumed),
+        _little_endian(capacity),
+        _little_endian(course_index),
+        "\n".join(course_codes).encode("utf-8"),
+    ]), 9)
+    header = CHUNK_HEADER.pack(CHUNK_MAGIC, timestamp, len(ordered), len(payload), zlib.crc32(payload))
+    return header + payload
+
+
+def decode_snapshot(header: bytes, payload: bytes) -> Snapshot:
+    _, timestamp, rows, _, _ = CHUNK_HEADER.unpack(header)
+    data = zlib.decompress(payload)
+    width = rows * 4
+    section_ids = _from_little_endian("I", data[:width])
+    consumed = _from_little_endian("i", data[width:2 * width])
+    capacity = _from_little_endian("i", data[2 * width:3 * width])
+    course_index = _from_little_endian("I", data[3 * width:4 * width])
+    course_codes = data[4 * width:].decode("utf-8").split("\n")
+    return Snapshot(timestamp, section_ids, consumed, capacity, [course_codes[i] for i in course_index])
+
+
+def _scan_chunks(path: str) -> Iterator[Tuple[int, bytes, bytes]]:
+    """Yield (offset, header, payload) for every complete, intact chunk."""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        offset = 0
+        while True:
+            header = f.read(CHUNK_HEADER.size)
+            if len(header) < CHUNK_HEADER.size:
+                return
+            magic, _, _, length, crc = CHUNK_HEADER.unpack(header)
+            payload = f.read(length)
+            if magic != CHUNK_MAGIC or len(payload) < length or zlib.crc32(payload) != crc:
+                return
+            yield offset, header, payload
+            offset += CHUNK_HEADER.size + length
+
+
+class SeatHistory:
+    """Reader/appender for one semester's seat history file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @classmethod
+    def for_semester(cls, semester: str, directory: str = HISTORY_DIR) -> "SeatHistory":
+        return cls(history_path(semester, directory))
+
+    def snapshots(self) -> Iterator[Snapshot]:
+        for _, header, payload in _scan_chunks(staging.resolve(self.path)):
+            yield decode_snapshot(header, payload)
+
+    def latest(self) -> Optional[Snapshot]:
+        last = None
+        for _, header, payload in _scan_chunks(staging.resolve(self.path)):
+            last = (header, payload)
+        return decode_snapshot(*last) if last else None
+
+    def append(self, sections: List[Dict], timestamp: Optional[float] = None) -> bool:
+        """Append a snapshot unless seat counts are identical to the latest one.
+
+        Returns True when a chunk was written.
+        """
+        timestamp = datetime.now(timezone.utc).timestamp() if timestamp is None else timestamp
+        chunk = encode_snapshot(sections, timestamp)
+
+        end = 0
+        last_payload = None
+        for offset, header, payload in _scan_chunks(staging.resolve(self.path)):
+            end = offset + len(header) + len(payload)
+            last_payload = payload
+        if last_payload is not None and last_payload == chunk[CHUNK_HEADER.size:]:
+            return False
+
+        path = staging.path_for_append(self.path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "ab") as f:
+            # Drop a partial chunk left behind by an interrupted run
+            if f.tell() != end:
+                f.truncate(end)
+            f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        return True
+
+    def series(self, section_ids=None, course_code: Optional[str] = None) -> Dict[int, List[Tuple[float, int, int]]]:
+        """sectionId -> [(timestamp, consumedSeat, capacity), ...] across snapshots.
+
+        Restrict to section_ids and/or the sections of course_code.
+        """
+        wanted = set(section_ids) if section_ids is not None else None
+        result = defaultdict(list)
+        for snapshot in self.snapshots():
+            for sid, used, cap, course in zip(snapshot.section_ids, snapshot.consumed,
+                                              snapshot.capacity, snapshot.courses):
+                if wanted is not None and sid not in wanted:
+                    continue
+                if course_code is not None and course != course_code:
+                    continue
+                result[sid].append((snapshot.timestamp, used, cap))
+        return dict(result)
+
+    def fill_curve(self, course_code: str) -> List[Tuple[float, int, int]]:
+        """[(timestamp, consumed, capacity)] summed over a course's sections."""
+        curve = []
+        for snapshot in self.snapshots():
+            used = cap = 0
+            for course, seats, capacity in zip(snapshot.courses, snapshot.consumed, snapshot.capacity):
+                if course == course_code:
+                    used += seats
+                    cap += capacity
+            if cap or used:
+                curve.append((snapshot.timestamp, used, cap))
+        return curve
+
+
+def _course_totals(snapshot: Snapshot) -> Dict[str, List[int]]:
+    totals = defaultdict(lambda: [0, 0])
+    for course, used, cap in zip(snapshot.courses, snapshot.consumed, snapshot.capacity):
+        totals[course][0] += used
+        totals[course][1] += cap
+    return totals
+
+
+def build_summary(history: SeatHistory, semester: str) -> Dict:
+    """Latest per-course fill plus seat changes over the summary windows."""
+    snapshots = list(history.snapshots())
+    latest = snapshots[-1] if snapshots else None
+    courses = {}
+
+    if latest is not None:
+        current = _course_totals(latest)
+        baselines = {}
+        for name, window in SUMMARY_WINDOWS.items():
+            cutoff = latest.timestamp - window.total_seconds()
+            baseline = next((s for s in reversed(snapshots) if s.timestamp <= cutoff), snapshots[0])
+            baselines[name] = _course_totals(baseline)
+
+        for course in sorted(current):
+            used, cap = current[course]
+            entry = {"consumedSeat": used, "capacity": cap,
+                     "fillPercent": round(used / cap * 100, 1) if cap else None}
+            for name, totals in baselines.items():
+                entry[name] = used - totals.get(course, [used, cap])[0]
+            courses[course] = entry
+
+    def iso(timestamp: float) -> str:
+        return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+    return {
+        "metadata": {
+            "semester": semester,
+            "snapshots": len(snapshots),
+            "firstSnapshot": iso(snapshots[0].timestamp) if snapshots else None,
+            "lastSnapshot": iso(latest.timestamp) if latest else None,
+            "history": f"seat_history/{os.path.basename(history.path)}",
+            "lastUpdated": datetime.now(timezone.utc).isoformat()
+        },
+        "courses": courses
+    }
+
+
+def record_seat_snapshot(sections: List[Dict], semester: str, writer: Optional[ArtifactWriter] = None,
+                         timestamp: Optional[float] = None) -> Dict:
+    """Append this run's seat counts and refresh seat_history.json."""
+    writer = writer or ArtifactWriter()
+    history = SeatHistory.for_semester(semester)
+
+    appended = history.append(sections, timestamp)
+    summary = build_summary(history, semester)
+    writer.write(SUMMARY_FILE, summary)
+
+    path = staging.resolve(history.path)
+    size = os.path.getsize(path) / 1024 if os.path.exists(path) else 0
+    state = "snapshot appended" if appended else "seats unchanged, no snapshot"
+    print(f"✓ seat_history/{os.path.basename(history.path)}: {state} "
+          f"({summary['metadata']['snapshots']} snapshots, {size:.1f} KB)")
+    return summary
+
+
+def semester_sort_key(semester: str) -> Tuple[int, int]:
+    """spring2026 < summer2026 < fall2026 < spring2027; unknown names sort first."""
+    match = SEMESTER_PATTERN.match(semester)
+    if not match:
+        return (0, -1)
+    return (int(match.group(2)), SEASON_ORDER[match.group(1).lower()])
+
+
+def latest_semester(directory: str = HISTORY_DIR) -> Optional[str]:
+    """Newest semester with a history file, by name (mtimes are meaningless after a checkout)."""
+    semesters = [os.path.splitext(os.path.basename(path))[0]
+                 for path in staging.listing(directory, "*.bin")]
+    if not semesters:
+        return None
+    return max(semesters, key=semester_sort_key)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Query the seat consumption history.")
+    parser.add_argument('--semester', help="e.g. fall2026 (default: the newest semester)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    curve = commands.add_parser('curve', help="fill curve of a course")
+    curve.add_argument('course')
+    args = parser.parse_args(argv)
+
+    semester = args.semester or latest_semester()
+    if semester is None:
+        print("✗ No seat history recorded yet")
+        return 1
+
+    points = SeatHistory.for_semester(semester).fill_curve(args.course)
+    if not points:
+        print(f"✗ No history for {args.course} in {semester}")
+        return 1
+
+    print(f"{args.course} ({semester}):")
+    for timestamp, used, cap in points:
+        when = datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d %H:%M")
+        print(f"  {when}  {used:>5}/{cap:<5} ({used / cap * 100 if cap else 0:.1f}%)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
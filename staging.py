@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Staged Publish - Build a run's artifacts aside, then publish them as one generation
+While a Generation is active, every artifact the run writes (through
+ArtifactWriter, write_json_file, version.json, the ETag, content hashes)
+goes to .staging/files/<same relative path>, and deletions are recorded
+instead of applied. Append-only stores append to a staged copy of the
+published file (path_for_append()). Code that reads an artifact written
+earlier in the same run goes through resolve()/listing(), so it sees the
+staged copy.
+
+commit() verifies every staged file, writes a journal (the point of no
+return), renames the files into place and finally writes
+publish_manifest.json with the new generation number. A run that fails
+before the journal leaves the published tree untouched - including
+version.json, so a retry does not bump the version twice. A run interrupted
+after the journal is rolled forward by the next run's begin().
+
+The module-level helpers are pass-throughs when no generation is active,
+so library use, benchmarks and tests write in place as before.
+"""
+
+import glob
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+STAGING_NAME = ".staging"
+MANIFEST_NAME = "publish_manifest.json"
+JOURNAL_NAME = "journal.json"
+ZSTD_DICTS_NAME = "zstd_dicts"
+
+_active: Optional["Generation"] = None
+
+
+class StagingError(Exception):
+    """A staged artifact failed verification; nothing was published."""
+
+
+def _write_durably(path: str, data: bytes) -> None:
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+
+
+def verify_file(name: str, data: bytes, zstd_dictionary=None) -> None:
+    """Raise StagingError when an artifact's bytes don't decode as its type.
+
+    zstd_dictionary(dict_id) returns the dictionary a .zst frame names, or None.
+    """
+    try:
+        if name.endswith(".json"):
+            json.loads(data)
+        elif name.endswith(".json.gz"):
+            json.loads(gzip.decompress(data))
+        elif name.endswith(".json.br") and brotli is not None:
+            json.loads(brotli.decompress(data))
+        elif name.endswith(".json.zst") and zstandard is not None:
+            dict_id = zstandard.get_frame_parameters(data).dict_id
+            dictionary = zstd_dictionary(dict_id) if dict_id and zstd_dictionary else None
+            if dict_id and dictionary is None:
+                raise StagingError(f"{name}: zstd dictionary {dict_id} is not published")
+            decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+            json.loads(decompressor.decompress(data))
+    except StagingError:
+        raise
+    except Exception as e:
+        raise StagingError(f"{name}: {e}") from e
+
+
+class Generation:
+    """One run's staged artifact set."""
+
+    def __init__(self, root: str = SCRIPT_DIR, staging_dir: Optional[str] = None,
+                 manifest_path: Optional[str] = None):
+        self.root = os.path.abspath(root)
+        self.staging_dir = staging_dir or os.path.join(self.root, STAGING_NAME)
+        self.files_dir = os.path.join(self.staging_dir, "files")
+        self.journal_path = os.path.join(self.staging_dir, JOURNAL_NAME)
+        self.manifest_path = manifest_path or os.path.join(self.root, MANIFEST_NAME)
+        self._staged: Dict[str, str] = {}   # relative path -> staged file
+        self._removed = set()
+        self._lock = threading.Lock()
+
+    def begin(self) -> "Generation":
+        """Finish or drop what a previous run left behind, then become the active generation."""
+        global _active
+        self.recover()
+        _active = self
+        return self
+
+    def _relative(self, path: str) -> str:
+        relative = os.path.relpath(os.path.abspath(path), self.root)
+        if relative.startswith(".."):
+            raise ValueError(f"{path} is outside {self.root}")
+        return relative
+
+    def _target(self, relative: str) -> str:
+        return os.path.join(self.root, relative)
+
+    def path_for(self, path: str) -> str:
+        """Where to write path during this run."""
+        relative = self._relative(path)
+        staged = os.path.join(self.files_dir, relative)
+        with self._lock:
+            self._staged[relative] = staged
+            self._removed.discard(relative)
+        os.makedirs(os.path.dirname(staged), exist_ok=True)
+        return staged
+
+    def path_for_append(self, path: str) -> str:
+        """Where to append to path during this run.
+
+        The first call copies the published file (if any) into the staging
+        area, so appends reach the tree only with the commit.
+        """
+        relative = self._relative(path)
+        with self._lock:
+            staged = self._staged.get(relative)
+        if staged is not None:
+            return staged
+        staged = self.path_for(path)
+        if os.path.exists(path):
+            shutil.copyfile(path, staged)
+        return staged
+
+    def resolve(self, path: str) -> str:
+        """Where to read path during this run (the staged copy if there is one)."""
+        return self._staged.get(self._relative(path), path)
+
+    def remove(self, path: str) -> None:
+        """Delete path when the generation is committed."""
+        relative = self._relative(path)
+        with self._lock:
+            staged = self._staged.pop(relative, None)
+            if os.path.exists(self._target(relative)):
+                self._removed.add(relative)
+        if staged is not None and os.path.exists(staged):
+            os.remove(staged)
+
+    def listing(self, directory: str, pattern: str = "*.json") -> List[str]:
+        """glob() of directory as it will look after the commit."""
+        paths = {os.path.abspath(path) for path in glob.glob(os.path.join(directory, pattern))}
+        staged_directory = os.path.join(self.files_dir, self._relative(directory))
+        for path in glob.glob(os.path.join(staged_directory, pattern)):
+            paths.add(os.path.join(os.path.abspath(directory), os.path.relpath(path, staged_directory)))
+        return sorted(path for path in paths if self._relative(path) not in self._removed)
+
+    def staged(self) -> List[str]:
+        return sorted(self._staged)
+
+    def verify(self) -> Dict[str, Dict]:
+        """{relative path: {"bytes", "sha256"}} of every staged file, after checking it decodes."""
+        entries = {}
+        for relative, staged in sorted(self._staged.items()):
+            try:
+                with open(staged, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                raise StagingError(f"{relative}: staged file is missing")
+            verify_file(relative, data, self.zstd_dictionary)
+            entries[relative] = {"bytes": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+        return entries
+
+    def zstd_dictionary(self, dict_id: int):
+        """The published (or staged) zstd_dicts/<dict_id>.dict, or None."""
+        path = self.resolve(os.path.join(self.root, ZSTD_DICTS_NAME, f"{dict_id}.dict"))
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return zstandard.ZstdCompressionDict(f.read())
+
+    def previous_generation(self) -> int:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return int(json.load(f).get("generation", 0))
+        except (FileNotFoundError, json.JSONDecodeError, ValueError, AttributeError):
+            return 0
+
+    def commit(self, **metadata) -> Optional[Dict]:
+        """Verify, journal and publish the staged files; returns the manifest (None if nothing staged)."""
+        global _active
+        if not self._staged and not self._removed:
+            self.discard()
+            return None
+
+        files = self.verify()
+        manifest = {
+            "generation": self.previous_generation() + 1,
+            "publishedAt": datetime.now(timezone.utc).isoformat(),
+            **metadata,
+            "files": files,
+            "removed": sorted(self._removed),
+        }
+        _write_durably(self.journal_path, json.dumps(manifest, indent=2).encode("utf-8"))
+        self._apply(manifest)
+
+        self._staged.clear()
+        self._removed.clear()
+        if _active is self:
+            _active = None
+        return manifest
+
+    def _apply(self, manifest: Dict) -> None:
+        """Move a journaled generation into place; safe to repeat after a crash."""
+        for relative in manifest["files"]:
+            staged = os.path.join(self.files_dir, relative)
+            if os.path.exists(staged):
+                os.makedirs(os.path.dirname(self._target(relative)) or ".", exist_ok=True)
+                os.replace(staged, self._target(relative))
+        for relative in manifest["removed"]:
+            if os.path.exists(self._target(relative)):
+                os.remove(self._target(relative))
+
+        _write_durably(self.manifest_path, (json.dumps(manifest, indent=2) + "\n").encode("utf-8"))
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+    def recover(self) -> Optional[str]:
+        """Roll forward a journaled generation or drop an unfinished one.
+
+        Returns "rolled-forward", "discarded" or None when there was nothing to do.
+        """
+        if not os.path.isdir(self.staging_dir):
+            return None
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            # The run died before its commit point; nothing of it was published
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+            print("⚠️  Discarded the staged files of an unfinished run")
+            return "discarded"
+
+        self._apply(manifest)
+        print(f"⚠️  Completed the interrupted publish of generation {manifest['generation']}")
+        return "rolled-forward"
+
+    def discard(self) -> None:
+        """Drop everything staged; the published tree is left as it was.
+
+        A journaled generation is kept for recover() to finish.
+        """
+        global _active
+        if not os.path.exists(self.journal_path):
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+        self._staged.clear()
+        self._removed.clear()
+        if _active is self:
+            _active = None
+
+
+def active() -> Optional[Generation]:
+    return _active
+
+
+def path_for(path: str) -> str:
+    """Write target for path: its staged copy during a staged run, else path itself."""
+    return _active.path_for(path) if _active is not None else path
+
+
+def path_for_append(path: str) -> str:
+    """Append target for path: a staged copy of it during a staged run, else path itself."""
+    return _active.path_for_append(path) if _active is not None else path
+
+
+def resolve(path: str) -> str:
+    """Read location of path, seeing files staged earlier in this run."""
+    return _active.resolve(path) if _active is not None else path
+
+
+def remove(path: str) -> None:
+    """Delete path (at commit time during a staged run); missing files are ignored."""
+    if _active is not None:
+        _active.remove(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def listing(directory: str, pattern: str = "*.json") -> List[str]:
+    """Files in directory matching pattern, including staged and excluding removed ones."""
+    if _active is not None:
+        return _active.listing(directory, pattern)
+    return sorted(glob.glob(os.path.join(directory, pattern)))
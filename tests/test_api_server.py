@@ -0,0 +1,188 @@
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import api_server
+
+SECTIONS = [
+    {
+        "sectionId": 101, "courseCode": "CSE110", "sectionName": "01", "faculties": "NZRF", "roomName": "10B-17C",
+        "sectionSchedule": {"classSchedules": [{"day": "TUESDAY", "startTime": "09:30:00", "endTime": "10:50:00"}]},
+        "labSchedules": [{"day": "MONDAY", "startTime": "11:00:00", "endTime": "13:50:00"}],
+        "labRoomName": "AS2-12L", "labCourseCode": "CSE110L",
+    },
+    {
+        "sectionId": 102, "courseCode": "CSE110", "sectionName": "2", "faculties": "ABC", "roomName": "09A-01C",
+        "sectionSchedule": {"classSchedules": [{"day": "SUNDAY", "startTime": "08:00:00", "endTime": "09:20:00"}]},
+    },
+    {
+        "sectionId": 201, "courseCode": "MAT120", "sectionName": "01", "faculties": "NZRF", "roomName": "09A-01C",
+        "sectionSchedule": {"classSchedules": [{"day": "TUESDAY", "startTime": "11:00:00", "endTime": "12:20:00"}]},
+    },
+]
+
+EXAMS = [
+    {"courseCode": "CSE110", "sectionName": "01", "sectionId": 101, "midExamDate": "2026-11-21", "finalExamDate": "2027-01-10"},
+    {"courseCode": "CSE110", "sectionName": "02", "sectionId": 102, "midExamDate": "2026-11-22", "finalExamDate": "2027-01-10"},
+    {"courseCode": "MAT120", "sectionName": "01", "sectionId": 201, "midExamDate": "2026-11-21", "finalExamDate": None},
+]
+
+OPEN_LABS = {
+    "metadata": {"lastUpdated": "2026-10-01"},
+    "schedule": {"SUNDAY": {
+        "08:00:00-09:20:00": {"startTime": "08:00:00", "endTime": "09:20:00", "freeLabs": [{"labRoom": "AS2-12L"}]},
+        "09:30:00-10:50:00": {"startTime": "09:30:00", "endTime": "10:50:00", "freeLabs": []},
+    }},
+}
+
+
+def write_connect(root, sections, version="2.1.0"):
+    document = {"metadata": {"version": version, "lastUpdated": "2026-10-01"}, "sections": sections}
+    body = json.dumps(document).encode("utf-8")
+    Path(root, "connect.json").write_bytes(body)
+    Path(root, "connect.json.gz").write_bytes(gzip.compress(body))
+
+
+class ApiServerTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        write_connect(self.root, SECTIONS)
+        Path(self.root, "exams.json").write_text(json.dumps({"metadata": {}, "exams": EXAMS}))
+        Path(self.root, "open_labs.json").write_text(json.dumps(OPEN_LABS))
+        self.server = api_server.ApiServer(self.root)
+
+    def get(self, target, **headers):
+        raw = self.server.respond("GET", target, {k.replace("_", "-").lower(): v for k, v in headers.items()})
+        head, _, body = raw.partition(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        response_headers = dict(line.split(": ", 1) for line in lines[1:])
+        return int(lines[0].split()[1]), response_headers, body
+
+    def get_json(self, target):
+        status, _, body = self.get(target)
+        self.assertEqual(status, 200, body)
+        return json.loads(body)
+
+    def test_section_filters_combine(self):
+        ids = lambda target: [s["sectionId"] for s in self.get_json(target)["sections"]]
+
+        self.assertEqual(ids("/v1/connect/sections?course=cse 110"), [101, 102])
+        self.assertEqual(ids("/v1/connect/sections?course=CSE110&section=2"), [102])
+        self.assertEqual(ids("/v1/connect/sections?faculty=nzrf"), [101, 201])
+        self.assertEqual(ids("/v1/connect/sections?room=AS2-12L"), [101])
+        self.assertEqual(ids("/v1/connect/sections?day=tuesday&start=10:00&end=11:30"), [101, 201])
+        self.assertEqual(ids("/v1/connect/sections?day=MONDAY&faculty=ABC"), [])
+        self.assertEqual(ids("/v1/connect/sections?limit=1&offset=1"), [102])
+        self.assertEqual(self.get_json("/v1/connect/sections/201")["courseCode"], "MAT120")
+
+        self.assertEqual(self.get("/v1/connect/sections?day=FUNDAY")[0], 400)
+        self.assertEqual(self.get("/v1/connect/sections/999")[0], 404)
+        self.assertEqual(self.get("/v1/stable/sections")[0], 404)
+
+    def test_exams_open_labs_and_free_rooms(self):
+        exams = lambda target: [e["sectionId"] for e in self.get_json(target)["exams"]]
+        self.assertEqual(exams("/v1/exams?date=2026-11-21"), [101, 201])
+        self.assertEqual(exams("/v1/exams?course=CSE110&date=2027-01-10&type=final"), [101, 102])
+        self.assertEqual(exams("/v1/exams?course=CSE110&section=2"), [102])
+
+        slots = self.get_json("/v1/open-labs?day=sunday&time=08:30")["slots"]
+        self.assertEqual(list(slots), ["08:00:00-09:20:00"])
+        rooms = self.get_json("/v1/free-rooms?day=TUESDAY&start=09:00&end=10:00")["rooms"]
+        self.assertEqual(rooms, ["09A-01C", "AS2-12L"])
+        self.assertEqual(self.get("/v1/free-rooms?day=FUNDAY&start=09:00&end=10:00")[0], 400)
+
+    @mock.patch.object(api_server, "COMPRESS_MIN_BYTES", 0)
+    def test_etag_304_and_precompressed_bodies(self):
+        status, headers, body = self.get("/v1/connect/sections", accept_encoding="gzip, br")
+        self.assertEqual(headers["Content-Encoding"], "br" if api_server.brotli else "gzip")
+        self.assertEqual(headers["Vary"], "Accept-Encoding")
+
+        status, _, body = self.get("/v1/connect/sections", accept_encoding="gzip, br",
+                                   if_none_match=headers["ETag"])
+        self.assertEqual((status, body), (304, b""))
+        # A different representation does not validate against that tag
+        self.assertEqual(self.get("/v1/connect/sections", if_none_match=headers["ETag"])[0], 200)
+
+        # Generated files are served from their precompressed siblings
+        status, headers, body = self.get("/connect.json", accept_encoding="gzip")
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(body, Path(self.root, "connect.json.gz").read_bytes())
+        self.assertEqual(self.get("/../secret.json")[0], 404)
+
+    def test_reloads_a_new_generation(self):
+        self.assertEqual(self.get_json("/v1/status")["datasets"]["connect"]["version"], "2.1.0")
+        self.assertFalse(self.server.reload_if_changed())
+
+        write_connect(self.root, SECTIONS[:1], version="2.1.1")
+        Path(self.root, "publish_manifest.json").write_text(json.dumps({"generation": 7}))
+        os.utime(os.path.join(self.root, "connect.json"), ns=(1, 1))
+
+        self.assertTrue(self.server.reload_if_changed())
+        status = self.get_json("/v1/status")
+        self.assertEqual((status["generation"], status["datasets"]["connect"]["version"]), (7, "2.1.1"))
+        self.assertEqual(len(self.get_json("/v1/connect/sections?course=CSE110")["sections"]), 1)
+
+    def publish(self, generation, sections):
+        write_connect(self.root, sections, version=f"2.1.{generation}")
+        Path(self.root, "publish_manifest.json").write_text(json.dumps({"generation": generation}))
+
+    @mock.patch.object(api_server, "LOAD_RETRY_DELAY", 0)
+    def test_reload_never_mixes_two_generations(self):
+        # A publish still being applied is not loaded
+        journal = Path(self.root, ".staging", "journal.json")
+        journal.parent.mkdir()
+        journal.write_text("{}")
+        self.publish(7, SECTIONS[:1])
+        self.assertFalse(self.server.reload_if_changed())
+        journal.unlink()
+
+        # Files replaced while a reload reads them trigger another load
+        read_json = api_server._read_json
+        landed = []
+
+        def publish_mid_load(path):
+            document = read_json(path)
+            if not landed and path.endswith("connect.json"):
+                landed.append(path)
+                self.publish(8, SECTIONS[:2])
+            return document
+
+        with mock.patch.object(api_server, "_read_json", side_effect=publish_mid_load):
+            self.assertTrue(self.server.reload_if_changed())
+        status = self.get_json("/v1/status")
+        self.assertEqual((status["generation"], status["datasets"]["connect"]["version"]), (8, "2.1.8"))
+
+    def test_serves_keep_alive_http(self):
+        async def exchange():
+            server = await asyncio.start_server(self.server.handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            responses = []
+            for target in ("/v1/status", "/v1/exams?course=MAT120"):
+                writer.write(f"GET {target} HTTP/1.1\r\nHost: x\r\n\r\n".encode())
+                status = await reader.readline()
+                headers = {}
+                while (line := await reader.readline()) != b"\r\n":
+                    name, _, value = line.decode().partition(":")
+                    headers[name.lower()] = value.strip()
+                body = await reader.readexactly(int(headers["content-length"]))
+                responses.append((status.split()[1], json.loads(body)))
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return responses
+
+        responses = asyncio.run(exchange())
+        self.assertEqual([status for status, _ in responses], [b"200", b"200"])
+        self.assertEqual(responses[1][1]["metadata"]["total"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
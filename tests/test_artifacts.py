@@ -0,0 +1,162 @@
+import gzip
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import artifacts
+import backup_store
+
+
+class ArtifactWriterTests(unittest.TestCase):
+    def test_spliced_document_matches_json_dump_output(self):
+        metadata = {"totalSections": 2, "version": "2.52.1", "name": "ঢাকা"}
+        sections = [{"sectionId": 1, "schedule": {"days": ["SUNDAY"]}}, {"sectionId": 2, "tags": []}]
+
+        document = artifacts.encode_document({
+            "metadata": artifacts.encode_json(metadata),
+            "sections": artifacts.encode_json(sections),
+        })
+
+        expected = {"metadata": metadata, "sections": sections}
+        self.assertEqual(document.pretty, json.dumps(expected, indent=2, ensure_ascii=False).encode("utf-8"))
+        self.assertEqual(
+            document.compact,
+            json.dumps(expected, separators=(',', ':'), ensure_ascii=False).encode("utf-8"),
+        )
+
+    def test_shared_value_is_encoded_once_and_reused(self):
+        writer = artifacts.ArtifactWriter()
+        sections = [{"sectionId": 1}]
+
+        first = writer.encode("sections", sections)
+        second = writer.encode("sections", sections)
+
+        self.assertIs(first, second)
+        self.assertEqual(sum(1 for entry in writer.timings if entry["artifact"] == "<sections>"), 1)
+
+    def test_write_emits_pretty_json_and_compact_gzip(self):
+        writer = artifacts.ArtifactWriter()
+        payload = {"metadata": {"totalSections": 1}, "sections": [{"sectionId": 1}]}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "connect.json")
+            stats = writer.write(path, writer.document(**payload))
+
+            self.assertEqual(Path(path).read_text(encoding="utf-8"), json.dumps(payload, indent=2))
+            with gzip.open(path + ".gz", "rt", encoding="utf-8") as f:
+                self.assertEqual(f.read(), json.dumps(payload, separators=(',', ':')))
+            self.assertEqual(stats["gzipBytes"], Path(path + ".gz").stat().st_size)
+
+    def test_content_hash_ignores_key_order_and_volatile_metadata(self):
+        first = {"metadata": {"total": 1, "lastUpdated": "a"}, "items": [{"a": 1, "b": 2}]}
+        second = {"items": [{"b": 2, "a": 1}], "metadata": {"lastUpdated": "b", "total": 1}}
+
+        self.assertEqual(artifacts.document_hash(first), artifacts.document_hash(second))
+        self.assertNotEqual(artifacts.content_hash(first), artifacts.content_hash(second))
+
+    def test_unchanged_artifact_is_not_rewritten(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            hashes = artifacts.ContentHashes(str(Path(tmp) / "content_hashes.json"))
+            path = str(Path(tmp) / "exams.json")
+            payload = {"metadata": {"lastUpdated": "first"}, "exams": []}
+
+            artifacts.ArtifactWriter(hashes).write(path, payload, content_hash=artifacts.document_hash(payload))
+            hashes.save()
+
+            reloaded = artifacts.ContentHashes(hashes.path)
+            payload["metadata"]["lastUpdated"] = "second"
+            stats = artifacts.ArtifactWriter(reloaded).write(
+                path, payload, content_hash=artifacts.document_hash(payload))
+
+            self.assertTrue(stats["skipped"])
+            self.assertIn("first", Path(path).read_text(encoding="utf-8"))
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+@unittest.skipUnless(artifacts.brotli and artifacts.zstandard, "brotli/zstandard not installed")
+class CompressedVariantTests(unittest.TestCase):
+    def test_write_emits_brotli_and_zstd_variants_of_compact_json(self):
+        writer = artifacts.ArtifactWriter()
+        payload = {"metadata": {"totalSections": 1}, "sections": [{"sectionId": 1}]}
+        compact = json.dumps(payload, separators=(',', ':')).encode("utf-8")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "connect.json")
+            stats = writer.write(path, writer.document(**payload))
+
+            self.assertEqual(artifacts.brotli.decompress(Path(path + ".br").read_bytes()), compact)
+            self.assertEqual(artifacts.zstandard.ZstdDecompressor().decompress(Path(path + ".zst").read_bytes()),
+                             compact)
+            self.assertEqual(set(stats["variants"]), {"gz", "br", "zst"})
+
+    def test_shard_style_writes_skip_extra_variants(self):
+        writer = artifacts.ArtifactWriter()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "CSE110.json")
+            writer.write(path, {"sections": []}, extra_variants=False)
+
+            self.assertTrue(Path(path + ".gz").exists())
+            self.assertFalse(Path(path + ".br").exists())
+
+    def test_trained_dictionary_round_trips(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            backups = Path(tmp) / "backups"
+            backups.mkdir()
+            sections = [{"sectionId": i, "courseCode": f"CSE{100 + i % 40}", "roomName": f"UB{i % 9}0{i % 7}",
+                         "capacity": 40, "consumedSeat": i % 41} for i in range(2000)]
+            store = backup_store.BackupStore(str(Path(tmp) / "backup_store"))
+            store.put("spring2026", {"semester": "Spring2026"}, sections)
+            dict_path = str(Path(tmp) / "connect.zstd-dict")
+
+            artifacts.train_zstd_dictionary(str(backups), dict_path, dict_size=4096, store_dir=store.root)
+            dictionary = artifacts.load_zstd_dictionary(dict_path)
+            data = json.dumps(sections[:3]).encode("utf-8")
+            compressed = artifacts.compress_bytes("zst", data, dictionary)
+
+            decompressor = artifacts.zstandard.ZstdDecompressor(dict_data=dictionary)
+            self.assertEqual(decompressor.decompress(compressed), data)
+
+    def test_dictionary_is_published_under_its_id(self):
+        samples = [json.dumps({"sectionId": i, "roomName": f"UB{i % 9}0{i % 7}"}).encode("utf-8") for i in range(2000)]
+        dictionary = artifacts.zstandard.train_dictionary(4096, samples)
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(artifacts, "ZSTD_DICTS_DIR", str(Path(tmp) / "zstd_dicts")):
+            hashes = artifacts.ContentHashes(str(Path(tmp) / "content_hashes.json"))
+            writer = artifacts.ArtifactWriter(hashes, zstd_dictionary=dictionary)
+            path = str(Path(tmp) / "connect.json")
+            writer.write(path, {"sections": [{"sectionId": 1}]}, content_hash="a", quiet=True)
+
+            published = Path(tmp) / "zstd_dicts" / f"{dictionary.dict_id()}.dict"
+            self.assertEqual(published.read_bytes(), dictionary.as_bytes())
+            decompressor = artifacts.zstandard.ZstdDecompressor(
+                dict_data=artifacts.zstandard.ZstdCompressionDict(published.read_bytes()))
+            self.assertEqual(json.loads(decompressor.decompress(Path(path + ".zst").read_bytes())),
+                             {"sections": [{"sectionId": 1}]})
+            # Files written without the dictionary are not reused as if they had it
+            self.assertFalse(artifacts.ArtifactWriter(hashes).is_unchanged(path, "a"))
+
+
+class DeterministicGzipTests(unittest.TestCase):
+    def test_small_payload_has_zero_mtime_and_stable_bytes(self):
+        data = b'{"sectionId":1}' * 10
+
+        compressed = artifacts.gzip_compress(data)
+
+        self.assertEqual(compressed[4:8], b"\x00\x00\x00\x00")
+        self.assertEqual(compressed, artifacts.gzip_compress(data))
+        self.assertEqual(gzip.decompress(compressed), data)
+
+    def test_parallel_blocks_form_one_valid_stream_independent_of_workers(self):
+        data = b"".join(json.dumps({"sectionId": i, "seats": i % 37}).encode() for i in range(60000))
+        self.assertGreater(len(data), artifacts.PARALLEL_GZIP_THRESHOLD)
+
+        single = artifacts.gzip_compress(data, workers=1)
+        parallel = artifacts.gzip_compress(data, workers=4)
+
+        self.assertEqual(single, parallel)
+        self.assertEqual(gzip.decompress(parallel), data)
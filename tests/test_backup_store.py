@@ -0,0 +1,61 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import backup_store
+
+METADATA = {"totalSections": 2, "midExamStartDate": "2026-11-07", "lastUpdated": "2026-10-01T00:00:00+00:00"}
+
+
+def sections(seat=1):
+    return [{"sectionId": 10, "courseCode": "CSE110", "consumedSeat": seat},
+            {"sectionId": 11, "courseCode": "MAT120", "consumedSeat": 5}]
+
+
+class BackupStoreTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.store = backup_store.BackupStore(str(self.tmp / "backup_store"))
+
+    def test_round_trips_every_snapshot(self):
+        self.store.put("fall2026", METADATA, sections(1))
+        self.store.put("fall2026", dict(METADATA, lastUpdated="later"), sections(2))
+
+        self.assertEqual(self.store.load("fall2026", 0), {"metadata": METADATA, "sections": sections(1)})
+        self.assertEqual(self.store.load("fall2026")["sections"], sections(2))
+        self.assertEqual(self.store.semesters(), ["fall2026"])
+
+    def test_unchanged_sections_are_stored_once(self):
+        self.store.put("fall2026", METADATA, sections(1))
+        self.store.put("fall2026", METADATA, sections(2))
+
+        objects, _ = self.store._objects("fall2026")
+        self.assertEqual(len(objects), 3)
+        self.assertEqual([s["sections"] for s in self.store.snapshots("fall2026")], [[0, 1], [2, 1]])
+
+    def test_identical_snapshot_is_skipped_despite_new_timestamp(self):
+        self.assertTrue(self.store.put("fall2026", METADATA, sections()))
+        self.assertFalse(self.store.put("fall2026", dict(METADATA, lastUpdated="later"), sections()))
+        self.assertEqual(len(self.store.snapshots("fall2026")), 1)
+
+    def test_truncated_append_is_discarded(self):
+        self.store.put("fall2026", METADATA, sections(1))
+        _, snapshots_path = self.store._paths("fall2026")
+        with open(snapshots_path, "ab") as f:
+            f.write(b"\x1f\x8b\x08\x00partial")
+
+        self.assertEqual(len(self.store.snapshots("fall2026")), 1)
+        self.store.put("fall2026", METADATA, sections(2))
+        self.assertEqual(self.store.load("fall2026")["sections"], sections(2))
+
+    def test_publish_writes_public_backup_json(self):
+        self.store.put("fall2026", METADATA, sections())
+        output = self.tmp / "fall2026.json"
+
+        self.store.publish("fall2026", str(output))
+
+        self.assertEqual(json.loads(output.read_text(encoding="utf-8")),
+                         {"metadata": METADATA, "sections": sections()})
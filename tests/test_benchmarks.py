@@ -0,0 +1,36 @@
+import contextlib
+import io
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from benchmarks import run
+
+
+class BenchmarkSuiteTests(unittest.TestCase):
+    def test_synthetic_catalog_keeps_ids_unique_and_original_untouched(self):
+        sections = [{"sectionId": 189399, "courseCode": "CSE110"}, {"sectionId": 189400, "courseCode": "MAT120"}]
+
+        catalog = run.synthetic_catalog(sections, factor=3)
+
+        self.assertEqual(len(catalog), 6)
+        self.assertEqual(len({s["sectionId"] for s in catalog}), 6)
+        self.assertEqual(catalog[:2], sections)
+        self.assertEqual(catalog[2]["courseCode"], "CSE110X1")
+        self.assertEqual(sections[0]["courseCode"], "CSE110")
+
+    def test_compare_flags_regressions(self):
+        def result(ms):
+            return {"results": [{"dataset": "current", "stage": "exams", "wallMs": ms, "peakRssKB": 1000}]}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            base, new = Path(tmp) / "base.json", Path(tmp) / "new.json"
+            base.write_text(json.dumps(result(100.0)))
+            new.write_text(json.dumps(result(150.0)))
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                run.compare(str(base), str(new))
+
+        self.assertIn("1.50x", output.getvalue())
+        self.assertIn("⚠️", output.getvalue())
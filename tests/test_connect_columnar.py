@@ -0,0 +1,72 @@
+import json
+import tempfile
+import unittest
+from unittest import mock
+from pathlib import Path
+
+import artifacts
+import connect_columnar
+
+SCHEDULE = {"classSchedules": [{"startTime": "14:00:00", "endTime": "15:20:00", "day": "SUNDAY"},
+                               {"startTime": "14:00:00", "endTime": "15:20:00", "day": "TUESDAY"}],
+            "finalExamDate": "2027-01-07"}
+
+SECTIONS = [
+    {"sectionId": 10, "courseCode": "CSE110", "roomName": "10B-17C", "sectionSchedule": SCHEDULE,
+     "labSchedules": [{"startTime": "11:00:00", "endTime": "13:50:00", "day": "MONDAY"}]},
+    {"sectionId": 11, "courseCode": "CSE110", "roomName": "10B-17C",
+     "sectionSchedule": {"classSchedules": [], "finalExamDate": None}, "labSchedules": None},
+    {"sectionId": 12, "courseCode": "MAT120", "roomName": None,
+     "sectionSchedule": {"classSchedules": SCHEDULE["classSchedules"][:1]}, "labSchedules": None,
+     "prerequisiteCourses": "MAT110"},
+]
+
+
+class ColumnarSectionsTests(unittest.TestCase):
+    def test_round_trip_preserves_sections_including_missing_keys(self):
+        document = connect_columnar.build_columnar(SECTIONS, {"version": "2.52.1"})
+        sections = connect_columnar.ColumnarSections(json.loads(json.dumps(document)))
+
+        self.assertEqual(list(sections), SECTIONS)
+        self.assertNotIn("prerequisiteCourses", sections[0])
+        self.assertNotIn("finalExamDate", sections[2]["sectionSchedule"])
+        self.assertEqual(sections[-1]["sectionId"], 12)
+
+    def test_repeated_values_are_dictionary_encoded(self):
+        rows = [dict(section, sectionId=section["sectionId"] + offset) for offset in (0, 100) for section in SECTIONS]
+        table = connect_columnar.encode_table(rows)
+
+        self.assertEqual(table["columns"]["courseCode"], {"type": "dict", "values": ["CSE110", "MAT120"],
+                                                          "codes": [0, 0, 1, 0, 0, 1]})
+        self.assertEqual(table["columns"]["sectionId"], {"type": "plain", "values": [10, 11, 12, 110, 111, 112]})
+        self.assertEqual(table["columns"]["prerequisiteCourses"]["codes"], [-1, -1, 0, -1, -1, 0])
+        self.assertEqual(table["columns"]["labSchedules"]["lengths"], [1, -1, -1, 1, -1, -1])
+        schedules = table["columns"]["sectionSchedule"]["table"]["columns"]["classSchedules"]
+        self.assertEqual(schedules["table"]["columns"]["day"]["values"], ["SUNDAY", "TUESDAY"])
+
+    def test_columns_and_filters_do_not_need_full_sections(self):
+        sections = connect_columnar.ColumnarSections(connect_columnar.build_columnar(SECTIONS, {}))
+
+        self.assertEqual(sections.column("roomName"), ["10B-17C", "10B-17C", None])
+        self.assertEqual([s["sectionId"] for s in sections.where("courseCode", "CSE110")], [10, 11])
+        with self.assertRaises(KeyError):
+            sections.column("missing")
+
+    def test_materialized_sections_do_not_share_state(self):
+        sections = connect_columnar.ColumnarSections(connect_columnar.build_columnar(SECTIONS, {}))
+
+        sections[0]["sectionSchedule"]["classSchedules"].clear()
+
+        self.assertEqual(sections[0], SECTIONS[0])
+
+    def test_generated_file_loads_through_gzip_sibling(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "connect.columnar.json")
+            with mock.patch.object(connect_columnar, "COLUMNAR_FILE", path):
+                connect_columnar.generate_columnar(SECTIONS, {"version": "2.52.1"},
+                                                   artifacts.ArtifactWriter(variants=()))
+
+            sections = connect_columnar.ColumnarSections.from_file(path)
+
+            self.assertEqual(sections.metadata["version"], "2.52.1")
+            self.assertEqual(list(sections), SECTIONS)
@@ -0,0 +1,48 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import artifacts
+import connect_index
+
+SECTIONS = [
+    {"sectionId": 10, "courseCode": "CSE110", "faculties": "NZRF", "roomName": "10B-17C",
+     "labFaculties": "TBA", "labRoomName": "AS2-12L"},
+    {"sectionId": 11, "courseCode": "CSE110", "faculties": "RBR", "roomName": "10B-17C",
+     "labFaculties": None, "labRoomName": None},
+    {"sectionId": 12, "courseCode": "MAT120", "faculties": "NZRF", "roomName": "09A-01C"},
+]
+
+
+class ConnectIndexTests(unittest.TestCase):
+    def test_index_maps_keys_to_section_offsets(self):
+        index = connect_index.build_connect_index(SECTIONS, {"version": "2.52.1"})
+
+        self.assertEqual(index["sectionId"], {"10": 0, "11": 1, "12": 2})
+        self.assertEqual(index["courseCode"]["CSE110"], [0, 1])
+        self.assertEqual(index["faculty"]["NZRF"], [0, 2])
+        self.assertEqual(index["roomName"]["AS2-12L"], [0])
+        self.assertEqual(index["roomName"]["10B-17C"], [0, 1])
+
+    def test_loader_resolves_lookups_lazily_and_checks_version(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            index_path = str(Path(tmp) / "connect_index.json")
+            connect_path = Path(tmp) / "connect.json"
+            artifacts.ArtifactWriter().write(
+                index_path, connect_index.build_connect_index(SECTIONS, {"version": "2.52.1"}))
+            connect_path.write_text(json.dumps({"metadata": {"version": "2.52.1"}, "sections": SECTIONS}))
+
+            loader = connect_index.ConnectIndex(index_path, str(connect_path))
+            self.assertEqual(loader.offsets("courseCode", "MAT120"), [2])
+            self.assertIsNone(loader._sections)
+            self.assertEqual(loader.section(11)["faculties"], "RBR")
+            self.assertEqual([s["sectionId"] for s in loader.sections("faculty", "NZRF")], [10, 12])
+
+            connect_path.write_text(json.dumps({"metadata": {"version": "2.52.2"}, "sections": SECTIONS}))
+            with self.assertRaises(ValueError):
+                connect_index.ConnectIndex(index_path, str(connect_path)).section(10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+import exam_overlay
+
+
+def exam(course, section, mid="2026-11-07", final="2027-01-10"):
+    return {"courseCode": course, "sectionName": section, "midExamDate": mid, "midExamTime": "08:30:00",
+            "midExamRoom": None, "midExamSource": "cdn", "finalExamDate": final, "finalExamTime": "08:30:00",
+            "finalExamRoom": None, "finalExamSource": "cdn"}
+
+
+class ExamOverlayTests(unittest.TestCase):
+    def test_midterm_and_final_are_joined_in_one_pass(self):
+        exams = [exam("CSE110", "01"), exam("CSE110", "02")]
+        overlays = {
+            "midterm": {"exams": [{"Course": "CSE110", "Section": "1", "Mid Date": "2026-11-09",
+                                   "Start Time": "10:00", "End Time": "11:30", "Room.": "09A-01C"}]},
+            "final": {"exams": [{"Course": "cse 110", "Section": "02", "Final Date": "2027-01-12"}]},
+        }
+
+        result = exam_overlay.join_overlays(exams, overlays)
+
+        self.assertEqual(result.applied, {"midterm": 1, "final": 1})
+        self.assertEqual((exams[0]["midExamDate"], exams[0]["midExamTime"], exams[0]["midExamRoom"]),
+                         ("2026-11-09", "10:00-11:30", "09A-01C"))
+        self.assertEqual(exams[1]["finalExamSource"], "pdf")
+        self.assertEqual(exams[1]["midExamSource"], "cdn")
+        self.assertEqual([e["sectionName"] for e in result.unmatched_exams["midterm"]], ["02"])
+
+    def test_fuzzy_section_names(self):
+        exams = [exam("CSE110", "01"), exam("CSE110L", "03"), exam("MAT120", "5")]
+        rows = [{"Course": "CSE110", "Section": "001", "Mid Date": "d1"},
+                {"Course": "CSE110", "Section": "03L", "Mid Date": "d2"},
+                {"Course": "MAT120", "Section": "05", "Mid Date": "d3"}]
+
+        result = exam_overlay.join_overlays(exams, {"midterm": {"exams": rows}})
+
+        self.assertEqual([e["midExamDate"] for e in exams], ["d1", "d2", "d3"])
+        self.assertEqual(result.unmatched_official["midterm"], [])
+
+    def test_ambiguous_fuzzy_match_is_reported_not_applied(self):
+        exams = [exam("CSE110", "1A"), exam("CSE110", "1B")]
+        row = {"Course": "CSE110", "Section": "001", "Mid Date": "2026-11-09"}
+
+        result = exam_overlay.join_overlays(exams, {"midterm": {"exams": [row]}})
+
+        self.assertEqual(result.applied["midterm"], 0)
+        self.assertEqual(result.unmatched_official["midterm"], [row])
+
+    def test_scales_to_large_overlays(self):
+        exams = [exam(f"C{i // 20:04d}", f"{i % 20 + 1:02d}") for i in range(20000)]
+        rows = [{"Course": f"C{i // 20:04d}", "Section": str(i % 20 + 1), "Final Date": "2027-01-12"}
+                for i in range(20000)] + [{"Course": "XYZ999", "Section": "01", "Final Date": "2027-01-12"}]
+
+        result = exam_overlay.join_overlays(exams, {"final": {"exams": rows}})
+
+        self.assertEqual(result.applied["final"], 20000)
+        self.assertEqual(len(result.unmatched_official["final"]), 1)
+        self.assertEqual(result.unmatched_exams["final"], [])
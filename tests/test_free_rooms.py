@@ -0,0 +1,58 @@
+import unittest
+
+import free_rooms
+
+SECTIONS = [
+    {
+        "courseCode": "CSE110", "sectionName": "01", "sectionType": "OTHER", "roomName": "10B-17C",
+        "sectionSchedule": {"classSchedules": [
+            {"day": "TUESDAY", "startTime": "09:30:00", "endTime": "10:50:00"},
+            {"day": "TUESDAY", "startTime": "11:00:00", "endTime": "12:20:00"},
+        ]},
+        "labSchedules": [{"day": "MONDAY", "startTime": "11:00:00", "endTime": "13:50:00"}],
+        "labRoomName": "AS2-12L", "labCourseCode": "CSE110L",
+    },
+    {
+        "courseCode": "CSE111", "sectionName": "01", "sectionType": "OTHER", "roomName": "09A-01C",
+        "sectionSchedule": {"classSchedules": [{"day": "SUNDAY", "startTime": "08:00:00", "endTime": "09:20:00"}]},
+    },
+]
+
+
+class RoomIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.index = free_rooms.RoomIndex(SECTIONS)
+
+    def test_merges_intervals(self):
+        self.assertEqual(free_rooms.merge_intervals([(660, 740), (570, 650), (600, 700), (800, 800)]),
+                         ([570], [740]))
+
+    def test_free_rooms_for_arbitrary_window(self):
+        window = free_rooms.parse_clock("10:50"), free_rooms.parse_clock("11:00")
+        self.assertEqual(self.index.free_rooms("tuesday", *window), ["09A-01C", "10B-17C", "AS2-12L"])
+        self.assertEqual(self.index.free_rooms("TUESDAY", 615, 720), ["09A-01C", "AS2-12L"])
+        self.assertEqual(self.index.free_rooms("MONDAY", 700, 720, kind="lab"), [])
+
+    def test_next_free_slot_skips_busy_time_and_short_gaps(self):
+        self.assertEqual(self.index.next_free("AS2-12L", "MONDAY", free_rooms.parse_clock("11:30")),
+                         ("MONDAY", 830, free_rooms.DAY_END))
+        self.assertEqual(self.index.next_free("10B-17C", "TUESDAY", 570, duration=30),
+                         ("TUESDAY", 740, free_rooms.DAY_END))
+        self.assertEqual(self.index.next_free("10B-17C", "TUESDAY", 570, duration=5),
+                         ("TUESDAY", 650, 660))
+
+    def test_unknown_room_day_and_bad_time_are_rejected(self):
+        with self.assertRaises(KeyError):
+            self.index.next_free("NOPE")
+        with self.assertRaises(ValueError):
+            self.index.next_free("10B-17C", "FUNDAY")
+        with self.assertRaises(ValueError):
+            self.index.free_rooms("XYZ", 9 * 60, 10 * 60)
+        for value in ("25:99", "24:59"):
+            with self.assertRaises(ValueError):
+                free_rooms.parse_clock(value)
+        self.assertEqual(free_rooms.parse_clock("24:00"), 24 * 60)
+
+
+if __name__ == "__main__":
+    unittest.main()
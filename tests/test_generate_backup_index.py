@@ -0,0 +1,64 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import backup_store
+import generate_backup_index
+from artifacts import ArtifactWriter
+
+METADATA = {"totalSections": 2, "lastUpdated": "2026-02-07T13:25:00+00:00", "note": "{\"sections\": ঢাকা}"}
+
+
+class BackupMetadataTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def write(self, name, document, **dump_args):
+        path = self.dir / name
+        path.write_text(json.dumps(document, ensure_ascii=False, **dump_args), encoding="utf-8")
+        return str(path)
+
+    def test_reads_metadata_header_of_pretty_and_compact_backups(self):
+        sections = [{"sectionId": i, "courseName": "x" * 200} for i in range(200)]
+        document = {"metadata": METADATA, "sections": sections}
+
+        for dump_args in ({"indent": 2}, {"separators": (',', ':')}):
+            path = self.write("fall2025.json", document, **dump_args)
+            self.assertEqual(generate_backup_index.read_backup_metadata(path), METADATA)
+
+    def test_metadata_larger_than_one_read_is_completed(self):
+        metadata = dict(METADATA, faculties=["F%04d" % i for i in range(3000)])
+        path = self.write("fall2025.json", {"metadata": metadata, "sections": []})
+
+        self.assertEqual(generate_backup_index.read_backup_metadata(path), metadata)
+
+    def test_falls_back_to_full_parse_when_metadata_is_not_first(self):
+        path = self.write("fall2025.json", {"sections": [], "metadata": METADATA})
+
+        self.assertEqual(generate_backup_index.read_backup_metadata(path), METADATA)
+
+
+class BackupIndexTests(unittest.TestCase):
+    def test_running_semester_links_to_its_backup_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / "backups").mkdir()
+            (root / "backups" / "summer2026.json").write_text(json.dumps({"metadata": METADATA, "sections": []}))
+            backup_store.BackupStore(str(root / "backup_store")).put(
+                "fall2026", {"totalSections": 1, "lastUpdated": "2026-10-01"}, [{"sectionId": 1}])
+            backup_store.BackupStore(str(root / "backup_store")).publish(
+                "fall2026", str(root / "backups" / "fall2026.json"), ArtifactWriter(variants=()))
+
+            with mock.patch.multiple(generate_backup_index, SCRIPT_DIR=tmp, BACKUPS_DIR=str(root / "backups")), \
+                    mock.patch.object(generate_backup_index, "get_current_semester_name", return_value="Fall2026"), \
+                    mock.patch("builtins.print"):
+                generate_backup_index.generate_backup_index(ArtifactWriter(variants=()))
+
+            backups = json.loads((root / "connect_backup.json").read_text())["backups"]
+        self.assertEqual([(b["semester"], b["isCurrent"], b["filename"], b["totalSections"]) for b in backups],
+                         [("Fall2026", True, "fall2026.json", 1), ("Summer2026", False, "summer2026.json", 2)])
+        self.assertEqual(backups[0]["cdnLink"], f"{generate_backup_index.CDN_BASE_URL}/fall2026.json")
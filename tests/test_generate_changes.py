@@ -0,0 +1,79 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import generate_changes
+
+
+def section(section_id, **fields):
+    base = {
+        "sectionId": section_id, "courseCode": "CSE110", "sectionName": f"{section_id:02d}",
+        "consumedSeat": 10, "capacity": 40, "roomName": "10B-17C", "faculties": "NZRF",
+        "sectionSchedule": {"classSchedules": [{"day": "SUNDAY", "startTime": "08:00:00", "endTime": "09:20:00"}],
+                            "midExamDate": "2026-11-21", "midExamDetail": "Nov 21, 2026"},
+    }
+    base.update(fields)
+    return base
+
+
+class ChangeReportTests(unittest.TestCase):
+    def test_changes_are_classified_by_facet(self):
+        moved = section(3)
+        moved["sectionSchedule"] = dict(moved["sectionSchedule"], midExamDate="2026-11-22",
+                                        midExamDetail="Nov 22, 2026", classPairId=7)
+        old = [section(1), section(2), section(3), section(4)]
+        new = [section(1), section(2, consumedSeat=13, roomName="09A-01C"), moved, section(5)]
+
+        changes = generate_changes.diff_changes(old, new)
+
+        self.assertEqual([s["sectionId"] for s in changes["added"]], [5])
+        self.assertEqual([s["sectionId"] for s in changes["removed"]], [4])
+        by_id = {entry["sectionId"]: entry for entry in changes["changed"]}
+        self.assertEqual(sorted(by_id), [2, 3])
+        self.assertEqual(sorted(by_id[2]["changes"]), ["room", "seats"])
+        self.assertEqual(by_id[2]["changes"]["seats"]["consumedDelta"], 3)
+        self.assertEqual(by_id[2]["changes"]["room"]["to"]["roomName"], "09A-01C")
+        self.assertEqual(list(by_id[3]["changes"]), ["exam"])
+        self.assertEqual(by_id[3]["otherFields"], ["sectionSchedule"])
+
+        summary = changes["summary"]
+        self.assertEqual((summary["addedSections"], summary["removedSections"], summary["changedSections"]), (1, 1, 2))
+        self.assertEqual((summary["seatsChanges"], summary["roomChanges"], summary["examChanges"],
+                          summary["scheduleChanges"], summary["otherChanges"]), (1, 1, 1, 0, 1))
+        self.assertEqual(summary["consumedSeatDelta"], 3)
+
+    def test_fingerprint_only_moves_with_its_facet(self):
+        original = generate_changes.fingerprint(section(1))
+        seats = generate_changes.fingerprint(section(1, consumedSeat=11))
+
+        self.assertEqual([facet for facet in original if original[facet] != seats[facet]], ["seats"])
+
+    def test_generate_changes_writes_report_and_summary(self):
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(generate_changes, "CHANGES_FILE", str(Path(tmp, "changes.json"))):
+            summary = generate_changes.generate_changes(
+                {"version": "2.52.0"}, [section(1)], {"version": "2.52.1"}, [section(1, consumedSeat=12)],
+                semester_changed=False,
+            )
+            document = json.loads(Path(tmp, "changes.json").read_text())
+
+            self.assertEqual((summary["fromVersion"], summary["toVersion"], summary["fullRefresh"]),
+                             ("2.52.0", "2.52.1", False))
+            self.assertEqual(summary["url"], generate_changes.CDN_CHANGES_URL)
+            self.assertEqual(document["metadata"]["changedSections"], 1)
+            self.assertEqual(document["changed"][0]["changes"]["seats"]["to"]["consumedSeat"], 12)
+
+            summary = generate_changes.generate_changes(
+                {"version": "2.52.9"}, [section(1)], {"version": "2.53.0"}, [section(5)], semester_changed=True,
+            )
+            document = json.loads(Path(tmp, "changes.json").read_text())
+
+            self.assertTrue(summary["fullRefresh"])
+            self.assertIsNone(summary["fromVersion"])
+            self.assertEqual((document["added"], document["changed"]), ([], []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import generate_deltas
+
+
+def section(section_id, **fields):
+    return {"sectionId": section_id, "courseCode": "CSE110", "consumedSeat": 0, **fields}
+
+
+class DeltaFeedTests(unittest.TestCase):
+    def test_delta_roundtrip_reconstructs_new_version(self):
+        old = [section(1), section(2, roomName="10B-17C"), section(3)]
+        new = [section(2, consumedSeat=12), section(1), section(4)]
+
+        delta = generate_deltas.diff_sections(old, new)
+
+        self.assertEqual(delta["removed"], [3])
+        self.assertEqual(list(delta["added"]), ["4"])
+        self.assertEqual(delta["changed"]["2"], {"set": {"consumedSeat": 12}, "unset": ["roomName"]})
+        self.assertEqual(delta["order"], [2, 1, 4])
+        self.assertEqual(generate_deltas.apply_delta(old, json.loads(json.dumps(delta))), new)
+
+    def test_seat_only_change_produces_minimal_delta(self):
+        old = [section(1), section(2)]
+        new = [section(1), section(2, consumedSeat=5)]
+
+        delta = generate_deltas.diff_sections(old, new)
+
+        self.assertEqual(delta, {"added": {}, "removed": [], "changed": {"2": {"set": {"consumedSeat": 5}}}})
+
+    def test_generate_delta_writes_file_and_index_entry(self):
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(generate_deltas, "DELTAS_DIR", tmp), \
+                mock.patch.object(generate_deltas, "load_delta_index", return_value=[]):
+            Path(tmp, "2.51.3-2.51.4.json").write_text("{}")
+
+            index = generate_deltas.generate_delta(
+                {"version": "2.52.0"}, [section(1)],
+                {"version": "2.52.1"}, [section(1, consumedSeat=3)],
+                semester_changed=False,
+            )
+
+            self.assertEqual([(entry["from"], entry["to"]) for entry in index], [("2.52.0", "2.52.1")])
+            self.assertEqual(sorted(p.name for p in Path(tmp).iterdir()),
+                             ["2.52.0-2.52.1.json", "2.52.0-2.52.1.json.gz"])
+
+    def test_semester_change_restarts_the_chain(self):
+        with mock.patch.object(generate_deltas, "prune_deltas") as prune:
+            index = generate_deltas.generate_delta(
+                {"version": "2.52.9"}, [section(1)], {"version": "2.53.0"}, [section(5)],
+                semester_changed=True,
+            )
+
+        self.assertEqual(index, [])
+        prune.assert_called_once_with([])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import json
+import random
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import artifacts
+import generate_free_labs
+import upstream
+
+
+def naive_first_overlap(occupied, slot_start, slot_end):
+    for entry in occupied:
+        if generate_free_labs.time_overlaps(slot_start, slot_end, entry["startTime"], entry["endTime"]):
+            return entry
+    return None
+
+
+def random_occupancy(seed, labs=12):
+    rng = random.Random(seed)
+    occupancy = {}
+    departments = {}
+    for lab in range(labs):
+        room = f"LAB-{lab:02d}L"
+        departments[room] = {rng.choice(["CSE", "EEE", "PHY"])}
+        occupancy[room] = {}
+        for day in generate_free_labs.DAYS:
+            entries = []
+            for n in range(rng.randint(0, 5)):
+                start = rng.randrange(7 * 60, 19 * 60, 5)
+                end = start + rng.choice([0, 50, 80, 170])
+                entries.append({
+                    "startTime": f"{start // 60:02d}:{start % 60:02d}:00",
+                    "endTime": f"{end // 60:02d}:{end % 60:02d}:00",
+                    "courseCode": f"CSE{n}",
+                    "sectionName": f"{n:02d}",
+                    "department": "CSE",
+                })
+            occupancy[room][day] = entries
+    return occupancy, departments
+
+
+class FreeSlotEngineTests(unittest.TestCase):
+    def assert_matches_pairwise_scan(self, time_slots, seed):
+        occupancy, departments = random_occupancy(seed)
+
+        result = generate_free_labs.find_free_slots(occupancy, departments, time_slots)
+
+        for day in generate_free_labs.DAYS:
+            for slot_start, slot_end in time_slots:
+                slot = result[day][f"{slot_start}-{slot_end}"]
+                occupied = {lab["labRoom"]: lab["courseCode"] for lab in slot["occupiedLabs"]}
+                free = [lab["labRoom"] for lab in slot["freeLabs"]]
+                for room in sorted(occupancy):
+                    expected = naive_first_overlap(occupancy[room][day], slot_start, slot_end)
+                    if expected is None:
+                        self.assertIn(room, free)
+                    else:
+                        self.assertEqual(occupied[room], expected["courseCode"])
+
+    def test_batch_engine_matches_pairwise_scan_on_standard_grid(self):
+        for seed in range(5):
+            self.assert_matches_pairwise_scan(generate_free_labs.TIME_SLOTS, seed)
+
+    def test_batch_engine_handles_unsorted_and_overlapping_grids(self):
+        grid = [("14:00:00", "17:00:00"), ("08:00:00", "12:00:00"), ("09:00:00", "10:00:00")]
+        for seed in range(5):
+            self.assert_matches_pairwise_scan(grid, seed)
+
+
+class OpenLabsGenerationTests(unittest.TestCase):
+    def test_unchanged_table_skips_generation(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            Path(tmp, "open_labs.json").write_text("{}")
+            cached = upstream.CachedJson(generate_free_labs.TABLE_URL, [], "digest")
+            hashes = artifacts.ContentHashes(path=str(Path(tmp, "hashes.json")))
+            cached.mark_consumed(hashes)
+            hashes.set("openLabsSource", artifacts.content_hash(["Unknown", None]))
+            with mock.patch.object(generate_free_labs, "SCRIPT_DIR", tmp), \
+                    mock.patch.object(upstream, "get_cached_json", return_value=cached), \
+                    mock.patch.object(generate_free_labs, "analyze_lab_usage") as analyze:
+                self.assertTrue(generate_free_labs.generate_free_labs_json(artifacts.ArtifactWriter(hashes)))
+
+            analyze.assert_not_called()
+            self.assertEqual(Path(tmp, "open_labs.json").read_text(), "{}")
+
+    def test_new_connect_metadata_regenerates_with_an_unchanged_table(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            connect = Path(tmp, "connect.json")
+            cached = upstream.CachedJson(generate_free_labs.TABLE_URL, [], "digest")
+            writer = artifacts.ArtifactWriter(artifacts.ContentHashes(path=str(Path(tmp, "hashes.json"))),
+                                              variants=())
+
+            def generate(last_updated):
+                connect.write_text(json.dumps({"metadata": {"midExamStartDate": "2026-11-07",
+                                                            "lastUpdated": last_updated}, "sections": []}))
+                with mock.patch.object(generate_free_labs, "SCRIPT_DIR", tmp), \
+                        mock.patch.object(upstream, "get_cached_json", return_value=cached), \
+                        mock.patch("builtins.print"), \
+                        mock.patch.object(generate_free_labs, "analyze_lab_usage",
+                                          wraps=generate_free_labs.analyze_lab_usage) as analyze:
+                    self.assertTrue(generate_free_labs.generate_free_labs_json(writer))
+                return analyze.call_count, json.loads(Path(tmp, "open_labs.json").read_text())["metadata"]
+
+            self.assertEqual(generate("2026-10-01")[0], 1)
+            self.assertEqual(generate("2026-10-01")[0], 0)
+            calls, metadata = generate("2026-10-02")
+            self.assertEqual(calls, 1)
+            self.assertEqual((metadata["semester"], metadata["sourceDataUpdated"]), ("Fall2026", "2026-10-02"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import hashlib
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import artifacts
+import generate_shards
+
+
+class SectionShardTests(unittest.TestCase):
+    def test_groups_by_course_and_department(self):
+        sections = [
+            {"sectionId": 1, "courseCode": "CSE110"},
+            {"sectionId": 2, "courseCode": "CSE251L"},
+            {"sectionId": 3, "courseCode": "CSE110"},
+        ]
+
+        by_course, by_department = generate_shards.group_sections(sections)
+
+        self.assertEqual([s["sectionId"] for s in by_course["CSE110"]], [1, 3])
+        self.assertEqual([s["sectionId"] for s in by_department["CSE"]], [1, 2, 3])
+
+    def test_writes_shards_manifest_and_prunes_stale_files(self):
+        sections = [{"sectionId": 1, "courseCode": "CSE110"}, {"sectionId": 2, "courseCode": "MAT120"}]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            courses = Path(tmp, "courses")
+            courses.mkdir()
+            (courses / "OLD101.json").write_text("{}")
+            with mock.patch.multiple(generate_shards, COURSES_DIR=str(courses),
+                                     DEPARTMENTS_DIR=str(Path(tmp, "departments")),
+                                     MANIFEST_FILE=str(Path(tmp, "shards.json"))):
+                hashes = artifacts.ContentHashes(str(Path(tmp, "hashes.json")))
+                manifest = generate_shards.generate_shards(sections, {"version": "2.52.1"},
+                                                           artifacts.ArtifactWriter(hashes))
+                # Unchanged shards are skipped but still advertise their file digest
+                rerun = generate_shards.generate_shards(sections, {"version": "2.52.1"},
+                                                        artifacts.ArtifactWriter(hashes))
+
+            self.assertEqual(sorted(p.name for p in courses.iterdir()),
+                             ["CSE110.json", "CSE110.json.gz", "MAT120.json", "MAT120.json.gz"])
+            shard = json.loads((courses / "CSE110.json").read_text())
+            self.assertEqual(shard["sections"], sections[:1])
+            self.assertEqual(manifest["courses"]["CSE110"]["sha256"],
+                             hashlib.sha256((courses / "CSE110.json").read_bytes()).hexdigest())
+            self.assertEqual(rerun["courses"], manifest["courses"])
+            self.assertEqual(set(manifest["departments"]), {"CSE", "MAT"})
+            self.assertEqual(manifest["metadata"]["version"], "2.52.1")
+
+
+if __name__ == "__main__":
+    unittest.main()
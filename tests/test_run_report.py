@@ -0,0 +1,96 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import run_report
+from artifacts import ArtifactWriter, ContentHashes, content_hash
+
+
+class RunReportTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.writer = ArtifactWriter(ContentHashes(str(self.dir / "hashes.json")), variants=("gz",))
+
+    def start(self, **kwargs):
+        report = run_report.RunReport(self.writer, **kwargs).start()
+        self.addCleanup(report.finish)
+        return report
+
+    def test_stages_record_outputs_cache_hits_and_nesting(self):
+        report = self.start(trace_memory=True)
+        path = str(self.dir / "a.json")
+        document = {"a": list(range(1000))}
+
+        with run_report.stage("publish"):
+            with run_report.stage("connect") as record:
+                record["inputBytes"] = 123
+                self.writer.write(path, document, content_hash=content_hash(document), quiet=True)
+        with run_report.stage("again"):
+            self.writer.write(path, document, content_hash=content_hash(document), quiet=True)
+
+        publish, connect, again = report.stages
+        self.assertEqual([s["stage"] for s in report.stages], ["publish", "connect", "again"])
+        self.assertEqual((publish["depth"], connect["depth"]), (0, 1))
+        self.assertEqual(connect["inputBytes"], 123)
+        self.assertEqual(connect["artifactsWritten"], 1)
+        self.assertEqual(connect["outputBytes"], publish["outputBytes"])
+        self.assertGreater(connect["outputBytes"], Path(path).stat().st_size)
+        self.assertEqual((again["artifactsWritten"], again["cacheHits"]), (0, 1))
+        # The enclosing stage's peak covers its children
+        self.assertGreaterEqual(publish["peakMemoryKB"], connect["peakMemoryKB"])
+
+    def test_failed_stage_is_recorded(self):
+        report = self.start(trace_memory=False)
+        with self.assertRaises(ValueError):
+            with run_report.stage("parse"):
+                raise ValueError("bad payload")
+        self.assertEqual(report.stages[0]["error"], "ValueError")
+        self.assertNotIn("peakMemoryKB", report.stages[0])
+        self.assertIn("maxRssKB", report.stages[0])
+
+    def test_max_rss_is_reported_in_kilobytes_on_every_platform(self):
+        usage = mock.Mock(ru_maxrss=2048 * 1024)
+        with mock.patch.object(run_report.resource, "getrusage", return_value=usage):
+            with mock.patch.object(run_report.sys, "platform", "darwin"):
+                self.assertEqual(run_report._max_rss_kb(), 2048)
+            with mock.patch.object(run_report.sys, "platform", "linux"):
+                self.assertEqual(run_report._max_rss_kb(), 2048 * 1024)
+
+        with mock.patch.object(run_report, "resource", None):
+            report = self.start()
+            with run_report.stage("parse"):
+                pass
+            self.assertIsNone(report.document()["metadata"]["maxRssKB"])
+        self.assertFalse(report.trace_memory)
+        self.assertNotIn("maxRssKB", report.stages[0])
+
+    def test_module_stage_is_a_no_op_without_active_report(self):
+        with run_report.stage("fetch") as record:
+            record["inputBytes"] = 1
+        self.assertIsNone(run_report.active())
+
+    def test_writes_json_and_prometheus_text(self):
+        report = self.start(trace_memory=False)
+        with run_report.stage("exams"):
+            self.writer.write(str(self.dir / "exams.json"), {"exams": []}, quiet=True)
+        report.add_compress_stage()
+        report.finish("ok")
+
+        report.write(str(self.dir / "run_report.json"))
+        document = json.loads((self.dir / "run_report.json").read_text())
+        self.assertEqual(document["metadata"]["status"], "ok")
+        self.assertEqual([s["stage"] for s in document["stages"]], ["exams", "compress"])
+
+        text = report.prometheus_text()
+        self.assertIn('mrz_cdn_stage_duration_seconds{stage="exams"}', text)
+        self.assertIn('mrz_cdn_stage_cache_hits{stage="compress"} 0', text)
+        self.assertIn('mrz_cdn_run_duration_seconds{status="ok"}', text)
+        self.assertIn('mrz_cdn_upstream_cache_total{outcome="fetched"}', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import seat_history
+
+
+def sections(*seats):
+    return [
+        {"sectionId": 10 + i, "courseCode": "CSE110" if i < 2 else "MAT120", "consumedSeat": used, "capacity": 40}
+        for i, used in enumerate(seats)
+    ]
+
+
+class SeatHistoryTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.history = seat_history.SeatHistory(str(Path(tmp.name) / "fall2026.bin"))
+
+    def test_appends_snapshots_and_skips_unchanged_seats(self):
+        self.assertTrue(self.history.append(sections(1, 2, 3), timestamp=100.0))
+        self.assertFalse(self.history.append(sections(1, 2, 3), timestamp=200.0))
+        self.assertTrue(self.history.append(sections(5, 2, 3), timestamp=300.0))
+
+        snapshots = list(self.history.snapshots())
+        self.assertEqual([s.timestamp for s in snapshots], [100.0, 300.0])
+        self.assertEqual(snapshots[-1].seats()[10], (5, 40))
+        self.assertEqual(snapshots[-1].courses, ["CSE110", "CSE110", "MAT120"])
+
+    def test_fill_curve_and_series_per_course(self):
+        self.history.append(sections(1, 2, 3), timestamp=100.0)
+        self.history.append(sections(4, 6, 3), timestamp=200.0)
+
+        self.assertEqual(self.history.fill_curve("CSE110"), [(100.0, 3, 80), (200.0, 10, 80)])
+        self.assertEqual(self.history.series(course_code="MAT120"), {12: [(100.0, 3, 40), (200.0, 3, 40)]})
+
+    def test_truncated_trailing_chunk_is_ignored_and_replaced(self):
+        self.history.append(sections(1, 2, 3), timestamp=100.0)
+        with open(self.history.path, "ab") as f:
+            f.write(seat_history.encode_snapshot(sections(9, 9, 9), 150.0)[:20])
+
+        self.assertEqual(len(list(self.history.snapshots())), 1)
+        self.history.append(sections(2, 2, 3), timestamp=200.0)
+        self.assertEqual([s.timestamp for s in self.history.snapshots()], [100.0, 200.0])
+
+    def test_summary_reports_latest_fill_and_changes(self):
+        day = 24 * 3600
+        self.history.append(sections(1, 2, 3), timestamp=0.0)
+        self.history.append(sections(4, 2, 3), timestamp=6 * day)
+        self.history.append(sections(8, 2, 3), timestamp=7 * day)
+
+        summary = seat_history.build_summary(self.history, "fall2026")
+
+        self.assertEqual(summary["metadata"]["snapshots"], 3)
+        self.assertEqual(summary["courses"]["CSE110"],
+                         {"consumedSeat": 10, "capacity": 80, "fillPercent": 12.5, "change24h": 4, "change7d": 7})
+
+    def test_latest_semester_is_chosen_by_name_not_mtime(self):
+        directory = Path(self.history.path).parent
+        for name in ("summer2026", "spring2027", "fall2026"):
+            seat_history.SeatHistory.for_semester(name, str(directory)).append(sections(1))
+        os.utime(directory / "fall2026.bin", (4_000_000_000, 4_000_000_000))
+
+        self.assertEqual(seat_history.latest_semester(str(directory)), "spring2027")
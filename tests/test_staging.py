@@ -0,0 +1,169 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import backup_store
+import seat_history
+import staging
+import update_cdn
+from artifacts import ArtifactWriter
+
+
+class StagedPublishTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        (self.root / "backups").mkdir()
+        (self.root / "backups" / "spring2026.json").write_text('{"metadata": {}}')
+        (self.root / "old.json").write_text('{"old": true}')
+        self.writer = ArtifactWriter(variants=("gz",))
+
+    def begin(self):
+        generation = staging.Generation(str(self.root)).begin()
+        self.addCleanup(generation.discard)
+        return generation
+
+    def test_artifacts_are_published_only_on_commit(self):
+        generation = self.begin()
+        path = str(self.root / "backups" / "fall2026.json")
+        self.writer.write(path, {"metadata": {"n": 1}}, gzip_copy=False, quiet=True)
+        staging.remove(str(self.root / "old.json"))
+
+        self.assertFalse(os.path.exists(path))
+        self.assertNotEqual(staging.resolve(path), path)
+        self.assertEqual([os.path.basename(p) for p in staging.listing(str(self.root / "backups"))],
+                         ["fall2026.json", "spring2026.json"])
+
+        manifest = generation.commit(version="2.1.0")
+        self.assertEqual(json.loads(Path(path).read_text()), {"metadata": {"n": 1}})
+        self.assertFalse((self.root / "old.json").exists())
+        self.assertFalse((self.root / ".staging").exists())
+        self.assertEqual((manifest["generation"], manifest["version"]), (1, "2.1.0"))
+        self.assertEqual(list(manifest["files"]), [os.path.join("backups", "fall2026.json")])
+        self.assertEqual(manifest["removed"], ["old.json"])
+        self.assertEqual(json.loads((self.root / "publish_manifest.json").read_text()), manifest)
+        self.assertIsNone(staging.active())
+
+        generation = self.begin()
+        self.writer.write(path, {"metadata": {"n": 2}}, gzip_copy=False, quiet=True)
+        self.assertEqual(generation.commit()["generation"], 2)
+
+    def test_failed_run_leaves_tree_and_version_untouched(self):
+        version_file = str(self.root / "version.json")
+        Path(version_file).write_text(json.dumps({"major": 2, "semester": 5, "daily": 3}))
+        with mock.patch.object(update_cdn, "VERSION_FILE", version_file):
+            for _ in range(2):
+                self.begin()
+                self.assertEqual(update_cdn.bump_version(False), "2.5.4")
+                self.writer.write(str(self.root / "connect.json"), {"sections": []}, quiet=True)
+                staging.active().discard()
+
+        self.assertEqual(json.loads(Path(version_file).read_text())["daily"], 3)
+        self.assertFalse((self.root / "connect.json").exists())
+        self.assertFalse((self.root / ".staging").exists())
+
+    def test_invalid_artifact_fails_verification(self):
+        generation = self.begin()
+        with open(staging.path_for(str(self.root / "broken.json")), "w") as f:
+            f.write('{"truncated": ')
+
+        with self.assertRaises(staging.StagingError):
+            generation.commit()
+        self.assertFalse((self.root / "broken.json").exists())
+        self.assertFalse((self.root / "publish_manifest.json").exists())
+
+    @unittest.skipUnless(staging.zstandard, "zstandard not installed")
+    def test_zstd_files_are_decoded_with_their_published_dictionary(self):
+        zstandard = staging.zstandard
+        samples = [json.dumps({"sectionId": i, "roomName": f"UB{i % 9}0{i % 7}"}).encode("utf-8") for i in range(2000)]
+        dictionary = zstandard.train_dictionary(4096, samples)
+        data = zstandard.ZstdCompressor(dict_data=dictionary).compress(b'{"sections": []}')
+
+        generation = self.begin()
+        with open(staging.path_for(str(self.root / "connect.json.zst")), "wb") as f:
+            f.write(data)
+        with self.assertRaisesRegex(staging.StagingError, "not published"):
+            generation.commit()
+
+        with open(staging.path_for(str(self.root / "zstd_dicts" / f"{dictionary.dict_id()}.dict")), "wb") as f:
+            f.write(dictionary.as_bytes())
+        generation.commit()
+        self.assertEqual((self.root / "connect.json.zst").read_bytes(), data)
+
+    def test_interrupted_commit_is_rolled_forward(self):
+        generation = self.begin()
+        for name in ("a.json", "b.json"):
+            self.writer.write(str(self.root / name), {"name": name}, gzip_copy=False, quiet=True)
+
+        real_replace = os.replace
+        calls = []
+
+        def crash_on_second_file(src, dst):
+            calls.append(dst)
+            if len(calls) == 3:  # journal, a.json, b.json
+                raise OSError("disk went away")
+            real_replace(src, dst)
+
+        with mock.patch.object(staging.os, "replace", side_effect=crash_on_second_file):
+            with self.assertRaises(OSError):
+                generation.commit()
+        generation.discard()  # keeps the journaled generation
+
+        self.assertTrue((self.root / "a.json").exists())
+        self.assertFalse((self.root / "b.json").exists())
+
+        self.assertEqual(staging.Generation(str(self.root)).recover(), "rolled-forward")
+        self.assertEqual(json.loads((self.root / "b.json").read_text()), {"name": "b.json"})
+        self.assertEqual(json.loads((self.root / "publish_manifest.json").read_text())["generation"], 1)
+        self.assertFalse((self.root / ".staging").exists())
+
+    def test_discarded_run_leaves_append_only_stores_byte_identical(self):
+        sections = [{"sectionId": 1, "courseCode": "CSE110", "consumedSeat": 3, "capacity": 40}]
+        store = backup_store.BackupStore(str(self.root / "backup_store"))
+        history = seat_history.SeatHistory.for_semester("fall2026", str(self.root / "seat_history"))
+        store.put("fall2026", {"totalSections": 1}, sections)
+        history.append(sections, timestamp=1.0)
+        files = sorted(self.root.glob("backup_store/fall2026/*.gz")) + [Path(history.path)]
+        published = {path: path.read_bytes() for path in files}
+
+        changed = [dict(sections[0], consumedSeat=4)]
+
+        def run():
+            generation = self.begin()
+            self.assertTrue(store.put("fall2026", {"totalSections": 1}, changed))
+            self.assertTrue(history.append(changed, timestamp=2.0))
+            # The run sees its own appends before they are published
+            self.assertEqual(store.load("fall2026")["sections"], changed)
+            self.assertEqual(history.latest().timestamp, 2.0)
+            return generation
+
+        run().discard()
+        self.assertEqual({path: path.read_bytes() for path in files}, published)
+
+        run().commit()
+        self.assertEqual(len(store.snapshots("fall2026")), 2)
+        self.assertEqual([snapshot.timestamp for snapshot in history.snapshots()], [1.0, 2.0])
+
+    def test_unfinished_staging_is_discarded_on_begin(self):
+        staged = self.root / ".staging" / "files" / "connect.json"
+        staged.parent.mkdir(parents=True)
+        staged.write_text("{}")
+
+        self.assertEqual(staging.Generation(str(self.root)).recover(), "discarded")
+        self.assertFalse((self.root / "connect.json").exists())
+
+    def test_helpers_write_in_place_without_a_generation(self):
+        path = str(self.root / "old.json")
+        self.assertEqual(staging.path_for(path), path)
+        self.assertEqual(staging.resolve(path), path)
+        staging.remove(path)
+        staging.remove(path)
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,46 @@
+import gzip
 import json
+import os
 import tempfile
+import threading
 import unittest
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from unittest import mock
 
+import artifacts
+import staging
 import update_cdn
 
+RECORDED_CONNECT = Path(__file__).resolve().parent.parent / "connect.json"
+
+
+def serve_payload(body: bytes, etag: str = '"recorded"'):
+    """Start a local stand-in for the upstream CDN serving gzip-encoded body."""
+    compressed = gzip.compress(body)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(compressed)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(compressed)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/connect.json"
+
 
 class UpdateCdnCompatibilityTests(unittest.TestCase):
     def test_extract_sections_accepts_all_supported_payload_shapes(self):
@@ -76,6 +112,41 @@ class UpdateCdnCompatibilityTests(unittest.TestCase):
         self.assertEqual(exams[0]["midExamSource"], "pdf")
         self.assertEqual(exams[1]["midExamSource"], "cdn")
 
+    def test_exam_fields_hash_ignores_seat_and_room_changes(self):
+        sections = [
+            {"sectionId": 1, "courseCode": "CSE110", "sectionName": "01", "consumedSeat": 10, "roomName": "10B-17C",
+             "sectionSchedule": {"midExamDate": "2026-11-09", "midExamStartTime": "10:00"}},
+            {"sectionId": 2, "courseCode": "CSE110", "sectionName": "01L", "sectionType": "LAB",
+             "sectionSchedule": {"classSchedules": []}},
+        ]
+        original = update_cdn.exam_fields_hash(sections)
+
+        sections[0]["consumedSeat"] = 11
+        sections[0]["roomName"] = "09A-01C"
+        sections[1]["sectionName"] = "02L"  # no exam dates, so not in exams.json
+        self.assertEqual(update_cdn.exam_fields_hash(sections), original)
+
+        sections[0]["sectionSchedule"]["midExamStartTime"] = "11:00"
+        self.assertNotEqual(update_cdn.exam_fields_hash(sections), original)
+
+    def test_exam_fields_hash_covers_the_semesters_exam_status_record(self):
+        sections = [{"sectionId": 1, "courseCode": "CSE110", "sectionName": "01",
+                     "sectionSchedule": {"midExamDate": "2026-11-09", "midExamStartTime": "10:00"}}]
+        record = {"confirmed": True, "dataUrl": "https://example.test/mid.json", "updatedAt": "2026-10-28"}
+        with tempfile.TemporaryDirectory() as tmp:
+            status_path = Path(tmp) / "exam_status.json"
+
+            def fields_hash(semesters):
+                status_path.write_text(json.dumps({"schemaVersion": 1, "semesters": semesters}))
+                return update_cdn.exam_fields_hash(sections, str(status_path))
+
+            confirmed = fields_hash({"fall2026": {"midterm": record}})
+            self.assertEqual(fields_hash({"fall2026": {"midterm": record}, "summer2026": {"final": record}}),
+                             confirmed)
+            for changed in ({"confirmed": False}, {"updatedAt": "2026-10-30"},
+                            {"dataUrl": "https://example.test/mid-v2.json"}):
+                self.assertNotEqual(fields_hash({"fall2026": {"midterm": dict(record, **changed)}}), confirmed)
+
     def test_exam_source_metadata_reports_mixed_coverage(self):
         metadata = update_cdn.generate_exam_source_metadata(
             "Fall2026",
@@ -117,5 +188,136 @@ class UpdateCdnCompatibilityTests(unittest.TestCase):
                 )
 
 
+class StreamingFetchTests(unittest.TestCase):
+    def chunked(self, payload, size=7):
+        data = json.dumps(payload, ensure_ascii=False, indent=1).encode("utf-8")
+        return [data[i:i + size] for i in range(0, len(data), size)]
+
+    def test_iter_sections_handles_all_payload_shapes_across_chunk_boundaries(self):
+        sections = [{"sectionId": 123456, "courseName": "বাংলা", "capacity": 40}, {"sectionId": 7}]
+
+        for payload in (sections, {"data": sections}, {"metadata": {"totalSections": 2}, "sections": sections}):
+            self.assertEqual(list(update_cdn.iter_sections(self.chunked(payload))), sections)
+        self.assertEqual(list(update_cdn.iter_sections(self.chunked({"sections": []}))), [])
+
+    def test_iter_sections_rejects_unknown_payload_shape(self):
+        with self.assertRaises(ValueError):
+            list(update_cdn.iter_sections(self.chunked({"metadata": {"totalSections": 0}})))
+
+    def test_stream_fetch_matches_buffered_fetch_for_recorded_payload(self):
+        body = RECORDED_CONNECT.read_bytes()
+        server, url = serve_payload(body)
+        try:
+            with tempfile.TemporaryDirectory() as tmp, mock.patch.object(update_cdn, "SCRIPT_DIR", tmp):
+                streamed = update_cdn.fetch_mrz_data(force=True, stream=True, url=url)
+                buffered = update_cdn.fetch_mrz_data(force=True, url=url)
+                not_modified = update_cdn.fetch_mrz_data(stream=True, url=url)
+
+                self.assertEqual(Path(tmp, "connect.etag").read_text(), '"recorded"')
+        finally:
+            server.shutdown()
+
+        self.assertEqual(streamed, json.loads(body)["sections"])
+        self.assertEqual(streamed, buffered)
+        self.assertIsNone(not_modified)
+
+    def test_etag_of_a_discarded_run_is_not_used_for_the_next_fetch(self):
+        body = RECORDED_CONNECT.read_bytes()
+        server, url = serve_payload(body)
+        try:
+            with tempfile.TemporaryDirectory() as tmp, mock.patch.object(update_cdn, "SCRIPT_DIR", tmp), \
+                    mock.patch("builtins.print"):
+                generation = staging.Generation(tmp).begin()
+                self.assertIsNotNone(update_cdn.fetch_mrz_data(url=url))
+                # Within the run the staged validator is already in effect
+                self.assertIsNone(update_cdn.fetch_mrz_data(url=url))
+                generation.discard()
+
+                self.assertFalse(Path(tmp, "connect.etag").exists())
+                self.assertIsNotNone(update_cdn.fetch_mrz_data(url=url))
+        finally:
+            server.shutdown()
+
+
+class SemesterStateTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        (self.tmp / "backups").mkdir()
+        for name, value in (("SCRIPT_DIR", str(self.tmp)), ("BACKUPS_DIR", str(self.tmp / "backups")),
+                            ("BACKUP_STORE_DIR", str(self.tmp / "backup_store")),
+                            ("STATE_FILE", str(self.tmp / "cdn_state.json"))):
+            patcher = mock.patch.object(update_cdn, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def write_backup(self, name, mid_exam):
+        path = self.tmp / "backups" / name
+        path.write_text(json.dumps({"metadata": {"midExamStartDate": mid_exam}, "sections": []}), encoding="utf-8")
+        return path
+
+    def test_latest_backup_is_chosen_by_semester_name_not_mtime(self):
+        self.write_backup("fall2026.json", "2026-11-07")
+        older = self.write_backup("summer2026.json", "2026-07-04")
+        os.utime(older, (4_000_000_000, 4_000_000_000))
+
+        state = update_cdn.artifact_state("latestBackup")
+
+        self.assertEqual(state["filename"], "fall2026.json")
+        self.assertEqual(state["semester"], "Fall2026")
+
+    def test_backup_file_of_the_running_semester_is_written_from_the_store(self):
+        summer = {"midExamStartDate": "2026-07-04", "totalSections": 1}
+        fall = {"midExamStartDate": "2026-11-07", "totalSections": 1}
+        writer = artifacts.ArtifactWriter(variants=())
+
+        with mock.patch("builtins.print"):
+            update_cdn.manage_current_backup(summer, [{"sectionId": 1}], writer)
+            self.assertEqual([path.name for path in (self.tmp / "backups").iterdir()], ["summer2026.json"])
+            _, semester_changed = update_cdn.manage_current_backup(fall, [{"sectionId": 2}], writer)
+
+        self.assertTrue(semester_changed)
+        self.assertEqual(sorted(path.name for path in (self.tmp / "backups").iterdir()),
+                         ["fall2026.json", "summer2026.json"])
+        self.assertEqual(json.loads((self.tmp / "backups" / "summer2026.json").read_text(encoding="utf-8")),
+                         {"metadata": summer, "sections": [{"sectionId": 1}]})
+        self.assertEqual(json.loads((self.tmp / "backups" / "fall2026.json").read_text(encoding="utf-8")),
+                         {"metadata": fall, "sections": [{"sectionId": 2}]})
+        self.assertEqual(update_cdn.BackupStore(str(self.tmp / "backup_store")).semesters(),
+                         ["fall2026", "summer2026"])
+
+    def test_stable_freeze_uses_recorded_state_without_reading_stable_json(self):
+        stable = self.tmp / "stable.json"
+        stable.write_text("not parsed", encoding="utf-8")
+        update_cdn.update_cdn_state("stable", {"midExamStartDate": "2026-11-07", "finalExamEndDate": "2999-01-01"})
+
+        with mock.patch("builtins.print"):
+            update_cdn.manage_stable_json({"midExamStartDate": "2027-03-01"}, [], artifacts.ArtifactWriter())
+
+        self.assertEqual(stable.read_text(encoding="utf-8"), "not parsed")
+
+    def test_stable_switch_is_due_once_frozen_finals_end(self):
+        (self.tmp / "stable.json").write_text("{}", encoding="utf-8")
+        update_cdn.update_cdn_state("stable", {"midExamStartDate": "2026-11-07", "finalExamEndDate": "2027-01-15"})
+        incoming = {"midExamStartDate": "2027-03-01"}
+
+        self.assertFalse(update_cdn.stable_switch_due({"midExamStartDate": "2026-11-07"}))
+        with mock.patch.object(update_cdn, "datetime", wraps=datetime) as clock:
+            clock.now.return_value = datetime(2027, 1, 15, tzinfo=timezone.utc)
+            self.assertFalse(update_cdn.stable_switch_due(incoming))
+            clock.now.return_value = datetime(2027, 1, 16, tzinfo=timezone.utc)
+            self.assertTrue(update_cdn.stable_switch_due(incoming))
+
+    def test_state_is_recorded_when_stable_json_is_written(self):
+        metadata = {"midExamStartDate": "2027-03-01", "finalExamEndDate": "2027-04-20"}
+
+        with mock.patch("builtins.print"):
+            update_cdn.manage_stable_json(metadata, [], artifacts.ArtifactWriter(variants=()))
+
+        self.assertEqual(update_cdn.load_cdn_state()["stable"],
+                         {"semester": "Spring2027", "midExamStartDate": "2027-03-01", "finalExamEndDate": "2027-04-20"})
+
+
 if __name__ == "__main__":
     unittest.main()
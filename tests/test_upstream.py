@@ -0,0 +1,118 @@
+import json
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from urllib3.util.retry import Retry
+
+import artifacts
+import upstream
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Serves /flaky with one 503 before succeeding; /slow waits before answering."""
+
+    hits = {}
+    release = threading.Event()
+
+    def do_GET(self):
+        count = self.hits[self.path] = self.hits.get(self.path, 0) + 1
+        if self.path == "/flaky" and count == 1:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/slow":
+            self.release.wait(5)
+        if self.path.startswith("/etag"):
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = json.dumps({"path": self.path}).encode()
+        else:
+            body = json.dumps({"path": self.path, "hit": count}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if self.path == "/etag":
+            self.send_header("ETag", '"v1"')
+        if self.path == "/etag-max-age":
+            self.send_header("Cache-Control", "public, max-age=600")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class UpstreamClientTests(unittest.TestCase):
+    def setUp(self):
+        FlakyHandler.hits = {}
+        FlakyHandler.release.clear()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        fast_retries = Retry(total=2, backoff_factor=0, status_forcelist=(503,), raise_on_status=False)
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        patcher = mock.patch.multiple(upstream, RETRY_POLICY=fast_retries, _session=None,
+                                      CACHE_DIR=cache_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(upstream.shutdown)
+        self.addCleanup(self.server.shutdown)
+
+    def test_transient_server_errors_are_retried(self):
+        self.assertEqual(upstream.get_json(f"{self.base}/flaky"), {"path": "/flaky", "hit": 2})
+
+    def test_prefetched_payload_is_fetched_once_and_consumed_later(self):
+        url = f"{self.base}/slow"
+        first = upstream.prefetch_json(url)
+        self.assertIs(upstream.prefetch_json(url), first)
+
+        FlakyHandler.release.set()
+        self.assertEqual(upstream.get_json(url), {"path": "/slow", "hit": 1})
+        self.assertEqual(FlakyHandler.hits["/slow"], 1)
+
+    def test_conditional_get_serves_unchanged_body_from_cache(self):
+        url = f"{self.base}/etag"
+
+        first = upstream.fetch_json_cached(url)
+        second = upstream.fetch_json_cached(url)
+
+        self.assertEqual(second.sha256, first.sha256)
+        self.assertEqual(second.payload, {"path": "/etag"})
+        self.assertEqual(FlakyHandler.hits["/etag"], 2)
+
+    def test_body_is_unchanged_only_once_a_published_run_consumed_it(self):
+        url = f"{self.base}/etag-plain"
+        hashes = artifacts.ContentHashes(path="missing.json")
+
+        # A run that fetched the body but failed before publishing recorded nothing
+        upstream.fetch_json_cached(url)
+        cached = upstream.fetch_json_cached(url)
+        self.assertFalse(cached.consumed_by(hashes))
+
+        cached.mark_consumed(hashes)
+        self.assertTrue(upstream.fetch_json_cached(url).consumed_by(hashes))
+        self.assertFalse(cached.consumed_by(None))
+
+    def test_fresh_entry_within_max_age_skips_the_request(self):
+        url = f"{self.base}/etag-max-age"
+        first = upstream.fetch_json_cached(url)
+        cached = upstream.fetch_json_cached(url)
+
+        self.assertEqual(cached.sha256, first.sha256)
+        self.assertEqual(FlakyHandler.hits["/etag-max-age"], 1)
+
+    def test_per_host_timeouts(self):
+        self.assertEqual(upstream.timeout_for("https://usis-cdn.eniamza.com/table.json"),
+                         upstream.HOST_TIMEOUTS["usis-cdn.eniamza.com"])
+        self.assertEqual(upstream.timeout_for("https://example.test/x.json"), upstream.DEFAULT_TIMEOUT)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+import gzip
+import json
+import os
+import random
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+import update_cdn
+import upstream
+import watch
+from artifacts import ContentHashes
+
+
+class ChangingUpstream:
+    """Local stand-in for the upstream CDN whose payload can be swapped between polls."""
+
+    def __init__(self):
+        self.payload, self.etag, self.status = None, None, 200
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if upstream.status != 200:
+                    self.send_error(upstream.status)
+                    return
+                if self.headers.get("If-None-Match") == upstream.etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                body = gzip.compress(json.dumps(upstream.payload).encode("utf-8"))
+                self.send_response(200)
+                self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", upstream.etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/connect.json"
+
+    def publish(self, seats, etag):
+        self.payload = [{"sectionId": i, "consumedSeat": used} for i, used in enumerate(seats)]
+        self.etag = etag
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class PollScheduleTests(unittest.TestCase):
+    def test_backs_off_when_idle_and_tightens_on_changes(self):
+        schedule = watch.PollSchedule(60, 600, jitter=0.0)
+
+        delays = [schedule.next_delay(watch.PollResult("not-modified")) for _ in range(5)]
+        self.assertEqual(delays, [120, 240, 480, 600, 600])
+
+        self.assertEqual(schedule.next_delay(watch.PollResult("published", churn=0.001)), 300)
+        self.assertEqual(schedule.next_delay(watch.PollResult("published", churn=0.05)), 60)
+        self.assertEqual(schedule.next_delay(watch.PollResult("error")), 120)
+
+    def test_delays_are_jittered_within_bounds(self):
+        schedule = watch.PollSchedule(100, 100, jitter=0.2, rng=random.Random(7))
+        delays = [schedule.next_delay(watch.PollResult("unchanged")) for _ in range(50)]
+
+        self.assertTrue(all(80 <= delay <= 120 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+    def test_seat_churn(self):
+        old = [{"sectionId": 1, "consumedSeat": 5}, {"sectionId": 2, "consumedSeat": 5}]
+        new = [{"sectionId": 1, "consumedSeat": 6}, {"sectionId": 2, "consumedSeat": 5},
+               {"sectionId": 3, "consumedSeat": 0}, {"sectionId": 4, "consumedSeat": 0}]
+
+        self.assertEqual(watch.seat_churn(old, new), 0.75)
+        self.assertEqual(watch.seat_churn(None, new), 1.0)
+
+
+class WatcherTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        Path(self.root, "version.json").write_text(json.dumps({"major": 2, "semester": 1, "daily": 0}))
+        for name, value in (("SCRIPT_DIR", self.root), ("VERSION_FILE", os.path.join(self.root, "version.json"))):
+            patcher = mock.patch.object(update_cdn, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.upstream = ChangingUpstream()
+        self.addCleanup(self.upstream.close)
+        self.calls = []
+
+    def regenerate(self, sections, hashes, writer, previous=None, refresh_all=True):
+        """Stand-in for update_artifacts: publishes connect.json when the sections changed."""
+        self.calls.append((sections, previous, refresh_all))
+        if previous is not None and previous[1] == sections:
+            return None, None
+        metadata = {"totalSections": len(sections)}
+        writer.write(os.path.join(self.root, "connect.json"), {"metadata": metadata, "sections": sections},
+                     gzip_copy=False, quiet=True)
+        return "fall2026.json", metadata
+
+    def test_polls_publish_only_on_changes_and_keep_state_in_memory(self):
+        watcher = watch.Watcher(self.upstream.url, root=self.root, regenerate=self.regenerate,
+                                hashes=ContentHashes(os.path.join(self.root, "hashes.json")))
+        self.assertIsNone(watcher.sections)
+
+        self.upstream.publish([1, 2, 3, 4], '"v1"')
+        v1 = self.upstream.payload
+        first = watcher.poll()
+        second = watcher.poll()
+        self.upstream.publish([1, 2, 9, 4], '"v2"')
+        third = watcher.poll()
+
+        self.assertEqual((first.status, first.generation), ("published", 1))
+        self.assertEqual(second.status, "not-modified")
+        self.assertEqual((third.status, third.generation, third.churn), ("published", 2, 0.25))
+
+        # The second publish diffed against the in-memory state, not a re-read file
+        _, previous, refresh_all = self.calls[-1]
+        self.assertEqual(previous, ({"totalSections": 4}, v1))
+        self.assertFalse(refresh_all)
+        self.assertEqual(len(self.calls), 2)
+
+        published = json.loads(Path(self.root, "connect.json").read_text())
+        self.assertEqual(published["sections"], self.upstream.payload)
+        self.assertEqual(Path(self.root, "connect.etag").read_text(), '"v2"')
+        self.assertEqual(json.loads(Path(self.root, "publish_manifest.json").read_text())["generation"], 2)
+
+    def test_failed_poll_publishes_nothing_and_loop_stops(self):
+        watcher = watch.Watcher(self.upstream.url, root=self.root, regenerate=self.regenerate,
+                                schedule=watch.PollSchedule(0.01, 0.01),
+                                hashes=ContentHashes(os.path.join(self.root, "hashes.json")))
+        self.upstream.status = 404
+
+        self.assertEqual(watcher.poll().status, "error")
+        self.assertFalse(Path(self.root, "publish_manifest.json").exists())
+        self.assertEqual(watcher.run(max_polls=3), 3)
+
+        watcher.stop()
+        self.assertEqual(watcher.run(), 0)
+
+    def test_failed_poll_forgets_the_upstream_bodies_it_consumed(self):
+        table = upstream.CachedJson("https://example.test/table.json", [], "digest")
+
+        def consume_then_fail(sections, hashes, writer, previous=None, refresh_all=True):
+            table.mark_consumed(hashes)
+            raise RuntimeError("exams stage failed")
+
+        watcher = watch.Watcher(self.upstream.url, root=self.root, regenerate=consume_then_fail,
+                                hashes=ContentHashes(os.path.join(self.root, "hashes.json")))
+        self.upstream.publish([1], '"v1"')
+
+        with mock.patch("builtins.print"):
+            self.assertEqual(watcher.poll().status, "error")
+        self.assertFalse(table.consumed_by(watcher.hashes))
+        self.assertFalse(Path(self.root, "hashes.json").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,33 +4,127 @@ MRZ Connect CDN Data Update Script
 Fetches course data from MRZ Connect API and generates static CDN files with metadata.
 """
 
+import codecs
+import hashlib
 import json
 import os
 import sys
-import gzip
 import requests
-import glob
 from datetime import datetime, timezone
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import run_report
+import staging
+import upstream
+from artifacts import ArtifactWriter, ContentHashes, content_hash, document_hash, load_zstd_dictionary
+from backup_store import BackupStore
+from connect_columnar import generate_columnar
+from connect_index import generate_connect_index
+from exam_overlay import build_official_index, join_overlays, print_overlay_report
+from generate_backup_index import BACKUP_PATTERN, read_backup_metadata
+from seat_history import record_seat_snapshot
+from generate_changes import generate_changes
+from generate_deltas import generate_delta, load_previous_connect
+from generate_shards import generate_shards
 
 # Get the directory where this script is located
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 BACKUPS_DIR = os.path.join(SCRIPT_DIR, "backups")
+BACKUP_STORE_DIR = os.path.join(SCRIPT_DIR, "backup_store")
 VERSION_FILE = os.path.join(SCRIPT_DIR, "version.json")
 EXAM_STATUS_FILE = os.path.join(SCRIPT_DIR, "exam_status.json")
+STATE_FILE = os.path.join(SCRIPT_DIR, "cdn_state.json")
+SEASON_ORDER = {"spring": 0, "summer": 1, "fall": 2}
 STATUS_FILE = os.path.join(SCRIPT_DIR, "status.json")
 LIVE_DATA_URL = "https://usis-cdn.eniamza.com/connect.json"
+STREAM_CHUNK_SIZE = 64 * 1024
+EXAM_SCHEDULE_FIELDS = ('midExamDate', 'midExamStartTime', 'finalExamDate', 'finalExamStartTime')
 
 
 def load_version() -> Dict:
     """Load version info from version.json."""
     try:
-        with open(VERSION_FILE, 'r') as f:
+        with open(staging.resolve(VERSION_FILE), 'r') as f:
             return json.load(f)
     except (FileNotFoundError, json.JSONDecodeError):
         return {"major": 2, "semester": 0, "daily": 0}
 
 
+def load_cdn_state() -> Dict:
+    """Load cdn_state.json: semester/exam dates of the latest backup and stable.json."""
+    try:
+        with open(staging.resolve(STATE_FILE), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if isinstance(state, dict):
+            return state
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    return {"schemaVersion": 1}
+
+
+def update_cdn_state(artifact: str, metadata: Dict, **extra) -> None:
+    """Record the semester and exam dates an artifact was last written with."""
+    state = load_cdn_state()
+    state[artifact] = {
+        "semester": get_current_semester(metadata.get('midExamStartDate')),
+        "midExamStartDate": metadata.get('midExamStartDate'),
+        "finalExamEndDate": metadata.get('finalExamEndDate'),
+        **extra
+    }
+    write_json_file(STATE_FILE, state)
+
+
+def artifact_state(artifact: str) -> Optional[Dict]:
+    """State of "latestBackup" or "stable", rebuilt from file headers when not recorded yet."""
+    state = load_cdn_state()
+    if state.get(artifact):
+        return state[artifact]
+
+    if artifact == "stable":
+        path = os.path.join(SCRIPT_DIR, "stable.json")
+        if not os.path.exists(staging.resolve(path)):
+            return None
+        metadata = read_backup_metadata(staging.resolve(path))
+        extra = {}
+    else:
+        # Newest semester by name (filesystem mtimes are meaningless after a checkout);
+        # the running semester is only in the backup store
+        store = BackupStore(BACKUP_STORE_DIR)
+        stored = {semester_to_filename(semester): semester for semester in store.semesters()}
+        backups = [filename for filename in
+                   {os.path.basename(path) for path in staging.listing(BACKUPS_DIR)} | set(stored)
+                   if BACKUP_PATTERN.match(filename)]
+        if not backups:
+            return None
+        filename = max(backups, key=semester_sort_key)
+        if filename in stored:
+            metadata = store.snapshots(stored[filename])[-1]["metadata"]
+        else:
+            metadata = read_backup_metadata(staging.resolve(os.path.join(BACKUPS_DIR, filename)))
+        extra = {"filename": filename}
+
+    state[artifact] = {
+        "semester": get_current_semester(metadata.get('midExamStartDate')),
+        "midExamStartDate": metadata.get('midExamStartDate'),
+        "finalExamEndDate": metadata.get('finalExamEndDate'),
+        **extra
+    }
+    write_json_file(STATE_FILE, state)
+    return state[artifact]
+
+
+def semester_sort_key(filename: str) -> tuple:
+    """spring2026.json < summer2026.json < fall2026.json < spring2027.json"""
+    match = BACKUP_PATTERN.match(filename)
+    if not match:
+        return (0, -1)
+    return (int(match.group(2)), SEASON_ORDER[match.group(1).lower()])
+
+
+def version_string(v: Dict) -> str:
+    return f"{v['major']}.{v['semester']}.{v['daily']}"
+
+
 def bump_version(semester_changed: bool) -> str:
     """Bump version and return version string (MAJOR.SEMESTER.DAILY)."""
     v = load_version()
@@ -41,23 +135,28 @@ def bump_version(semester_changed: bool) -> str:
     else:
         v["daily"] += 1
 
-    with open(VERSION_FILE, 'w') as f:
+    # Staged with the rest of the run: a failed run leaves version.json as it was
+    with open(staging.path_for(VERSION_FILE), 'w') as f:
         json.dump(v, f, indent=2)
 
-    version_str = f"{v['major']}.{v['semester']}.{v['daily']}"
+    version_str = version_string(v)
     print(f"✓ Version bumped to {version_str}")
     return version_str
 
 
-def fetch_mrz_data(force: bool = False) -> Optional[List[Dict]]:
-    """Fetch course data from MRZ Connect API with conditional GET."""
-    url = LIVE_DATA_URL
+def fetch_mrz_data(force: bool = False, stream: bool = False, url: str = LIVE_DATA_URL) -> Optional[List[Dict]]:
+    """Fetch course data from MRZ Connect API with conditional GET.
+
+    In stream mode the body is read in chunks (gzip/br content encoding is
+    decoded on the fly) and sections are parsed one at a time, so the raw
+    bytes and decoded text of the full payload are never held in memory.
+    """
     etag_file = os.path.join(SCRIPT_DIR, "connect.etag")
     headers = {}
 
-    # Load stored ETag (skip if force mode)
-    if not force and os.path.exists(etag_file):
-        with open(etag_file, 'r') as f:
+    # Load the published (or this run's staged) ETag (skip if force mode)
+    if not force and os.path.exists(staging.resolve(etag_file)):
+        with open(staging.resolve(etag_file), 'r') as f:
             stored_etag = f.read().strip()
             if stored_etag:
                 headers['If-None-Match'] = stored_etag
@@ -65,23 +164,32 @@ def fetch_mrz_data(force: bool = False) -> Optional[List[Dict]]:
     print(f"Fetching data from {url}...")
     if force:
         print("  (force mode - ignoring cached ETag)")
+    if stream:
+        print("  (stream mode - parsing sections incrementally)")
 
     try:
-        response = requests.get(url, headers=headers, timeout=30)
-
-        # Check for 304 Not Modified
-        if response.status_code == 304:
-            print("✓ Data not modified (304). Skipping update.")
-            return None
+        with upstream.get(url, headers=headers, stream=stream) as response:
+            # Check for 304 Not Modified
+            if response.status_code == 304:
+                print("✓ Data not modified (304). Skipping update.")
+                return None
+
+            response.raise_for_status()
+
+            with run_report.stage("parse") as parse_stage:
+                if stream:
+                    chunks = counted(response.iter_content(STREAM_CHUNK_SIZE), parse_stage)
+                    data = extract_sections(iter_sections(chunks))
+                else:
+                    parse_stage["inputBytes"] = len(response.content)
+                    data = extract_sections(response.json())
+
+            # Stage the new ETag once the payload parsed; it is published with the
+            # run's artifacts, so a run that fails later refetches the payload
+            if 'ETag' in response.headers:
+                with open(staging.path_for(etag_file), 'w') as f:
+                    f.write(response.headers['ETag'])
 
-        response.raise_for_status()
-
-        # Save new ETag
-        if 'ETag' in response.headers:
-            with open(etag_file, 'w') as f:
-                f.write(response.headers['ETag'])
-
-        data = extract_sections(response.json())
         print(f"✓ Successfully fetched {len(data)} sections")
         return data
     except requests.RequestException as e:
@@ -89,11 +197,25 @@ def fetch_mrz_data(force: bool = False) -> Optional[List[Dict]]:
         raise
 
 
+def counted(chunks: Iterable[bytes], record: Dict) -> Iterator[bytes]:
+    """Pass chunks through, accumulating their size in record["inputBytes"]."""
+    record["inputBytes"] = 0
+    for chunk in chunks:
+        record["inputBytes"] += len(chunk)
+        yield chunk
+
+
 def extract_sections(payload) -> List[Dict]:
-    """Accept the upstream list and the wrapped payloads used by clients."""
+    """Accept the upstream list and the wrapped payloads used by clients.
+
+    A section iterator (see iter_sections) is materialized as it is consumed.
+    """
     if isinstance(payload, list):
         return payload
 
+    if isinstance(payload, Iterator):
+        return list(payload)
+
     if isinstance(payload, dict):
         for key in ("sections", "data"):
             value = payload.get(key)
@@ -103,6 +225,107 @@ def extract_sections(payload) -> List[Dict]:
     raise ValueError("Unsupported Connect payload. Expected a list, {data: []}, or {sections: []}.")
 
 
+class _JsonChunkReader:
+    """Text buffer over streamed bytes that decodes one JSON value at a time."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Append the next chunk to the buffer; False once the stream is exhausted."""
+        if self.eof:
+            return False
+
+        # Drop the consumed prefix so the buffer stays around one chunk in size
+        if self.pos:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+
+        for chunk in self._chunks:
+            text = self._text.decode(chunk)
+            if text:
+                self.buffer += text
+                return True
+
+        self.buffer += self._text.decode(b"", final=True)
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it ('' at EOF)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Malformed Connect payload: expected {char!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value, reading more chunks as needed."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+                # A number ending exactly at the buffer edge may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+
+def iter_sections(chunks: Iterable[bytes]) -> Iterator[Dict]:
+    """Incrementally yield section dicts from a streamed Connect payload.
+
+    Handles the bare list and the {data: []} / {sections: []} wrappers. For a
+    wrapper, the first of "sections"/"data" holding a list is streamed and the
+    rest of the document is not read.
+    """
+    reader = _JsonChunkReader(chunks)
+    start = reader.peek()
+
+    if start == "{":
+        reader.pos += 1
+        while reader.peek() != "}":
+            key = reader.value()
+            reader.expect(":")
+            if key in ("sections", "data") and reader.peek() == "[":
+                break
+            reader.value()
+            if reader.peek() == ",":
+                reader.pos += 1
+        else:
+            raise ValueError("Unsupported Connect payload. Expected a list, {data: []}, or {sections: []}.")
+    elif start != "[":
+        raise ValueError("Unsupported Connect payload. Expected a list, {data: []}, or {sections: []}.")
+
+    reader.expect("[")
+    if reader.peek() == "]":
+        return
+
+    while True:
+        yield reader.value()
+        separator = reader.peek()
+        reader.pos += 1
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError(f"Malformed Connect payload: unexpected {separator!r} in sections list")
+
+
 def validate_exam_status_document(document: Dict) -> None:
     if not isinstance(document, dict):
         raise ValueError("exam_status.json must be an object")
@@ -152,7 +375,7 @@ def build_status_document(metadata: Dict, status_path: str = EXAM_STATUS_FILE) -
 
 
 def write_json_file(path: str, data: Dict) -> None:
-    with open(path, "w", encoding="utf-8") as f:
+    with open(staging.path_for(path), "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
         f.write("\n")
 
@@ -241,8 +464,15 @@ def semester_to_filename(semester: str) -> str:
     return semester.lower() + ".json"
 
 
-def manage_current_backup(metadata: Dict, sections: List[Dict]):
-    """Manage current semester backup."""
+def manage_current_backup(metadata: Dict, sections: List[Dict], writer: Optional[ArtifactWriter] = None):
+    """Manage current semester backup.
+
+    Every run appends its snapshot to backup_store/<semester>/ and writes
+    the CDN-facing backups/<semester>.json (compact) from the store's latest
+    snapshot; the file is left alone when the snapshot is unchanged.
+    """
+    writer = writer or ArtifactWriter()
+
     print("\n" + "=" * 60)
     print("Managing Current Semester Backup")
     print("=" * 60)
@@ -262,47 +492,69 @@ def manage_current_backup(metadata: Dict, sections: List[Dict]):
     backup_name = semester_to_filename(current_semester)
     backup_path = os.path.join(BACKUPS_DIR, backup_name)
 
-    # Find all existing backup files to detect semester change
-    existing_backups = glob.glob(os.path.join(BACKUPS_DIR, "*.json"))
-
-    if existing_backups:
-        # Check the most recent backup's semester
-        latest_backup = max(existing_backups, key=os.path.getmtime)
-        try:
-            with open(latest_backup, 'r', encoding='utf-8') as f:
-                old_data = json.load(f)
-                old_mid_exam = old_data['metadata'].get('midExamStartDate')
-                old_semester = get_current_semester(old_mid_exam)
-
-            if mid_exam_start != old_mid_exam and old_semester != current_semester:
-                semester_changed = True
-                print(f"\n📅 Semester changed!")
-                print(f"   Old: {old_mid_exam} ({old_semester})")
-                print(f"   New: {mid_exam_start} ({current_semester})")
-                print(f"✓ Previous backup preserved: {os.path.basename(latest_backup)}")
-            else:
-                print(f"✓ Same semester, updating backup...")
-        except Exception as e:
-            print(f"⚠️  Error reading old backup: {e}")
-    else:
+    # Detect a semester change against the last written backup (cdn_state.json)
+    try:
+        latest_backup = artifact_state("latestBackup")
+    except Exception as e:
+        latest_backup = None
+        print(f"⚠️  Error reading old backup: {e}")
+
+    if latest_backup:
+        old_mid_exam = latest_backup.get('midExamStartDate')
+        old_semester = latest_backup.get('semester')
+
+        if mid_exam_start != old_mid_exam and old_semester != current_semester:
+            semester_changed = True
+            print(f"\n📅 Semester changed!")
+            print(f"   Old: {old_mid_exam} ({old_semester})")
+            print(f"   New: {mid_exam_start} ({current_semester})")
+            print(f"✓ Previous backup preserved: {latest_backup.get('filename')}")
+        else:
+            print(f"✓ Same semester, updating backup...")
+    elif not staging.listing(BACKUPS_DIR):
         semester_changed = True
 
-    # Write current semester backup
-    backup_data = {
-        "metadata": metadata,
-        "sections": sections
-    }
+    store = BackupStore(BACKUP_STORE_DIR)
+    semester_key = os.path.splitext(backup_name)[0]
+
+    # A finished semester gets its public backup from its last stored snapshot
+    if semester_changed and latest_backup and latest_backup.get('filename'):
+        old_key = os.path.splitext(latest_backup['filename'])[0]
+        if old_key != semester_key and old_key in store.semesters():
+            stats = store.publish(old_key, os.path.join(BACKUPS_DIR, latest_backup['filename']), writer)
+            print(f"✓ Archived: {latest_backup['filename']} ({stats['bytes'] / 1024:.1f} KB)")
+
+    stored = store.put(semester_key, metadata, sections)
+    if stored or not os.path.exists(staging.resolve(backup_path)):
+        stats = store.publish(semester_key, backup_path, writer)
+        print(f"\n✓ Created/Updated: {backup_name} ({stats['bytes'] / 1024:.1f} KB)")
+    else:
+        print(f"\n✓ {backup_name} unchanged")
 
-    with open(backup_path, 'w', encoding='utf-8') as f:
-        json.dump(backup_data, f, indent=2, ensure_ascii=False)
+    update_cdn_state("latestBackup", metadata, filename=backup_name)
 
-    file_size = os.path.getsize(backup_path) / 1024
-    print(f"\n✓ Created/Updated: {backup_name} ({file_size:.1f} KB)")
+    print(f"  backup_store/{semester_key}: {'snapshot stored' if stored else 'unchanged'} "
+          f"({store.size(semester_key) / 1024:.1f} KB)")
 
     return backup_name, semester_changed
 
 
-def manage_stable_json(metadata: Dict, sections: List[Dict]):
+def stable_switch_due(metadata: Dict) -> bool:
+    """True when stable.json is missing or frozen on another semester whose finals have ended.
+
+    Used when the sections are unchanged: same-semester data is then already
+    in stable.json, but a freeze can still end by the date passing.
+    """
+    stable_state = artifact_state("stable")
+    if stable_state is None:
+        return True
+    if get_current_semester(metadata.get('midExamStartDate')) == stable_state.get('semester'):
+        return False
+    final_end = stable_state.get('finalExamEndDate')
+    return not final_end or datetime.now(timezone.utc).date() > datetime.strptime(final_end, "%Y-%m-%d").date()
+
+
+def manage_stable_json(metadata: Dict, sections: List[Dict], writer: Optional[ArtifactWriter] = None):
     """Manage stable.json — stays on current semester until final exams end.
 
     connect.json always has the latest API data (could be next semester mid-current).
@@ -312,6 +564,7 @@ def manage_stable_json(metadata: Dict, sections: List[Dict]):
 
     Semester end is detected by: today > finalExamEndDate
     """
+    writer = writer or ArtifactWriter()
     stable_path = os.path.join(SCRIPT_DIR, "stable.json")
     incoming_semester = get_current_semester(metadata.get('midExamStartDate'))
 
@@ -321,17 +574,15 @@ def manage_stable_json(metadata: Dict, sections: List[Dict]):
 
     if os.path.exists(stable_path):
         try:
-            with open(stable_path, 'r', encoding='utf-8') as f:
-                stable_data = json.load(f)
-
-            stable_mid = stable_data['metadata'].get('midExamStartDate')
-            stable_semester = get_current_semester(stable_mid)
+            # Semester and finals end of the published stable.json, from cdn_state.json
+            stable_state = artifact_state("stable")
+            stable_semester = stable_state['semester']
 
             if incoming_semester == stable_semester:
                 print(f"\n  Same semester ({stable_semester}) — updating with latest data")
             else:
                 # Different semester — only switch after finals end
-                final_end = stable_data['metadata'].get('finalExamEndDate')
+                final_end = stable_state.get('finalExamEndDate')
                 if final_end:
                     today = datetime.now(timezone.utc).date()
                     final_end_date = datetime.strptime(final_end, "%Y-%m-%d").date()
@@ -349,24 +600,23 @@ def manage_stable_json(metadata: Dict, sections: List[Dict]):
     else:
         print(f"\n  Creating stable.json ({incoming_semester})")
 
-    # Write stable.json
-    stable_data = {"metadata": metadata, "sections": sections}
+    # Write stable.json and its gzipped version
+    stable_data = writer.document(metadata=metadata, sections=writer.encode("sections", sections))
+    stats = writer.write(stable_path, stable_data)
+    update_cdn_state("stable", metadata)
 
-    with open(stable_path, 'w', encoding='utf-8') as f:
-        json.dump(stable_data, f, indent=2, ensure_ascii=False)
-
-    # Write gzipped version
-    gz_path = stable_path + '.gz'
-    with gzip.open(gz_path, 'wt', encoding='utf-8') as f:
-        json.dump(stable_data, f, separators=(',', ':'), ensure_ascii=False)
-
-    file_size = os.path.getsize(stable_path) / 1024
-    gz_size = os.path.getsize(gz_path) / 1024
+    file_size = stats["bytes"] / 1024
+    gz_size = stats["gzipBytes"] / 1024
     print(f"  ✓ stable.json written ({file_size:.1f} KB, gzipped: {gz_size:.1f} KB)")
 
 
-def load_confirmed_exam_overlay(semester: str, exam_type: str) -> tuple[dict | None, dict | None]:
-    """Fetch a confirmed official PDF-derived schedule when configured."""
+def load_confirmed_exam_overlay(semester: str, exam_type: str,
+                                hashes: Optional[ContentHashes] = None) -> tuple[dict | None, dict | None]:
+    """Fetch a confirmed official PDF-derived schedule when configured.
+
+    The fetched body is recorded as consumed in hashes (when given), so
+    exam_overlays_changed() compares against what this run published.
+    """
     try:
         with open(EXAM_STATUS_FILE, "r", encoding="utf-8") as f:
             status = json.load(f)
@@ -379,70 +629,82 @@ def load_confirmed_exam_overlay(semester: str, exam_type: str) -> tuple[dict | N
         if not isinstance(data_url, str) or not data_url.startswith("https://"):
             return None, None
 
-        response = requests.get(data_url, timeout=30)
-        response.raise_for_status()
-        payload = response.json()
+        overlay = upstream.get_cached_json(data_url)
+        payload = overlay.payload
         if not isinstance(payload, dict) or not isinstance(payload.get("exams"), list):
             raise ValueError("official exam payload must contain an exams list")
+        overlay.mark_consumed(hashes)
         return payload, record
     except (FileNotFoundError, json.JSONDecodeError, ValueError, requests.RequestException) as error:
         print(f"  Official {exam_type} overlay unavailable; keeping CDN data: {error}")
         return None, None
 
 
-def official_exam_index(payload: dict | None, exam_type: str) -> dict[tuple[str, str], dict]:
-    if not payload:
-        return {}
+def confirmed_overlay_urls(semester_key: Optional[str], status_path: str = EXAM_STATUS_FILE) -> List[str]:
+    """dataUrls of the confirmed official exam overlays recorded for a semester."""
+    try:
+        with open(status_path, "r", encoding="utf-8") as f:
+            status = json.load(f)
+        validate_exam_status_document(status)
+    except (FileNotFoundError, json.JSONDecodeError, ValueError):
+        return []
 
-    date_key = "Final Date" if exam_type == "final" else "Mid Date"
-    result = {}
-    for exam in payload.get("exams", []):
-        if not isinstance(exam, dict):
-            continue
-        course = exam.get("Course") or exam.get("courseCode")
-        section = exam.get("Section") or exam.get("sectionName")
-        date = exam.get(date_key) or exam.get("finalExamDate" if exam_type == "final" else "midExamDate")
-        if course and section and date:
-            result[(str(course).strip().upper(), str(section).strip().zfill(2))] = exam
-    return result
+    records = status.get("semesters", {}).get(semester_key or "", {})
+    return [
+        record["dataUrl"] for record in records.values()
+        if record.get("confirmed") is True and str(record.get("dataUrl", "")).startswith("https://")
+    ]
 
 
-def apply_official_overlay(exams: List[Dict], official: dict[tuple[str, str], dict], exam_type: str) -> int:
-    date_key = "Final Date" if exam_type == "final" else "Mid Date"
-    time_start_key = "finalExamTime" if exam_type == "final" else "midExamTime"
-    room_key = "finalExamRoom" if exam_type == "final" else "midExamRoom"
-    applied = 0
-
-    for exam in exams:
-        key = (str(exam.get("courseCode", "")).strip().upper(), str(exam.get("sectionName", "")).strip().zfill(2))
-        official_exam = official.get(key)
-        if not official_exam:
-            continue
+def published_semester_key() -> Optional[str]:
+    """currentSemesterKey of the last published status.json."""
+    try:
+        with open(STATUS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f).get("currentSemesterKey")
+    except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+        return None
 
-        official_date = official_exam.get(date_key) or official_exam.get(
-            "finalExamDate" if exam_type == "final" else "midExamDate"
-        )
-        official_time = official_exam.get("Start Time") or official_exam.get(time_start_key)
-        official_end = official_exam.get("End Time")
-        official_room = official_exam.get("Room.") or official_exam.get(room_key)
-        source_key = "finalExamSource" if exam_type == "final" else "midExamSource"
-        date_output_key = "finalExamDate" if exam_type == "final" else "midExamDate"
-        if official_date:
-            exam[date_output_key] = official_date
-        if official_time:
-            if exam_type == "final":
-                exam["finalExamTime"] = official_time if not official_end else f"{official_time}-{official_end}"
-            else:
-                exam["midExamTime"] = official_time if not official_end else f"{official_time}-{official_end}"
-        if official_room:
-            exam[room_key] = official_room
-        exam[source_key] = "pdf"
-        applied += 1
 
-    return applied
+def prefetch_upstream_payloads() -> None:
+    """Start table.json and official overlay downloads while connect.json is fetched.
+
+    Overlays are prefetched for the semester currently in status.json; any
+    other semester falls back to a direct fetch in load_confirmed_exam_overlay.
+    """
+    from generate_free_labs import TABLE_URL
+
+    upstream.prefetch_json(TABLE_URL)
+    for url in confirmed_overlay_urls(published_semester_key()):
+        upstream.prefetch_json(url)
+
 
+def exam_overlays_changed(hashes: ContentHashes) -> bool:
+    """True when any confirmed overlay of the published semester differs from
+    the body the last published run consumed.
 
-def generate_exam_source_metadata(semester: str, overlays: dict[str, tuple[dict | None, dict | None]], applied: dict[str, int], totals: dict[str, int]) -> Dict:
+    Fetch errors count as changed so generate_exams_json() reports them.
+    """
+    for url in confirmed_overlay_urls(published_semester_key()):
+        try:
+            if not upstream.get_cached_json(url).consumed_by(hashes):
+                return True
+        except (requests.RequestException, ValueError):
+            return True
+    return False
+
+
+def official_exam_index(payload: dict | None, exam_type: str) -> dict[tuple[str, str], dict]:
+    """Normalized (course, section) -> official row for one overlay payload."""
+    return {key: rows[exam_type] for key, rows in build_official_index({exam_type: payload}).items()}
+
+
+def apply_official_overlay(exams: List[Dict], official: dict[tuple[str, str], dict], exam_type: str) -> int:
+    """Apply one indexed overlay; generate_exams_json joins both overlays in one pass instead."""
+    return join_overlays(exams, {exam_type: {"exams": list(official.values())}}).applied[exam_type]
+
+
+def generate_exam_source_metadata(semester: str, overlays: dict[str, tuple[dict | None, dict | None]], applied: dict[str, int], totals: dict[str, int],
+                                  unmatched: Optional[dict[str, int]] = None) -> Dict:
     sources = {}
     for exam_type, (payload, record) in overlays.items():
         matched = applied.get(exam_type, 0)
@@ -456,11 +718,54 @@ def generate_exam_source_metadata(semester: str, overlays: dict[str, tuple[dict
             "updatedAt": record.get("updatedAt") if record else None,
             "dataUrl": record.get("dataUrl") if record and matched else None,
         }
+        if unmatched is not None and payload:
+            sources[exam_type]["unmatchedOfficialRows"] = unmatched.get(exam_type, 0)
     return {"semester": semester, "sources": sources}
 
 
-def generate_exams_json(sections: List[Dict], output_path: str = "exams.json"):
+def exam_fields_hash(sections: List[Dict], status_path: str = EXAM_STATUS_FILE) -> str:
+    """Hash of the inputs generate_exams_json() reads besides the overlay bodies.
+
+    Each section with an exam date contributes one fingerprint (id, course,
+    section, type and exam dates/times) in upstream order. Seat counts, rooms
+    and class times are not part of it, so a run where only those changed
+    keeps the same hash. The exam_status.json records of the exams' semester
+    are included too, so un-confirming an overlay or changing its dataUrl or
+    updatedAt also regenerates exams.json.
+    """
+    digest = hashlib.sha256()
+    first_mid = first_final = None
+    for section in sections:
+        schedule = section.get('sectionSchedule') or {}
+        if not schedule.get('midExamDate') and not schedule.get('finalExamDate'):
+            continue
+        first_mid = first_mid or schedule.get('midExamDate')
+        first_final = first_final or schedule.get('finalExamDate')
+        fingerprint = [section.get('sectionId'), section.get('courseCode'), section.get('sectionName'),
+                       section.get('sectionType') == "LAB"] + [schedule.get(field) for field in EXAM_SCHEDULE_FIELDS]
+        digest.update(json.dumps(fingerprint, separators=(',', ':'), ensure_ascii=False).encode("utf-8"))
+        digest.update(b"\n")
+
+    # Same semester generate_exams_json() picks its overlays for
+    semester = get_current_semester(first_mid or first_final)
+    digest.update(json.dumps(exam_status_records(semester, status_path), sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def exam_status_records(semester: str, status_path: str = EXAM_STATUS_FILE) -> Optional[Dict]:
+    """exam_status.json records ({"midterm": ..., "final": ...}) of a semester; None when unreadable."""
+    try:
+        with open(status_path, "r", encoding="utf-8") as f:
+            status = json.load(f)
+        return status.get("semesters", {}).get(semester.lower(), {})
+    except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+        return None
+
+
+def generate_exams_json(sections: List[Dict], output_path: str = "exams.json", writer: Optional[ArtifactWriter] = None):
     """Generate exams.json with exam schedule data."""
+    writer = writer or ArtifactWriter()
+
     # Ensure output path is in the script directory
     if not os.path.isabs(output_path):
         output_path = os.path.join(SCRIPT_DIR, output_path)
@@ -513,13 +818,14 @@ def generate_exams_json(sections: List[Dict], output_path: str = "exams.json"):
 
     semester = get_current_semester(mid_dates[0] if mid_dates else final_dates[0] if final_dates else None)
     overlays = {
-        "midterm": load_confirmed_exam_overlay(semester, "midterm"),
-        "final": load_confirmed_exam_overlay(semester, "final"),
-    }
-    applied = {
-        exam_type: apply_official_overlay(exams, official_exam_index(payload, exam_type), exam_type)
-        for exam_type, (payload, record) in overlays.items()
+        "midterm": load_confirmed_exam_overlay(semester, "midterm", writer.hashes),
+        "final": load_confirmed_exam_overlay(semester, "final", writer.hashes),
     }
+    overlay_result = join_overlays(exams, {exam_type: payload for exam_type, (payload, record) in overlays.items()})
+    applied = overlay_result.applied
+    unmatched = {exam_type: len(rows) for exam_type, rows in overlay_result.unmatched_official.items()}
+    if overlay_result.unmatched_official:
+        print_overlay_report(overlay_result)
     totals = {
         "midterm": sum(1 for exam in exams if exam.get("midExamDate")),
         "final": sum(1 for exam in exams if exam.get("finalExamDate")),
@@ -536,7 +842,7 @@ def generate_exams_json(sections: List[Dict], output_path: str = "exams.json"):
         "finalExamStartDate": final_dates[0] if final_dates else None,
         "finalExamEndDate": final_dates[-1] if final_dates else None,
         "lastUpdated": datetime.now(timezone.utc).isoformat(),
-        **generate_exam_source_metadata(semester, overlays, applied, totals)
+        **generate_exam_source_metadata(semester, overlays, applied, totals, unmatched)
     }
 
     output_data = {
@@ -544,17 +850,11 @@ def generate_exams_json(sections: List[Dict], output_path: str = "exams.json"):
         "exams": exams
     }
 
-    # Write regular JSON
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
+    # Write regular JSON and gzipped version (skipped when exam content is unchanged)
+    stats = writer.write(output_path, output_data, content_hash=document_hash(output_data))
 
-    # Write gzipped version
-    gzip_path = output_path + '.gz'
-    with gzip.open(gzip_path, 'wt', encoding='utf-8') as f:
-        json.dump(output_data, f, separators=(',', ':'), ensure_ascii=False)
-
-    regular_size = os.path.getsize(output_path) / 1024  # KB
-    gzip_size = os.path.getsize(gzip_path) / 1024  # KB
+    regular_size = stats["bytes"] / 1024  # KB
+    gzip_size = stats["gzipBytes"] / 1024  # KB
     compression_ratio = ((regular_size - gzip_size) / regular_size * 100)
 
     print(f"✓ {output_path} created successfully")
@@ -567,104 +867,215 @@ def generate_exams_json(sections: List[Dict], output_path: str = "exams.json"):
         f"  Final exams: {metadata['finalExamStartDate']} to {metadata['finalExamEndDate']}")
 
 
-def main():
-    """Main execution function."""
-    force = '--force' in sys.argv
-
-    print("=" * 60)
-    print("MRZ Connect CDN Data Update Script")
-    print("=" * 60)
-
-    try:
-        # Fetch data from API
-        sections = fetch_mrz_data(force=force)
+def publish_sections(sections: List[Dict], writer: ArtifactWriter,
+                     previous: Optional[Tuple[Optional[Dict], Optional[List[Dict]]]] = None) -> Tuple[str, Dict]:
+    """Write connect.json, its metadata, the semester backup and stable.json.
 
-        if sections is None:
-            print("\n✓ No changes detected. Exiting.")
-            return 0
+    Returns (backup filename, published metadata). Only called when the
+    sections changed, so the version is bumped exactly once per content
+    change. previous is the published (metadata, sections) when the caller
+    already holds them; otherwise connect.json is read to diff against.
+    """
+    # Keep the currently published version around to diff against
+    previous_metadata, previous_sections = previous if previous is not None else load_previous_connect()
 
-        # Calculate metadata first (needed for backup management)
+    # Calculate metadata first (needed for backup management)
+    with run_report.stage("metadata", inputSections=len(sections)):
         metadata = calculate_connect_metadata(sections)
 
-        # Manage current semester backup
+    # Manage current semester backup
+    with run_report.stage("backup"):
         curr_backup_name, semester_changed = manage_current_backup(
-            metadata, sections)
-
-        # Bump version (daily +1, or semester +1 & daily reset)
-        version = bump_version(semester_changed)
-        metadata["version"] = version
-
-        # Write additive detection/confirmation metadata. Existing public
-        # payloads remain unchanged for backwards compatibility.
-        status_document = build_status_document(metadata)
-        write_json_file(STATUS_FILE, status_document)
-        print("✓ status.json updated (live-data detection metadata)")
-
-        # Generate both JSON files
-        output_data = {
-            "metadata": metadata,
-            "sections": sections
-        }
+            metadata, sections, writer)
+
+    # Bump version (daily +1, or semester +1 & daily reset)
+    version = bump_version(semester_changed)
+    metadata["version"] = version
+
+    # Write additive detection/confirmation metadata. Existing public
+    # payloads remain unchanged for backwards compatibility.
+    status_document = build_status_document(metadata)
+    write_json_file(STATUS_FILE, status_document)
+    print("✓ status.json updated (live-data detection metadata)")
 
-        # Write connect.json
+    with run_report.stage("connect"):
+        # Generate both JSON files, reusing the sections encoded for the backup
+        output_data = writer.document(
+            metadata=metadata, sections=writer.encode("sections", sections))
+
+        # Write connect.json and its gzipped version
         connect_path = os.path.join(SCRIPT_DIR, "connect.json")
-        with open(connect_path, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
+        connect_stats = writer.write(connect_path, output_data)
+
+        # Write the delta from the previous version and advertise it
+        print("\nGenerating delta feed...")
+        delta_index = generate_delta(previous_metadata, previous_sections, metadata, sections,
+                                     semester_changed, writer)
 
-        # Write gzipped version
-        gzip_path = connect_path + '.gz'
-        with gzip.open(gzip_path, 'wt', encoding='utf-8') as f:
-            json.dump(output_data, f, separators=(
-                ',', ':'), ensure_ascii=False)
+        # Write the section-level change report and summarize it in the metadata
+        changes = generate_changes(previous_metadata, previous_sections, metadata, sections,
+                                   semester_changed, writer)
+        del previous_sections
 
         # Write metadata only JSON (optimization for landing page)
         metadata_path = os.path.join(SCRIPT_DIR, "connect_metadata.json")
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump({"metadata": metadata}, f, indent=2, ensure_ascii=False)
-
-        # Write gzipped metadata version
-        metadata_gzip_path = metadata_path + '.gz'
-        with gzip.open(metadata_gzip_path, 'wt', encoding='utf-8') as f:
-            json.dump({"metadata": metadata}, f, separators=(
-                ',', ':'), ensure_ascii=False)
-
-        regular_size = os.path.getsize(connect_path) / 1024
-        gzip_size = os.path.getsize(gzip_path) / 1024
-        metadata_size = os.path.getsize(metadata_path) / 1024
-        compression_ratio = ((regular_size - gzip_size) / regular_size * 100)
-
-        print(f"\n✓ connect.json created successfully")
-        print(
-            f"✓ connect_metadata.json created successfully ({metadata_size:.2f} KB)")
-        print(f"  Regular: {regular_size:.1f} KB")
-        print(
-            f"  Gzipped: {gzip_size:.1f} KB (saved {compression_ratio:.1f}%)")
-
-        # Manage stable.json — stays on current semester until finals end
-        manage_stable_json(metadata, sections)
-
-        # Generate exams.json
-        generate_exams_json(sections)
-
-        # Generate backup index
+        metadata_stats = writer.write(metadata_path, {"metadata": metadata, "deltas": delta_index,
+                                                      "changes": changes})
+
+    regular_size = connect_stats["bytes"] / 1024
+    gzip_size = connect_stats["gzipBytes"] / 1024
+    metadata_size = metadata_stats["bytes"] / 1024
+    compression_ratio = ((regular_size - gzip_size) / regular_size * 100)
+
+    print(f"\n✓ connect.json created successfully")
+    print(
+        f"✓ connect_metadata.json created successfully ({metadata_size:.2f} KB)")
+    print(f"  Regular: {regular_size:.1f} KB")
+    print(
+        f"  Gzipped: {gzip_size:.1f} KB (saved {compression_ratio:.1f}%)")
+
+    # Write precomputed lookups (sectionId/course/faculty/room -> positions)
+    # and the columnar copy of the sections for backend consumers
+    with run_report.stage("index"):
+        generate_connect_index(sections, metadata, writer)
+        generate_columnar(sections, metadata, writer)
+
+    # Append this run's seat counts to the semester's seat history
+    with run_report.stage("seat_history"):
+        record_seat_snapshot(sections, os.path.splitext(curr_backup_name)[0], writer)
+
+    # Write per-course/department shards for single-course lookups
+    with run_report.stage("shards"):
+        generate_shards(sections, metadata, writer)
+
+    # Manage stable.json — stays on current semester until finals end
+    with run_report.stage("stable"):
+        manage_stable_json(metadata, sections, writer)
+
+    return curr_backup_name, metadata
+
+
+def update_artifacts(sections: List[Dict], hashes: ContentHashes, writer: ArtifactWriter,
+                     previous: Optional[Tuple[Optional[Dict], Optional[List[Dict]]]] = None,
+                     refresh_all: bool = True) -> Tuple[Optional[str], Optional[Dict]]:
+    """Regenerate the artifacts affected by a fetched section list.
+
+    Returns (backup filename, metadata) when the sections were published, or
+    (None, None) when they matched the last published content. With
+    refresh_all=False (watch mode) the backup index is only rebuilt after a
+    publish, since nothing else changes it.
+    """
+    # Skip connect/backup rewrites and the version bump when the
+    # sections are identical in content to the last published run (e.g. --force)
+    sections_hash = content_hash(sections)
+    connect_path = os.path.join(SCRIPT_DIR, "connect.json")
+    sections_changed = hashes.get("sections") != sections_hash or not os.path.exists(connect_path)
+    curr_backup_name = metadata = None
+    if not sections_changed:
+        print("\n✓ Sections unchanged since last run (content hash match).")
+        print("  Keeping connect.json, backup and version as-is.")
+        # The stable.json freeze ends by date, even when the data doesn't change
+        with run_report.stage("stable"):
+            try:
+                published = read_backup_metadata(os.path.join(SCRIPT_DIR, "connect_metadata.json"))
+            except (FileNotFoundError, json.JSONDecodeError, KeyError):
+                published = None
+            if published is not None and stable_switch_due(published):
+                manage_stable_json(published, sections, writer)
+    else:
+        with run_report.stage("publish"):
+            curr_backup_name, metadata = publish_sections(sections, writer, previous)
+        hashes.set("sections", sections_hash)
+
+    # Generate exams.json (skipped entirely when the sections' exam fields, the
+    # semester's exam_status.json records and the official overlay bodies are
+    # all unchanged, e.g. seat-only updates)
+    exams_path = os.path.join(SCRIPT_DIR, "exams.json")
+    with run_report.stage("exams") as exams_stage:
+        exams_hash = exam_fields_hash(sections)
+        if hashes.get("examFields") != exams_hash or exam_overlays_changed(hashes) or not os.path.exists(exams_path):
+            generate_exams_json(sections, writer=writer)
+            hashes.set("examFields", exams_hash)
+        else:
+            exams_stage["cacheHits"] = 1
+            print("\n✓ Exam fields and exam overlays unchanged; exams.json kept as-is")
+
+    # Generate backup index
+    if refresh_all or sections_changed:
         print("\n" + "=" * 60)
         print("Generating Backup Index")
         print("=" * 60)
 
         from generate_backup_index import generate_backup_index
-        generate_backup_index()
+        with run_report.stage("backup_index"):
+            generate_backup_index(writer)
 
-        # Generate free/open labs CDN (always refresh — schedules can change mid-semester)
-        print("\n" + "=" * 60)
-        print("Generating Open Labs CDN")
-        print("=" * 60)
-        try:
-            from generate_free_labs import generate_free_labs_json
-            generate_free_labs_json()
-        except Exception as e:
-            print(f"⚠️  Error generating open labs: {e}")
-            import traceback
-            traceback.print_exc()
+    # Generate free/open labs CDN (always refresh — schedules can change mid-semester)
+    print("\n" + "=" * 60)
+    print("Generating Open Labs CDN")
+    print("=" * 60)
+    try:
+        from generate_free_labs import generate_free_labs_json
+        with run_report.stage("open_labs"):
+            generate_free_labs_json(writer)
+    except Exception as e:
+        print(f"⚠️  Error generating open labs: {e}")
+        import traceback
+        traceback.print_exc()
+
+    return curr_backup_name, metadata
+
+
+def argument_value(name: str) -> Optional[str]:
+    """Value following a command line option ("--prometheus metrics.prom")."""
+    if name in sys.argv[:-1]:
+        return sys.argv[sys.argv.index(name) + 1]
+    return None
+
+
+def write_run_report(report: "run_report.RunReport", prometheus_path: Optional[str] = None,
+                     path: str = run_report.REPORT_FILE) -> None:
+    """Finish the run's stage report and write run_report.json (and Prometheus text)."""
+    report.add_compress_stage()
+    report.finish()
+    report.write(path)
+    print(f"✓ run_report.json written ({report.status}, {len(report.stages)} stages)")
+    if prometheus_path:
+        report.write_prometheus(prometheus_path)
+        print(f"✓ Prometheus metrics written to {prometheus_path}")
+
+
+def main():
+    """Main execution function."""
+    force = '--force' in sys.argv
+    stream = '--stream' in sys.argv
+    hashes = ContentHashes()
+    zstd_dictionary = load_zstd_dictionary() if '--zstd-dict' in sys.argv else None
+    writer = ArtifactWriter(hashes, zstd_dictionary=zstd_dictionary)
+    report = run_report.RunReport(writer, trace_memory='--trace-memory' in sys.argv).start()
+    prometheus_path = argument_value('--prometheus')
+    # Everything below is written to .staging/ and published in one commit
+    generation = staging.Generation().begin()
+
+    print("=" * 60)
+    print("MRZ Connect CDN Data Update Script")
+    print("=" * 60)
+
+    try:
+        with report.stage("fetch") as fetch_stage:
+            # Download the other upstream payloads concurrently with connect.json
+            prefetch_upstream_payloads()
+
+            # Fetch data from API
+            sections = fetch_mrz_data(force=force, stream=stream)
+            fetch_stage["notModified"] = sections is None
+
+        if sections is None:
+            print("\n✓ No changes detected. Exiting.")
+            report.status = "not-modified"
+            return 0
+
+        curr_backup_name, _ = update_artifacts(sections, hashes, writer)
 
         print("\n" + "=" * 60)
         print("✓ All files generated successfully!")
@@ -674,7 +1085,17 @@ def main():
         print(f"  stable.json   — current semester (frozen until finals end)")
         print(f"  exams.json    — exam schedules")
         print(f"  open_labs.json — lab availability")
-        print(f"  Backup: {curr_backup_name}")
+        print(f"  changes.json  — sections changed since the previous version")
+        print(f"  Backup: {curr_backup_name or 'unchanged'}")
+
+        hashes.save()
+        with report.stage("commit"):
+            manifest = generation.commit(version=version_string(load_version()))
+        if manifest:
+            print(f"\n✓ Published generation {manifest['generation']} "
+                  f"({len(manifest['files'])} files, {len(manifest['removed'])} removed)")
+        writer.report()
+        report.status = "ok"
 
         print("\nNext steps:")
         print("1. Review the generated JSON files")
@@ -684,7 +1105,13 @@ def main():
         print(f"\n✗ Error: {e}")
         import traceback
         traceback.print_exc()
+        report.status = "error"
         return 1
+    finally:
+        # No-op after a commit; otherwise nothing of this run is published
+        generation.discard()
+        upstream.shutdown()
+        write_run_report(report, prometheus_path)
 
     return 0
 
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Upstream HTTP Client - Shared pooled session for every fetch in a run
+One keep-alive session with retries/backoff and per-host timeouts, plus a
+small prefetch registry so independent payloads (table.json, official exam
+overlays) download concurrently while connect.json is being fetched.
+
+JSON fetches go through an on-disk HTTP cache keyed by URL: responses are
+revalidated with ETag/Last-Modified (or served without a request while
+within max-age). Each result carries the body's sha256; a run records the
+digests it consumed in its ContentHashes, which are only published with
+the run's generation. A source is therefore "unchanged" only relative to
+what a published run actually used, and a failed run is retried in full.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, NamedTuple, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (10, 30)
+HOST_TIMEOUTS = {
+    "usis-cdn.eniamza.com": (10, 60),
+}
+
+RETRY_POLICY = Retry(
+    total=3,
+    backoff_factor=1,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=("GET", "HEAD"),
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
+MAX_WORKERS = 4
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(SCRIPT_DIR, ".http_cache")
+
+# Seconds a cached body is reused without revalidation when the server sends
+# no Cache-Control max-age
+DEFAULT_MAX_AGE = 0
+
+_session: Optional[requests.Session] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_pending: Dict[str, Future] = {}
+_lock = threading.Lock()
+
+# Outcomes of fetch_json_cached this process: served from the cache without a
+# request, revalidated with a 304, or downloaded
+cache_stats: Dict[str, int] = {"fresh": 0, "notModified": 0, "fetched": 0}
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled session (created on first use)."""
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS * 2,
+                                  max_retries=RETRY_POLICY)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def timeout_for(url: str) -> Tuple[int, int]:
+    return HOST_TIMEOUTS.get(urlparse(url).hostname or "", DEFAULT_TIMEOUT)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """GET through the shared session with the host's timeout."""
+    kwargs.setdefault("timeout", timeout_for(url))
+    return get_session().get(url, **kwargs)
+
+
+class CachedJson(NamedTuple):
+    url: str
+    payload: object
+    sha256: str  # of the response body
+
+    @property
+    def source_key(self) -> str:
+        """ContentHashes name under which a run records the body it consumed."""
+        return f"upstream:{self.url}"
+
+    def consumed_by(self, hashes) -> bool:
+        """True when hashes records this exact body as used by a published run."""
+        return hashes is not None and hashes.get(self.source_key) == self.sha256
+
+    def mark_consumed(self, hashes) -> None:
+        if hashes is not None:
+            hashes.set(self.source_key, self.sha256)
+
+
+def _cache_paths(url: str) -> Tuple[str, str]:
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+    return os.path.join(CACHE_DIR, key + ".meta.json"), os.path.join(CACHE_DIR, key + ".body.gz")
+
+
+def _load_cache_entry(url: str) -> Tuple[Optional[Dict], Optional[bytes]]:
+    meta_path, body_path = _cache_paths(url)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(body_path, "rb") as f:
+            body = gzip.decompress(f.read())
+    except (FileNotFoundError, json.JSONDecodeError, OSError, EOFError):
+        return None, None
+    if meta.get("url") != url or hashlib.sha256(body).hexdigest() != meta.get("sha256"):
+        return None, None
+    return meta, body
+
+
+def _store_cache_entry(url: str, meta: Dict, body: Optional[bytes] = None) -> None:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    meta_path, body_path = _cache_paths(url)
+    if body is not None:
+        with open(body_path + ".tmp", "wb") as f:
+            f.write(gzip.compress(body, mtime=0))
+        os.replace(body_path + ".tmp", body_path)
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+def _max_age(response: requests.Response) -> int:
+    match = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+    if match and "no-cache" not in response.headers.get("Cache-Control", ""):
+        return int(match.group(1))
+    return DEFAULT_MAX_AGE
+
+
+def _count(outcome: str) -> None:
+    with _lock:
+        cache_stats[outcome] += 1
+
+
+def fetch_json_cached(url: str) -> CachedJson:
+    """Fetch JSON through the on-disk cache with conditional revalidation."""
+    meta, body = _load_cache_entry(url)
+    now = time.time()
+
+    if meta is not None and now < meta.get("fetchedAt", 0) + meta.get("maxAge", 0):
+        _count("fresh")
+        return CachedJson(url, json.loads(body), meta["sha256"])
+
+    headers = {}
+    if meta is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("lastModified"):
+            headers["If-Modified-Since"] = meta["lastModified"]
+
+    response = get(url, headers=headers)
+    if response.status_code == 304 and meta is not None:
+        meta.update(fetchedAt=now, maxAge=_max_age(response))
+        _store_cache_entry(url, meta)
+        _count("notModified")
+        return CachedJson(url, json.loads(body), meta["sha256"])
+
+    response.raise_for_status()
+    payload = response.json()
+    digest = hashlib.sha256(response.content).hexdigest()
+    _store_cache_entry(url, {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "lastModified": response.headers.get("Last-Modified"),
+        "fetchedAt": now,
+        "maxAge": _max_age(response),
+        "sha256": digest,
+    }, response.content)
+    _count("fetched")
+    return CachedJson(url, payload, digest)
+
+
+def prefetch_json(url: str) -> Future:
+    """Start fetching a JSON payload in the background (deduplicated by URL)."""
+    global _executor
+    with _lock:
+        future = _pending.get(url)
+        if future is None:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="upstream")
+            future = _executor.submit(fetch_json_cached, url)
+            _pending[url] = future
+        return future
+
+
+def get_cached_json(url: str) -> CachedJson:
+    """Return the run's result for url, fetching (through the cache) on first use.
+
+    Results are kept until shutdown() so several consumers of one URL share a
+    single request. Raises the same errors as a direct fetch
+    (requests.RequestException or a JSON decode ValueError).
+    """
+    return prefetch_json(url).result()
+
+
+def get_json(url: str):
+    """Payload of get_cached_json()."""
+    return get_cached_json(url).payload
+
+
+def shutdown() -> None:
+    """Forget this run's results and stop the worker threads."""
+    global _executor
+    with _lock:
+        for future in _pending.values():
+            future.cancel()
+        _pending.clear()
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Watch Mode - Keep the CDN artifacts fresh by polling upstream
+Polls connect.json with conditional GETs and publishes a staged generation
+whenever the sections change. The poll interval adapts to what upstream is
+doing: it drops to the minimum while many seat counts move between polls
+(registration rushes), halves on smaller changes and backs off towards the
+maximum while nothing changes. Every delay is jittered so several watchers
+don't poll in lockstep.
+
+The published sections and metadata stay in memory between polls, so
+deltas and seat churn are computed without re-reading connect.json, and
+only artifacts affected by a change are regenerated (content hashes skip
+the rest).
+
+Usage:
+    python watch.py                                   # poll until interrupted
+    python watch.py --min-interval 30 --max-interval 900
+    python watch.py --on-publish "./push.sh"          # e.g. commit and push each generation
+"""
+
+import argparse
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import run_report
+import staging
+import update_cdn
+import upstream
+from artifacts import ArtifactWriter, ContentHashes, load_zstd_dictionary
+from generate_deltas import load_previous_connect
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MIN_INTERVAL = 60           # seconds between polls during a registration rush
+MAX_INTERVAL = 30 * 60      # ... while upstream is idle
+BACKOFF = 2.0               # interval growth per unchanged poll (and shrink per small change)
+JITTER = 0.2                # +/- fraction applied to every delay
+SPIKE_CHURN = 0.01          # share of sections with moved seat counts that counts as a rush
+
+
+class PollResult(NamedTuple):
+    status: str         # "published", "unchanged", "not-modified" or "error"
+    churn: float = 0.0  # share of sections whose seat count changed since the previous poll
+    generation: Optional[int] = None
+
+
+def seat_churn(previous: Optional[List[Dict]], sections: List[Dict]) -> float:
+    """Share of sections that are new or whose consumedSeat moved."""
+    if not sections:
+        return 0.0
+    if not previous:
+        return 1.0
+    seats = {section.get('sectionId'): section.get('consumedSeat') for section in previous}
+    moved = sum(1 for section in sections
+                if section.get('sectionId') not in seats
+                or seats[section.get('sectionId')] != section.get('consumedSeat'))
+    return moved / len(sections)
+
+
+class PollSchedule:
+    """Adaptive, jittered delay between polls."""
+
+    def __init__(self, min_interval: float = MIN_INTERVAL, max_interval: float = MAX_INTERVAL,
+                 backoff: float = BACKOFF, jitter: float = JITTER, spike_churn: float = SPIKE_CHURN,
+                 rng: Optional[random.Random] = None):
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("need 0 < min_interval <= max_interval")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.spike_churn = spike_churn
+        self.rng = rng or random.Random()
+        self.interval = min_interval
+
+    def next_delay(self, result: PollResult) -> float:
+        if result.status == "published" and result.churn >= self.spike_churn:
+            self.interval = self.min_interval
+        elif result.status == "published":
+            self.interval = max(self.min_interval, self.interval / self.backoff)
+        else:
+            # Unchanged, 304 or a failed poll: relax towards the maximum
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        return self.interval * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class Watcher:
+    """Polls upstream and publishes one staged generation per content change."""
+
+    def __init__(self, url: str = update_cdn.LIVE_DATA_URL, schedule: Optional[PollSchedule] = None,
+                 stream: bool = False, zstd_dictionary=None, root: str = SCRIPT_DIR,
+                 hashes: Optional[ContentHashes] = None, regenerate: Optional[Callable] = None,
+                 on_publish: Optional[str] = None):
+        self.url = url
+        self.schedule = schedule or PollSchedule()
+        self.stream = stream
+        self.zstd_dictionary = zstd_dictionary
+        self.root = root
+        self.hashes = hashes or ContentHashes()
+        self.regenerate = regenerate or update_cdn.update_artifacts
+        self.on_publish = on_publish
+        self.stop_event = threading.Event()
+        # Published state kept between polls (loaded from disk once)
+        self.metadata, self.sections = load_previous_connect(os.path.join(root, "connect.json"))
+
+    def poll(self) -> PollResult:
+        """One conditional fetch and, when the sections changed, one published generation."""
+        writer = ArtifactWriter(self.hashes, zstd_dictionary=self.zstd_dictionary)
+        report = run_report.RunReport(writer, trace_memory=False).start()
+        generation = staging.Generation(self.root).begin()
+        try:
+            with report.stage("fetch"):
+                sections = update_cdn.fetch_mrz_data(stream=self.stream, url=self.url)
+            if sections is None:
+                report.status = "not-modified"
+                return PollResult("not-modified")
+
+            churn = seat_churn(self.sections, sections)
+            previous = (self.metadata, self.sections) if self.sections is not None else None
+            _, metadata = self.regenerate(sections, self.hashes, writer, previous=previous, refresh_all=False)
+
+            self.hashes.save()
+            with report.stage("commit"):
+                manifest = generation.commit(version=update_cdn.version_string(update_cdn.load_version()))
+            if metadata is None:
+                report.status = "unchanged"
+                return PollResult("unchanged", churn)
+
+            self.metadata, self.sections = metadata, sections
+            report.status = "ok"
+            number = manifest["generation"] if manifest else None
+            print(f"✓ Published generation {number} ({churn:.1%} of sections changed seats)")
+            self.run_hook(number)
+            return PollResult("published", churn, number)
+        except Exception as e:
+            print(f"✗ Poll failed: {e}")
+            report.status = "error"
+            # Hashes and consumed upstream digests recorded for the discarded
+            # generation would skip its retry; reload the published ones
+            self.hashes = ContentHashes(self.hashes.path)
+            return PollResult("error")
+        finally:
+            generation.discard()
+            # Forget this poll's cached upstream results so the next poll revalidates
+            upstream.shutdown()
+            update_cdn.write_run_report(report, path=os.path.join(self.root, "run_report.json"))
+
+    def run_hook(self, generation: Optional[int]) -> None:
+        if not self.on_publish:
+            return
+        env = dict(os.environ, MRZ_CDN_GENERATION=str(generation or ""))
+        completed = subprocess.run(self.on_publish, shell=True, cwd=self.root, env=env)
+        if completed.returncode != 0:
+            print(f"⚠️  --on-publish exited with {completed.returncode}")
+
+    def run(self, max_polls: Optional[int] = None) -> int:
+        """Poll until stop() (or max_polls); returns the number of polls made."""
+        polls = 0
+        while not self.stop_event.is_set():
+            result = self.poll()
+            polls += 1
+            if max_polls is not None and polls >= max_polls:
+                break
+            delay = self.schedule.next_delay(result)
+            print(f"  next poll in {delay:.0f}s (interval {self.schedule.interval:.0f}s)")
+            self.stop_event.wait(delay)
+        return polls
+
+    def stop(self, *_) -> None:
+        self.stop_event.set()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Poll upstream and republish the CDN artifacts on change.")
+    parser.add_argument('--url', default=update_cdn.LIVE_DATA_URL)
+    parser.add_argument('--min-interval', type=float, default=MIN_INTERVAL, help="seconds (default: %(default)s)")
+    parser.add_argument('--max-interval', type=float, default=MAX_INTERVAL, help="seconds (default: %(default)s)")
+    parser.add_argument('--max-polls', type=int, help="stop after this many polls")
+    parser.add_argument('--stream', action='store_true', help="parse the payload incrementally")
+    parser.add_argument('--zstd-dict', action='store_true', help="compress .zst files with connect.zstd-dict")
+    parser.add_argument('--on-publish', help="shell command run after each published generation")
+    args = parser.parse_args(argv)
+
+    watcher = Watcher(
+        url=args.url,
+        schedule=PollSchedule(args.min_interval, args.max_interval),
+        stream=args.stream,
+        zstd_dictionary=load_zstd_dictionary() if args.zstd_dict else None,
+        on_publish=args.on_publish,
+    )
+    signal.signal(signal.SIGTERM, watcher.stop)
+    signal.signal(signal.SIGINT, watcher.stop)
+
+    print(f"Watching {args.url} (every {args.min_interval:.0f}-{args.max_interval:.0f}s)")
+    polls = watcher.run(args.max_polls)
+    print(f"✓ Stopped after {polls} poll(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())